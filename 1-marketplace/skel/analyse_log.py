@@ -0,0 +1,50 @@
+"""
+This module reports the performance of the marketplace from its log files
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import argparse
+import json
+import sys
+
+from tema.log_analysis import LogAnalyser, NumpyLogAnalyser, analyse_logs, format_report, \
+    rotated_files
+
+
+def main():
+    """
+        Stream the log files, with their rotated backups, and print the report
+    """
+    parser = argparse.ArgumentParser(description="Report the performance of the marketplace "
+                                                 "from its log")
+    parser.add_argument("logs", nargs="*", default=["marketplace.log"],
+                        help="the log files, each read after its backups (default: "
+                             "marketplace.log)")
+    parser.add_argument("--format", choices=["text", "json"], default="text",
+                        help="the format of the report")
+    parser.add_argument("--top", type=int, default=5,
+                        help="the number of the busiest producers and carts in the text report")
+    parser.add_argument("--numpy", action="store_true",
+                        help="parse the logs in chunks with NumPy, for the multi-GB logs")
+    args = parser.parse_args()
+
+    filenames = [filename for log in args.logs for filename in rotated_files(log)]
+    if not filenames:
+        parser.error("no log files found")
+    try:
+        analyser = NumpyLogAnalyser() if args.numpy else LogAnalyser()
+    except ImportError:
+        parser.error("--numpy needs NumPy installed")
+    report = analyse_logs(filenames, analyser)
+    if args.format == "json":
+        json.dump(report, sys.stdout, indent=4)
+        print()
+    else:
+        print(format_report(report, args.top))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+This module benchmarks the homework's solution on the test files
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import argparse
+from contextlib import redirect_stdout
+from glob import glob
+from io import StringIO
+from itertools import product
+from time import perf_counter, process_time
+
+from tema.claim_policy import CLAIM_POLICIES
+from tema.config import load_market_config
+from tema.producer import Producer
+from tema.consumer import Consumer
+from tema.marketplace import Marketplace, setup_logging
+from tema.storage import STORAGES
+
+
+def run_scenario(filename, marketplace_options, producer_options, consumer_options):
+    """
+        Run a test file once, with one thread per producer and consumer, and stop the
+        producers as soon as the consumers are done, so only the useful work is measured
+
+        :returns a dictionary with the measurements
+    """
+    market_config = load_market_config(filename)
+    marketplace = Marketplace(**market_config['marketplace'], **marketplace_options)
+    producers = [Producer(**p_market_config, **producer_options, marketplace=marketplace,
+                          daemon=True)
+                 for p_market_config in market_config['producers']]
+    consumers = [Consumer(**c_market_config, **consumer_options, marketplace=marketplace)
+                 for c_market_config in market_config['consumers']]
+
+    # the consumers' output is checked by the tests, not here
+    with redirect_stdout(StringIO()):
+        start_time = perf_counter()
+        start_cpu_time = process_time()
+        for producer in producers:
+            producer.start()
+        for consumer in consumers:
+            consumer.start()
+        for consumer in consumers:
+            consumer.join()
+        wall_time = perf_counter() - start_time
+        cpu_time = process_time() - start_cpu_time
+
+    marketplace.close()
+    for producer in producers:
+        producer.join()
+
+    published = sum(producer.published_count for producer in producers)
+    return {
+        "wall_time": wall_time,
+        "cpu_time": cpu_time,
+        "published": published,
+        "failed_publishes": sum(producer.failed_count for producer in producers),
+        "publish_rate": published / wall_time,
+        "failed_adds": sum(consumer.failed_count for consumer in consumers),
+    }
+
+
+def main():
+    """
+        Run the chosen test files with every chosen marketplace option and print a table
+        with the measurements, averaged over the repetitions
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the marketplace on test files")
+    parser.add_argument("filenames", nargs="*", help="the test files (default: tests/*.in)")
+    parser.add_argument("--claim-policies", nargs="+", choices=sorted(CLAIM_POLICIES),
+                        default=["first"], help="the claim policies to compare")
+    parser.add_argument("--storages", nargs="+", choices=sorted(STORAGES),
+                        default=["list"], help="the storage backends to compare")
+    parser.add_argument("--producer-backoffs", nargs="+", choices=["fixed", "adaptive"],
+                        default=["fixed"], help="the producers' backoffs to compare")
+    parser.add_argument("--consumer-backoffs", nargs="+",
+                        choices=["fixed", "exponential", "expected"],
+                        default=["fixed"], help="the consumers' backoffs to compare")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="the number of runs of every test file and option")
+    parser.add_argument("--log", action="store_true",
+                        help="log the calls to marketplace.log during the runs")
+    args = parser.parse_args()
+
+    # by default, don't measure the logging, which is the same for every option
+    if args.log:
+        setup_logging()
+
+    filenames = args.filenames or sorted(glob("tests/*.in"))
+    columns = ["wall_time", "cpu_time", "published", "failed_publishes", "publish_rate",
+               "failed_adds"]
+    print("%-10s %-32s" % ("test", "options") +
+          "".join("%17s" % column for column in columns))
+    for filename in filenames:
+        for options in product(args.storages, args.claim_policies, args.producer_backoffs,
+                               args.consumer_backoffs):
+            storage, claim_policy, producer_backoff, consumer_backoff = options
+            totals = dict.fromkeys(columns, 0)
+            for _ in range(args.repeat):
+                measurements = run_scenario(filename, {"storage": storage,
+                                                       "claim_policy": claim_policy},
+                                            {"backoff": producer_backoff},
+                                            {"backoff": consumer_backoff})
+                for column in columns:
+                    totals[column] += measurements[column]
+            print("%-10s %-32s" % (filename.split("/")[-1], "/".join(options)) +
+                  "".join("%17.2f" % (totals[column] / args.repeat) for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+This module runs the test files in parallel and checks them as they finish, like
+run_tests.sh does one after another, and reports the resources used by every test
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from glob import glob
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+from threading import Lock, Timer
+from time import perf_counter, time
+
+SKEL_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_SCRIPT = os.path.join(SKEL_DIR, "test.py")
+CHECK_SCRIPT = os.path.join(SKEL_DIR, "check_test.py")
+
+# the timeouts of run_tests.sh, in seconds
+DEFAULT_TIMEOUT = 30
+TIMEOUTS = {"09": 60, "10": 60}
+
+
+def run_test(test_name, input_filename, timeout, test_args, output_dir):
+    """
+        Run test.py on a test file in a subprocess, in a temporary directory of its own so
+        that the marketplace.log files of the parallel runs don't mix, and check its output
+
+        :returns a dictionary with the result and the resources used by the subprocess
+    """
+    ref_filename = input_filename[:-len(".in")] + ".ref.out"
+    with tempfile.TemporaryDirectory(prefix="marketplace-" + test_name + "-") as work_dir:
+        output_filename = os.path.join(output_dir or work_dir, test_name + ".out")
+        timed_out = []
+        exited = []
+        kill_lock = Lock()
+
+        def kill(process):
+            # the child isn't reaped until it is marked as exited, so its pid is still its own
+            with kill_lock:
+                if not exited:
+                    timed_out.append(True)
+                    os.kill(process.pid, signal.SIGKILL)
+
+        start_time = perf_counter()
+        with open(output_filename, "w") as output_file, \
+                open(os.path.join(work_dir, "stderr"), "w+") as error_file:
+            process = subprocess.Popen([sys.executable, TEST_SCRIPT, input_filename] +
+                                       test_args, stdout=output_file, stderr=error_file,
+                                       cwd=work_dir)
+            timer = Timer(timeout, kill, args=(process,))
+            timer.start()
+            # wait for the exit without reaping the child, so that the timer can't kill
+            # another process that got its pid
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+            with kill_lock:
+                exited.append(True)
+            timer.cancel()
+            # wait4 also returns the resources used by the subprocess
+            _, status, rusage = os.wait4(process.pid, 0)
+            wall_time = perf_counter() - start_time
+            process.returncode = os.waitstatus_to_exitcode(status)
+            error_file.seek(0)
+            errors = error_file.read()
+
+        check = subprocess.run([sys.executable, CHECK_SCRIPT, test_name, output_filename,
+                                ref_filename], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, check=False)
+    return {
+        "test": test_name,
+        # check_test.py passes an output when diff fails, e.g. without a reference output
+        "passed": process.returncode == 0 and not timed_out and "PASSED" in check.stdout and
+                  "diff:" not in check.stdout,
+        "timed_out": bool(timed_out),
+        "returncode": process.returncode,
+        "wall_time": wall_time,
+        "cpu_time": rusage.ru_utime + rusage.ru_stime,
+        # kilobytes on Linux
+        "max_rss_kb": rusage.ru_maxrss,
+        "check": check.stdout.strip(),
+        "stderr": errors[-2000:],
+    }
+
+
+def main():
+    """
+        Run the test files on a pool of workers, print every result as soon as it is
+        checked and write a JSON summary
+
+        :returns 0 if every test passed, 1 otherwise
+    """
+    # the arguments after -- are passed to test.py
+    argv = sys.argv[1:]
+    test_args = []
+    if "--" in argv:
+        test_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description="Run the test files in parallel",
+                                     usage="%(prog)s [options] [filenames ...] "
+                                           "[-- test.py options]")
+    parser.add_argument("filenames", nargs="*",
+                        help="the test files (default: tests/*.in)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="the number of tests run at once (default: the number of cores)")
+    parser.add_argument("--timeout", type=float,
+                        help="the timeout of every test, in seconds (default: the timeouts of "
+                             "run_tests.sh)")
+    parser.add_argument("--output-dir",
+                        help="keep the outputs of the tests in this directory")
+    parser.add_argument("--summary",
+                        help="the JSON file the summary is written to (default: summary.json "
+                             "in the output directory or in the temporary directory)")
+    parser.add_argument("--history",
+                        help="also append the summary, as a line, to this JSON lines file")
+    args = parser.parse_args(argv)
+
+    filenames = [os.path.abspath(filename) for filename in
+                 args.filenames or sorted(glob(os.path.join(SKEL_DIR, "tests", "*.in")))]
+    output_dir = os.path.abspath(args.output_dir) if args.output_dir else None
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    start_time = perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = []
+        for filename in filenames:
+            test_name = os.path.basename(filename)[:-len(".in")]
+            timeout = args.timeout or TIMEOUTS.get(test_name, DEFAULT_TIMEOUT)
+            futures.append(executor.submit(run_test, test_name, filename, timeout, test_args,
+                                           output_dir))
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = "PASSED" if result["passed"] else \
+                "TIMEOUT" if result["timed_out"] else "FAILED"
+            print("Test %s:\t\t%-7s %8.2fs wall %8.2fs cpu %8d KB" % (result["test"], status,
+                  result["wall_time"], result["cpu_time"], result["max_rss_kb"]), flush=True)
+            if not result["passed"]:
+                print(result["stderr"] + result["check"], flush=True)
+
+    results.sort(key=lambda result: result["test"])
+    summary = {
+        "timestamp": time(),
+        "test_args": test_args,
+        "jobs": args.jobs,
+        "wall_time": perf_counter() - start_time,
+        "passed": sum(result["passed"] for result in results),
+        "failed": sum(not result["passed"] for result in results),
+        "tests": results,
+    }
+    summary_filename = args.summary or os.path.join(output_dir or tempfile.gettempdir(),
+                                                    "summary.json")
+    with open(summary_filename, "w") as summary_file:
+        json.dump(summary, summary_file, indent=4)
+    if args.history:
+        with open(args.history, "a") as history_file:
+            print(json.dumps(summary), file=history_file)
+    print("%d passed, %d failed in %.2fs; summary in %s" % (summary["passed"],
+          summary["failed"], summary["wall_time"], summary_filename))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
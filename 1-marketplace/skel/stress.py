@@ -0,0 +1,55 @@
+"""
+This module stress tests the marketplace with many threads and reports the throughput
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import argparse
+from itertools import product
+
+from tema.claim_policy import CLAIM_POLICIES
+from tema.storage import STORAGES
+from tema.stress import run_stress
+
+
+def main():
+    """
+        Run the stress test with every chosen marketplace option and print a table with
+        the throughput and whether the products were conserved
+    """
+    parser = argparse.ArgumentParser(description="Stress test the marketplace")
+    parser.add_argument("--storages", nargs="+", choices=sorted(STORAGES),
+                        default=sorted(STORAGES), help="the storage backends to test")
+    parser.add_argument("--claim-policies", nargs="+", choices=sorted(CLAIM_POLICIES),
+                        default=["first"], help="the claim policies to test")
+    parser.add_argument("--producers", type=int, default=4, help="the number of producers")
+    parser.add_argument("--consumers", type=int, default=8, help="the number of consumers")
+    parser.add_argument("--operations", type=int, default=2000,
+                        help="the number of operations of every thread")
+    parser.add_argument("--seeds", type=int, default=5,
+                        help="the number of runs, each with another seed")
+    args = parser.parse_args()
+
+    print("%-24s %6s %12s %12s %12s %12s %14s %10s" % ("options", "seed", "published",
+          "buffered", "in_carts", "ordered", "operations/s", "conserved"))
+    violations = 0
+    for options in product(args.storages, args.claim_policies):
+        storage, claim_policy = options
+        for seed in range(args.seeds):
+            result = run_stress({"storage": storage, "claim_policy": claim_policy},
+                                num_producers=args.producers, num_consumers=args.consumers,
+                                num_operations=args.operations, seed=seed)
+            conserved = not result["errors"] and result["placed_carts_match"] and \
+                result["published"] == result["buffered"] + result["in_carts"] + \
+                result["ordered"]
+            violations += not conserved
+            print("%-24s %6d %12d %12d %12d %12d %14.0f %10s" % ("/".join(options), seed,
+                  result["published"], result["buffered"], result["in_carts"],
+                  result["ordered"], result["throughput"], conserved))
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,228 @@
+"""
+This module offers the allocators used by the Marketplace to decide which of the carts
+that want a scarce product may take it, and the latency of each class of carts.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from collections import deque
+from threading import Lock
+from time import monotonic
+
+
+class LatencyStats:
+    """
+    Class that keeps the latencies of a class of carts: how long they waited for the
+    products they got. The count, mean and maximum cover every latency, the percentiles
+    only the most recent ones.
+    """
+
+    def __init__(self, window=1024):
+        """
+        Constructor.
+
+        :type window: Int
+        :param window: the number of recent latencies the percentiles are computed from
+        """
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, latency):
+        """
+        Records a latency, in seconds.
+        """
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+        self.recent.append(latency)
+
+    def summary(self):
+        """
+        :returns a dictionary with the count, the mean, the median, the 95th percentile and
+        the maximum of the latencies
+        """
+        recent = sorted(self.recent)
+        if not recent:
+            return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "p50": recent[len(recent) // 2],
+            "p95": recent[min(len(recent) * 95 // 100, len(recent) - 1)],
+            "max": self.max,
+        }
+
+
+class Allocator:
+    """
+    Class that represents an allocator. add_to_cart asks it whether a cart may take a
+    product before claiming it and tells it when a cart failed to get a product and when
+    it got it, so that it knows which carts wait for each product, since when and when they
+    last tried. A cart stops waiting once its order is placed or it is released. A cart's
+    latency is the time from its first failure to get a product until it got it, or 0 if
+    it got it right away; it is recorded by the class of the cart, its priority.
+    """
+
+    def __init__(self):
+        # the priority of every cart
+        self.priorities = {}
+        # for every product, the ids of the carts that wait for it, with the time they
+        # started to wait and the time they last tried
+        self.waiting = {}
+        # the latencies of every priority
+        self.latencies = {}
+        self.lock = Lock()
+
+    def set_priority(self, cart_id, priority):
+        """
+        Sets the priority of a new cart.
+
+        :type priority: Int
+        :param priority: the class of the cart; the higher, the sooner it is served
+        """
+        with self.lock:
+            self.priorities[cart_id] = priority
+
+    def admit(self, cart_id, product, inventory, now=None):
+        """
+        :type inventory: Inventory
+        :param inventory: the marketplace's inventory, with the stock of each product
+
+        :type now: Float
+        :param now: the current monotonic time; by default, the current time
+
+        :returns True or False, whether the cart may try to take the product
+        """
+        raise NotImplementedError
+
+    def failed(self, cart_id, product, now=None):
+        """
+        Records that a cart failed to get a product; it waits from the first failure.
+        """
+        if now is None:
+            now = monotonic()
+        with self.lock:
+            self.waiting.setdefault(product, {}).setdefault(cart_id, [now, now])[1] = now
+
+    def served(self, cart_id, product, now=None):
+        """
+        Records that a cart got a product and the latency of its class.
+        """
+        if now is None:
+            now = monotonic()
+        with self.lock:
+            waiting = self.waiting.get(product)
+            since = waiting.pop(cart_id, [now])[0] if waiting else now
+            priority = self.priorities.get(cart_id, 0)
+            latencies = self.latencies.get(priority)
+            if latencies is None:
+                latencies = self.latencies[priority] = LatencyStats()
+            latencies.record(now - since)
+
+    def stop_waiting(self, cart_id):
+        """
+        Records that a cart doesn't wait for any product anymore, e.g. once its order is
+        placed.
+        """
+        with self.lock:
+            for waiting in self.waiting.values():
+                waiting.pop(cart_id, None)
+
+    def forget(self, cart_id):
+        """
+        Drops a released cart, which doesn't wait for any product anymore.
+        """
+        with self.lock:
+            self.priorities.pop(cart_id, None)
+            for waiting in self.waiting.values():
+                waiting.pop(cart_id, None)
+
+    def latency_stats(self):
+        """
+        :returns a dictionary with the summary of the latencies of every priority
+        """
+        with self.lock:
+            return {priority: latencies.summary()
+                    for priority, latencies in sorted(self.latencies.items())}
+
+
+class FirstComeAllocator(Allocator):
+    """
+    Lets every cart try to take the product, so it goes to whoever calls first, as before.
+    """
+
+    def admit(self, cart_id, product, inventory, now=None):
+        return True
+
+
+class PriorityAllocator(Allocator):
+    """
+    Keeps the scarce products for the carts with the highest priorities: a cart may only
+    take a product if the stock is larger than the number of waiting carts that outrank it.
+    To avoid starvation, a cart's priority grows by one for every aging seconds it waits,
+    so a cart that waited long enough outranks the new ones of any class. A cart that didn't
+    try again for stale_after seconds is assumed to have given up and stops waiting, so a
+    cart abandoned without placing its order doesn't keep the products from the others.
+    """
+
+    def __init__(self, aging=1.0, stale_after=5.0):
+        """
+        Constructor.
+
+        :type aging: Float
+        :param aging: the number of seconds of waiting that raise a cart's priority by one
+
+        :type stale_after: Float
+        :param stale_after: the number of seconds without a new try after which a cart
+        stops waiting
+        """
+        Allocator.__init__(self)
+        self.aging = aging
+        self.stale_after = stale_after
+
+    def effective_priority(self, cart_id, since, now):
+        """
+        :returns the priority of a cart that waits since the given time, with its aging
+        """
+        return self.priorities.get(cart_id, 0) + (now - since) / self.aging
+
+    def admit(self, cart_id, product, inventory, now=None):
+        if now is None:
+            now = monotonic()
+        with self.lock:
+            waiting = self.waiting.get(product)
+            if not waiting:
+                return True
+            for other_id in [other_id for other_id, (_, last_try) in waiting.items()
+                             if now - last_try > self.stale_after]:
+                del waiting[other_id]
+            priority = self.effective_priority(cart_id, waiting.get(cart_id, [now])[0], now)
+            ahead = sum(1 for other_id, (since, _) in waiting.items() if other_id != cart_id and
+                        self.effective_priority(other_id, since, now) > priority)
+        return ahead < inventory.stock(product)
+
+
+# the allocators, by name
+ALLOCATORS = {
+    "first-come": FirstComeAllocator,
+    "priority": PriorityAllocator,
+}
+
+
+def make_allocator(allocator):
+    """
+    :type allocator: String or Allocator
+    :param allocator: the name of an allocator or the allocator itself
+
+    :returns the allocator
+    """
+    if isinstance(allocator, Allocator):
+        return allocator
+    if allocator not in ALLOCATORS:
+        raise ValueError("unknown allocator " + repr(allocator) + "; choose one of " +
+                         ", ".join(ALLOCATORS))
+    return ALLOCATORS[allocator]()
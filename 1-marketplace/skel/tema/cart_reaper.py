@@ -0,0 +1,156 @@
+"""
+This module represents the CartReaper.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from functools import partial
+from heapq import heappush, heappop
+from threading import Condition, Thread
+from time import monotonic
+
+
+
+class CartReaper(Thread):
+    """
+    Thread that expires the carts with a time to live: when a cart had no activity for
+    its ttl, the products in it are returned to their producers' buffers.
+    The deadlines are kept in a heap. Touching a cart only updates its deadline in a
+    dictionary; when the old heap entry comes up, it is pushed back with the new
+    deadline, so every operation on the heap is O(log n) and the hot paths never wait
+    for the reaper.
+    """
+
+    def __init__(self, marketplace):
+        """
+        Constructor.
+
+        :type marketplace: Marketplace
+        :param marketplace: a reference to the marketplace
+        """
+        Thread.__init__(self, name="cart-reaper", daemon=True)
+        self.marketplace = marketplace
+
+        # the ttl of every tracked cart
+        self.ttls = {}
+        # the current deadline of every armed cart, as a [deadline] list that can be
+        # updated in place without the condition
+        self.deadlines = {}
+        # heap of (deadline, cart_id) tuples; an entry may be older than the deadline
+        self.deadlines_heap = []
+
+        # condition guarding the fields above; the reaper waits on it
+        self.condition = Condition()
+        self.stopped = False
+
+    def track(self, cart_id, ttl):
+        """
+        Starts tracking a cart.
+
+        :type cart_id: Int
+        :param cart_id: id cart
+
+        :type ttl: Float
+        :param ttl: the number of seconds without activity after which the cart expires
+        """
+        with self.condition:
+            self.ttls[cart_id] = ttl
+            self.arm(cart_id)
+
+    def arm(self, cart_id):
+        """
+        Sets the deadline of a cart. The caller must hold the condition.
+
+        :type cart_id: Int
+        :param cart_id: id cart
+        """
+        deadline = monotonic() + self.ttls[cart_id]
+        self.deadlines[cart_id] = [deadline]
+        heappush(self.deadlines_heap, (deadline, cart_id))
+        if self.deadlines_heap[0][1] == cart_id:
+            self.condition.notify()
+
+    def touch(self, cart_id):
+        """
+        Postpones the deadline of a cart after some activity. An expired cart is armed
+        again, since it may hold new products.
+
+        :type cart_id: Int
+        :param cart_id: id cart
+        """
+        deadline = self.deadlines.get(cart_id)
+        if deadline is not None:
+            deadline[0] = monotonic() + self.ttls[cart_id]
+        elif cart_id in self.ttls:
+            with self.condition:
+                if cart_id in self.ttls and cart_id not in self.deadlines:
+                    self.arm(cart_id)
+
+    def forget(self, cart_id):
+        """
+        Stops tracking a cart; its heap entry is dropped when it comes up.
+
+        :type cart_id: Int
+        :param cart_id: id cart
+        """
+        with self.condition:
+            self.ttls.pop(cart_id, None)
+            self.deadlines.pop(cart_id, None)
+
+    def still_expired(self, cart_id):
+        """
+        Checks, right before a cart is emptied, that it wasn't touched, forgotten or tracked
+        again since it expired, e.g. because its order was placed or its id was reused.
+
+        :type cart_id: Int
+        :param cart_id: id cart
+        """
+        with self.condition:
+            return cart_id in self.ttls and cart_id not in self.deadlines
+
+    def stop(self):
+        """
+        Stops the reaper.
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    def next_expired_cart(self):
+        """
+        Blocks until a cart expires and returns its id.
+
+        :returns the id or None, if the reaper was stopped
+        """
+        with self.condition:
+            while not self.stopped:
+                if not self.deadlines_heap:
+                    self.condition.wait()
+                    continue
+                heap_deadline, cart_id = self.deadlines_heap[0]
+                now = monotonic()
+                if heap_deadline > now:
+                    self.condition.wait(heap_deadline - now)
+                    continue
+
+                heappop(self.deadlines_heap)
+                deadline = self.deadlines.get(cart_id)
+                if deadline is None or deadline[0] > heap_deadline:
+                    # the cart was forgotten or touched since this entry was pushed
+                    if deadline is not None:
+                        heappush(self.deadlines_heap, (deadline[0], cart_id))
+                    continue
+                del self.deadlines[cart_id]
+                return cart_id
+        return None
+
+    def run(self):
+        while True:
+            cart_id = self.next_expired_cart()
+            if cart_id is None:
+                return
+            # the cart is checked again under its lock, since the consumer may have used it
+            # after it expired here
+            self.marketplace.expire_cart(cart_id, partial(self.still_expired, cart_id))
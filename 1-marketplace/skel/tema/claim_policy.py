@@ -0,0 +1,126 @@
+"""
+This module offers the policies used by the Marketplace to choose the producer's buffer
+a product is taken from.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from itertools import count
+import random
+
+
+class ClaimPolicy:
+    """
+    Class that represents a claim policy. add_to_cart tries the producers in the order
+    returned by candidates, until it takes the product from one of them.
+    """
+
+    def candidates(self, inventory, product):
+        """
+        :type inventory: Inventory
+        :param inventory: the marketplace's inventory, with the index of the producers
+        that have each product
+
+        :type product: Product
+        :param product: the product to add to a cart
+
+        :returns a list with the ids of the producers to try, in order
+        """
+        raise NotImplementedError
+
+
+class FirstProducerPolicy(ClaimPolicy):
+    """
+    Takes the product from the producer with the lowest id, like the original scan of the
+    producers' buffers did.
+    """
+
+    def candidates(self, inventory, product):
+        return sorted(inventory.producers_with(product))
+
+
+class FullFirstPolicy(ClaimPolicy):
+    """
+    Takes the product from the producers whose buffers are full first, so that the
+    producers that are blocked get to publish again, and otherwise from the lowest id.
+    Ranking all the buffers by how full they are spreads the claims over them and keeps
+    every buffer nearly full; then the producers whose next products are wanted never get
+    to publish them, and the consumers wait for good. Draining the lowest ids, like
+    "first", lets some producers go through their whole list of products.
+    """
+
+    def candidates(self, inventory, product):
+        queue_size = inventory.queue_size_per_producer
+        producer_counts = inventory.producer_counts
+        return sorted(inventory.producers_with(product),
+                      key=lambda producer_id: (producer_counts[producer_id] < queue_size,
+                                               producer_id))
+
+
+class RoundRobinPolicy(ClaimPolicy):
+    """
+    Takes each product from the producers that have it in turn.
+    """
+
+    def __init__(self):
+        # the number of claims of each product so far
+        self.claims_counters = {}
+
+    def candidates(self, inventory, product):
+        producer_ids = sorted(inventory.producers_with(product))
+        if not producer_ids:
+            return producer_ids
+        # next on a count is atomic, so concurrent claims get different turns
+        turn = next(self.claims_counters.setdefault(product, count())) % len(producer_ids)
+        return producer_ids[turn:] + producer_ids[:turn]
+
+
+class RandomKPolicy(ClaimPolicy):
+    """
+    Picks k random producers that have the product and takes it from the fullest of them
+    (the power of k choices), which balances the buffers without sorting all of them.
+    """
+
+    def __init__(self, k=2):
+        """
+        Constructor.
+
+        :type k: Int
+        :param k: the number of random producers to compare
+        """
+        self.k = k
+
+    def candidates(self, inventory, product):
+        producer_ids = inventory.producers_with(product)
+        random.shuffle(producer_ids)
+        producer_counts = inventory.producer_counts
+        # the other producers are still tried, if the chosen ones were emptied meanwhile
+        chosen = sorted(producer_ids[:self.k],
+                        key=lambda producer_id: -producer_counts[producer_id])
+        return chosen + producer_ids[self.k:]
+
+
+# the claim policies, by name
+CLAIM_POLICIES = {
+    "first": FirstProducerPolicy,
+    "full-first": FullFirstPolicy,
+    "round-robin": RoundRobinPolicy,
+    "random-k": RandomKPolicy,
+}
+
+
+def make_claim_policy(claim_policy):
+    """
+    :type claim_policy: String or ClaimPolicy
+    :param claim_policy: the name of a claim policy or the policy itself
+
+    :returns the claim policy
+    """
+    if isinstance(claim_policy, ClaimPolicy):
+        return claim_policy
+    if claim_policy not in CLAIM_POLICIES:
+        raise ValueError("unknown claim policy " + repr(claim_policy) + "; choose one of " +
+                         ", ".join(CLAIM_POLICIES))
+    return CLAIM_POLICIES[claim_policy]()
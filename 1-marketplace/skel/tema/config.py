@@ -0,0 +1,47 @@
+"""
+This module reads the market configuration from a test file
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from json import loads
+
+from .product import make_product
+
+
+def load_market_config(filename):
+    """
+    Convert the market_configuration input file into the arguments of the models:
+    Producer, Consumer, Marketplace
+
+    :type filename: String
+    :param filename: the path of the input file
+
+    :returns the market configuration, with product ids replaced by the actual products
+    """
+    with open(filename) as input_file:
+        market_config = loads(input_file.read())
+
+    # turn product definitions into actual products
+    products = {}
+
+    for k, products_dict in market_config['products'].items():
+        params = {k: products_dict[k] for k in products_dict.keys() if k != 'product_type'}
+        products[k] = make_product(products_dict['product_type'], params)
+    del market_config['products']
+
+    # turn product ids into products in producers
+    for producer in market_config['producers']:
+        producer['products'] = [(products[i], quantity, sleep_time)
+                                for i, quantity, sleep_time
+                                in producer['products']]
+
+    # turn product ids into products in consumer order lists and expected carts
+    for consumer in market_config['consumers']:
+        for cart in consumer['carts']:
+            for operation in cart:
+                operation['product'] = products[operation['product']]
+
+    return market_config
@@ -8,13 +8,15 @@ March 2021
 
 from threading import Thread
 from time import sleep
+import random
 
 class Consumer(Thread):
     """
     Class that represents a consumer.
     """
 
-    def __init__(self, carts, marketplace, retry_wait_time, **kwargs):
+    def __init__(self, carts, marketplace, retry_wait_time, cart_ttl=None, backoff="fixed",
+                 priority=0, **kwargs):
         """
         Constructor.
 
@@ -28,6 +30,18 @@ class Consumer(Thread):
         :param retry_wait_time: the number of seconds that a producer must wait
         until the Marketplace becomes available
 
+        :type cart_ttl: Time
+        :param cart_ttl: if given, the number of seconds without activity after which
+        the consumer's cart expires and its products go back to the producers
+
+        :type backoff: String
+        :param backoff: how long to wait after a failed add_to_cart: "fixed", always
+        retry_wait_time; "exponential", doubling with every failure, with jitter; "expected",
+        until the next arrival of the product expected by the marketplace
+
+        :type priority: Int
+        :param priority: the priority of the consumer's carts
+
         :type kwargs:
         :param kwargs: other arguments that are passed to the Thread's __init__()
         """
@@ -35,12 +49,39 @@ class Consumer(Thread):
         self.carts = carts
         self.marketplace = marketplace
         self.retry_wait_time = retry_wait_time
-        # get id for the cart
-        self.cart_id = marketplace.new_cart()
+        self.cart_ttl = cart_ttl
+        self.priority = priority
+        self.backoff = backoff
+        # the number of failed add_to_cart calls
+        self.failed_count = 0
+        # get id for the cart of the first cart script
+        self.cart_id = marketplace.new_cart(cart_ttl, priority)
 
     def run(self):
-        # for the cart, get the relevant fields
-        for cart in self.carts:
+        # every time the cart script can't make progress, wait and then resume it
+        for wait_time in self.cart_script():
+            sleep(wait_time)
+
+    def cart_script(self):
+        """
+        Generator that goes through the consumer's carts. Every time a product can't be
+        added to the cart yet, it yields the number of seconds to wait and expects to be
+        resumed once the consumer waited. Every cart script runs in a cart of its own: when
+        it is done, the order is placed and printed and the cart is released, so a cart
+        never holds more than one script's products and its id is reused. The consumer
+        keeps count of what the cart should hold: if the cart expired, its order misses
+        the products that were returned, so they are added again and the order is placed
+        once more.
+        This lets the same script run either on the consumer's own thread or as a task
+        of a ConsumerPool.
+        """
+        for index, cart in enumerate(self.carts):
+            # the first script uses the cart created with the consumer
+            if index > 0:
+                self.cart_id = self.marketplace.new_cart(self.cart_ttl, self.priority)
+            # the quantity of each product the cart should hold
+            expected = {}
+            # for the cart, get the relevant fields
             for field in cart:
                 field_type = field["type"]
                 field_product = field["product"]
@@ -50,18 +91,85 @@ class Consumer(Thread):
                 # the given amount of each product
                 if field_type == "add":
                     for _ in range(field_quantity):
-                        while True:
-                            # if we can add
-                            if self.marketplace.add_to_cart(self.cart_id, field_product):
-                                break
-                            # otherwise, wait and try again
-                            sleep(self.retry_wait_time)
+                        yield from self.add_product(field_product)
+                        expected[field_product] = expected.get(field_product, 0) + 1
                 elif field_type == "remove":
                     for _ in range(field_quantity):
                         # remove the product from the cart
                         self.marketplace.remove_from_cart(self.cart_id, field_product)
+                        if expected.get(field_product):
+                            expected[field_product] -= 1
 
-        # finally, place the order and print the result
-        with self.marketplace.lock_print_cart:
-            for product in self.marketplace.place_order(self.cart_id):
-                print(self.name + " bought " + str(product))
+            # place the order; if the cart expired meanwhile, get the products again
+            order = self.marketplace.place_order(self.cart_id, aggregated=True)
+            while self.marketplace.cart_expired(self.cart_id):
+                yield from self.restore_cart(expected, order)
+                order = self.marketplace.place_order(self.cart_id, aggregated=True)
+
+            # print the result, a line for each unit, then free the cart
+            with self.marketplace.lock_print_cart:
+                for product, quantity in order.quantities.items():
+                    print((self.name + " bought " + str(product) + "\n") * quantity, end="")
+            self.marketplace.release_cart(self.cart_id)
+
+    def add_product(self, product):
+        """
+        Generator that adds a unit of a product to the cart; while it can't, it yields
+        the number of seconds to wait before trying again.
+
+        :type product: Product
+        :param product: the product to add
+        """
+        failures = 0
+        while not self.marketplace.add_to_cart(self.cart_id, product):
+            self.failed_count += 1
+            yield self.retry_delay(product, failures)
+            failures += 1
+
+    def restore_cart(self, expected, order):
+        """
+        Generator that brings an expired cart back to what it should hold: it adds again
+        the products the cart lost and removes the ones it holds over the expected
+        quantities. While a product can't be added, it yields the number of seconds to wait.
+
+        :type expected: Dict
+        :param expected: the quantity of each product the cart should hold
+
+        :type order: Order
+        :param order: the order placed from the expired cart
+        """
+        for product in set(expected) | set(order.quantities):
+            missing = expected.get(product, 0) - order.quantities.get(product, 0)
+            for _ in range(missing):
+                yield from self.add_product(product)
+            for _ in range(-missing):
+                self.marketplace.remove_from_cart(self.cart_id, product)
+
+    def retry_delay(self, product, failures):
+        """
+        Returns the number of seconds to wait after a failed add_to_cart, depending on
+        the backoff. The exponential backoff doubles the retry_wait_time with every
+        failure, up to 8 times, and waits a random time between half of it and all of it,
+        so the consumers that failed together don't retry together. The expected backoff
+        waits until the next arrival of the product, as estimated by the marketplace from
+        the recent arrivals; when the estimate is overdue, the wait starts from an eighth
+        of the retry_wait_time and doubles with every failure, up to the same cap.
+
+        :type product: Product
+        :param product: the product that couldn't be added
+
+        :type failures: Int
+        :param failures: the number of failures to add the product before this one
+        """
+        max_wait_time = self.retry_wait_time * 8
+        if self.backoff == "exponential":
+            # past the cap, the exponent would only overflow
+            wait_time = self.retry_wait_time * 2 ** min(failures, 3)
+            return random.uniform(wait_time / 2, wait_time)
+        if self.backoff == "expected":
+            expected_wait = self.marketplace.expected_arrival(product)
+            if expected_wait is None:
+                return self.retry_wait_time
+            min_wait_time = self.retry_wait_time / 8 * 2 ** min(failures, 6)
+            return min(max(expected_wait, min_wait_time), max_wait_time)
+        return self.retry_wait_time
@@ -0,0 +1,139 @@
+"""
+This module represents the ConsumerPool.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
+from threading import Condition, Thread
+from time import monotonic
+import traceback
+
+
+class ConsumerPool:
+    """
+    Executor that runs the consumers' cart scripts as lightweight tasks on a fixed
+    number of worker threads, instead of one thread per consumer. A task that can't
+    add a product to its cart is parked for the wait time it yields, without keeping a
+    worker busy, and then resumed by the first free worker.
+    """
+
+    def __init__(self, num_workers):
+        """
+        Constructor.
+
+        :type num_workers: Int
+        :param num_workers: the number of worker threads that run the tasks
+        """
+        self.num_workers = num_workers
+
+        # tasks that can make progress, as (consumer, cart script) tuples
+        self.ready_tasks = deque()
+        # heap of parked tasks, as (wake up time, sequence number, task) tuples;
+        # the sequence number keeps the heap from comparing the tasks
+        self.parked_tasks = []
+        self.parked_counter = count()
+
+        # number of submitted tasks that didn't finish yet
+        self.unfinished_tasks = 0
+        # set by join, once all the tasks are done, so that the workers exit
+        self.shutting_down = False
+
+        # condition guarding the fields above; the workers wait on it
+        self.condition = Condition()
+        self.workers = []
+
+    def submit(self, consumer):
+        """
+        Adds a consumer's cart script to the pool. The consumer must not be started
+        as a thread.
+
+        :type consumer: Consumer
+        :param consumer: the consumer whose carts will be run
+        """
+        with self.condition:
+            self.ready_tasks.append((consumer, consumer.cart_script()))
+            self.unfinished_tasks += 1
+            self.condition.notify()
+
+    def start(self):
+        """
+        Starts the worker threads.
+        """
+        for i in range(self.num_workers):
+            worker = Thread(target=self.worker_loop, name="consumer-worker-" + str(i))
+            self.workers.append(worker)
+            worker.start()
+
+    def join(self):
+        """
+        Waits until all the submitted tasks are done, then stops the workers.
+        """
+        with self.condition:
+            while self.unfinished_tasks > 0:
+                self.condition.wait()
+            self.shutting_down = True
+            self.condition.notify_all()
+        for worker in self.workers:
+            worker.join()
+
+    def next_task(self):
+        """
+        Blocks until a task is ready to run and returns it, moving the parked tasks
+        whose waiting time passed to the ready queue.
+
+        :returns the task or None, if the pool is shutting down
+        """
+        with self.condition:
+            while True:
+                now = monotonic()
+                while self.parked_tasks and self.parked_tasks[0][0] <= now:
+                    self.ready_tasks.append(heappop(self.parked_tasks)[2])
+                if self.ready_tasks:
+                    return self.ready_tasks.popleft()
+                if self.shutting_down:
+                    return None
+                # sleep until the earliest parked task is due or a new task arrives
+                timeout = self.parked_tasks[0][0] - now if self.parked_tasks else None
+                self.condition.wait(timeout)
+
+    def worker_loop(self):
+        """
+        Runs tasks until the pool shuts down. A task runs until its cart script either
+        blocks, in which case it is parked, or finishes.
+        """
+        while True:
+            task = self.next_task()
+            if task is None:
+                return
+            script = task[1]
+
+            try:
+                wait_time = next(script)
+            except StopIteration:
+                self.finish_task()
+                continue
+            except Exception:  # pylint: disable=broad-except
+                # report it like an uncaught exception in a consumer thread would be
+                traceback.print_exc()
+                self.finish_task()
+                continue
+
+            # the script is waiting for a product; park it instead of sleeping
+            with self.condition:
+                heappush(self.parked_tasks, (monotonic() + wait_time,
+                                             next(self.parked_counter), task))
+                self.condition.notify()
+
+    def finish_task(self):
+        """
+        Marks a task as done and wakes up join if it was the last one.
+        """
+        with self.condition:
+            self.unfinished_tasks -= 1
+            if self.unfinished_tasks == 0:
+                self.condition.notify_all()
@@ -0,0 +1,99 @@
+"""
+This module represents the Demand the Marketplace sees for its products.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from .rate_estimator import RateEstimator
+
+
+def rate_estimator(rates, key):
+    """
+    :type rates: Dict
+    :param rates: the RateEstimators, by key
+
+    :returns the RateEstimator of a key, which is created if it is new, e.g. for a producer
+    registered by another process sharing the storage
+    """
+    rate = rates.get(key)
+    if rate is None:
+        # setdefault, so that a concurrent first record doesn't replace another estimator
+        rate = rates.setdefault(key, RateEstimator())
+    return rate
+
+
+class Demand:
+    """
+    Class that keeps what the Marketplace learns about the demand and the supply: the rate
+    at which the consumers take products from each buffer, the rate at which each product
+    becomes available and the carts that failed to get each product and still wait for it.
+    The producers use them to adapt their backoff and the consumers to know how long to
+    wait. Like the RateEstimators, they are not locked.
+    """
+
+    def __init__(self):
+        # estimates of the rate at which the consumers take products from each buffer
+        self.drain_rates = {}
+        # estimates of the rate at which each product becomes available
+        self.arrival_rates = {}
+        # for every product, the ids of the carts that failed to get it and still wait
+        self.waiting_carts = {}
+
+    def drained(self, producer_id):
+        """
+        Records that a consumer took a product from a producer's buffer.
+        """
+        rate_estimator(self.drain_rates, producer_id).record()
+
+    def arrived(self, product):
+        """
+        Records that a product was published or returned to a producer's buffer.
+        """
+        rate_estimator(self.arrival_rates, product).record()
+
+    def expected_drain(self, producer_id):
+        """
+        :returns the estimated number of seconds until a consumer takes a product from a
+        producer's buffer, or None if there were too few takes to know
+        """
+        return rate_estimator(self.drain_rates, producer_id).expected_wait()
+
+    def expected_arrival(self, product):
+        """
+        :returns the estimated number of seconds until a product becomes available again,
+        or None if there were too few arrivals to know
+        """
+        arrival_rate = self.arrival_rates.get(product)
+        if arrival_rate is None:
+            return None
+        return arrival_rate.expected_wait()
+
+    def wait(self, cart_id, product):
+        """
+        Records that a cart failed to get a product and waits for it.
+        """
+        self.waiting_carts.setdefault(product, set()).add(cart_id)
+
+    def served(self, cart_id, product):
+        """
+        Records that a cart got a product it may have waited for.
+        """
+        waiting_carts = self.waiting_carts.get(product)
+        if waiting_carts:
+            waiting_carts.discard(cart_id)
+
+    def stop_waiting(self, cart_id):
+        """
+        Records that a cart doesn't wait for any product anymore, e.g. once its order is
+        placed, so it doesn't count in the demand.
+        """
+        for waiting_carts in list(self.waiting_carts.values()):
+            waiting_carts.discard(cart_id)
+
+    def waiting_count(self, product):
+        """
+        :returns the number of carts that wait for a product
+        """
+        return len(self.waiting_carts.get(product, ()))
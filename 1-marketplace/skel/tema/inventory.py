@@ -0,0 +1,240 @@
+"""
+This module represents the Inventory.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from threading import Lock
+
+
+class Inventory:
+    """
+    Counters of the products in the producers' buffers, updated incrementally by the
+    Marketplace every time a product enters or leaves a buffer, so that the stock can
+    be queried without walking the buffers or taking their locks.
+    The products are also kept in buckets by their count, linked in the order of the
+    counts (like in an LFU cache), so that a count changes in O(1) and the top n
+    products are found in O(n). For every product, it also indexes the producers that
+    have it in their buffers, which the claim policies use to pick the buffer to take
+    a product from.
+    The producers' counters and the products' counters have their own locks, which only
+    the updates take. The queries take no lock: the dictionaries they copy or iterate
+    over are replaced instead of changed in place (copy on write), so a query never
+    sees one in the middle of an update and never blocks the publishers and consumers.
+    """
+
+    def __init__(self, queue_size_per_producer):
+        """
+        Constructor
+
+        :type queue_size_per_producer: Int
+        :param queue_size_per_producer: the maximum size of a queue associated with each producer
+        """
+        self.queue_size_per_producer = queue_size_per_producer
+
+        # number of items in each producer's buffer; a new producer replaces the dictionary
+        self.producer_counts = {}
+        self.total_count = 0
+        # lock for updating the producers' counters
+        self.producers_lock = Lock()
+
+        # number of items of each product
+        self.product_counts = {}
+        # for every product, the ids of the producers that have it, replaced when they
+        # change, and the number of its items in each of their buffers
+        self.product_producers = {}
+
+        # the products with each count, replaced when they change; the counts are linked
+        # from the lowest to the highest, each with its [lower, higher] neighbours and 0
+        # as the sentinel that is always there
+        self.count_buckets = {0: {}}
+        self.count_links = {0: [None, None]}
+        self.highest_count = 0
+        # lock for updating the products' counters
+        self.products_lock = Lock()
+
+    def add_producer(self, producer_id):
+        """
+        Starts counting the items in a new producer's buffer.
+
+        :type producer_id: Int
+        :param producer_id: producer id
+        """
+        with self.producers_lock:
+            producer_counts = dict(self.producer_counts)
+            producer_counts[producer_id] = 0
+            self.producer_counts = producer_counts
+
+    def added(self, producer_id, product):
+        """
+        Counts a product that entered a producer's buffer.
+
+        :type producer_id: Int
+        :param producer_id: producer id
+
+        :type product: Product
+        :param product: the product
+        """
+        with self.producers_lock:
+            self.producer_counts[producer_id] += 1
+            self.total_count += 1
+        with self.products_lock:
+            self.move_product(product, self.product_counts.get(product, 0), 1)
+            producer_ids, counts = self.product_producers.get(product, ((), {}))
+            if producer_id in counts:
+                counts[producer_id] += 1
+            else:
+                counts[producer_id] = 1
+                self.product_producers[product] = (producer_ids + (producer_id,), counts)
+
+    def removed(self, producer_id, product):
+        """
+        Counts a product that left a producer's buffer.
+
+        :type producer_id: Int
+        :param producer_id: producer id
+
+        :type product: Product
+        :param product: the product
+        """
+        with self.producers_lock:
+            self.producer_counts[producer_id] -= 1
+            self.total_count -= 1
+        with self.products_lock:
+            self.move_product(product, self.product_counts[product], -1)
+            _, counts = self.product_producers[product]
+            if counts[producer_id] > 1:
+                counts[producer_id] -= 1
+            else:
+                del counts[producer_id]
+                self.product_producers[product] = (tuple(counts), counts)
+
+    def move_product(self, product, count, step):
+        """
+        Moves a product from the bucket of its count to the neighbouring one, creating
+        it if needed and unlinking the old one if it was left empty. The caller must
+        hold the products' lock.
+
+        :type product: Product
+        :param product: the product
+
+        :type count: Int
+        :param count: the current count of the product
+
+        :type step: Int
+        :param step: 1 or -1, the change of the count
+        """
+        new_count = count + step
+        if new_count not in self.count_buckets:
+            # link the new bucket right above or right below the current one
+            if step > 0:
+                lower, higher = count, self.count_links[count][1]
+            else:
+                lower, higher = self.count_links[count][0], count
+            self.count_buckets[new_count] = {}
+            self.count_links[new_count] = [lower, higher]
+            self.count_links[lower][1] = new_count
+            if higher is None:
+                self.highest_count = new_count
+            else:
+                self.count_links[higher][0] = new_count
+
+        if new_count > 0:
+            bucket = dict(self.count_buckets[new_count])
+            bucket[product] = None
+            self.count_buckets[new_count] = bucket
+            self.product_counts[product] = new_count
+        else:
+            del self.product_counts[product]
+
+        if count > 0:
+            bucket = dict(self.count_buckets[count])
+            del bucket[product]
+            if bucket:
+                self.count_buckets[count] = bucket
+            else:
+                self.unlink_count(count)
+
+    def unlink_count(self, count):
+        """
+        Removes an empty bucket from the list of counts. The caller must hold the
+        products' lock. The bucket keeps its link to the lower count, so a query that
+        stands on it can go on down the list.
+
+        :type count: Int
+        :param count: the count of the bucket
+        """
+        lower, higher = self.count_links[count]
+        del self.count_buckets[count]
+        self.count_links[lower][1] = higher
+        if higher is None:
+            self.highest_count = lower
+        else:
+            self.count_links[higher][0] = lower
+
+    def stock(self, product):
+        """
+        :type product: Product
+        :param product: the product
+
+        :returns the number of items of the product in all the producers' buffers
+        """
+        return self.product_counts.get(product, 0)
+
+    def stock_by_producer(self):
+        """
+        :returns a dictionary with the number of items in each producer's buffer
+        """
+        # a new producer replaces the dictionary, so the copy never sees it grow
+        return dict(self.producer_counts)
+
+    def total_items(self):
+        """
+        :returns the number of items in all the producers' buffers
+        """
+        return self.total_count
+
+    def producers_with(self, product):
+        """
+        :type product: Product
+        :param product: the product
+
+        :returns a list with the ids of the producers that have the product in their
+        buffers, in no particular order
+        """
+        return list(self.product_producers.get(product, ((), None))[0])
+
+    def free_capacity(self, producer_id):
+        """
+        :type producer_id: Int
+        :param producer_id: producer id
+
+        :returns the number of products the producer can still publish
+        """
+        return max(self.queue_size_per_producer - self.producer_counts[producer_id], 0)
+
+    def top_products(self, num_products):
+        """
+        :type num_products: Int
+        :param num_products: the number of products to return
+
+        :returns a list with the (product, count) tuples of the products with the most
+        items in stock, from the highest count to the lowest; the counts that change
+        during the call may be seen before or after the change
+        """
+        top = []
+        listed = set()
+        count = self.highest_count
+        # every link goes to a lower count, even the ones of the buckets unlinked meanwhile
+        while count and len(top) < num_products:
+            for product in self.count_buckets.get(count, ()):
+                # a product that moved down during the walk is only listed once
+                if product not in listed:
+                    listed.add(product)
+                    top.append((product, count))
+                    if len(top) == num_products:
+                        break
+            count = self.count_links[count][0]
+        return top
@@ -0,0 +1,593 @@
+"""
+This module analyses the marketplace.log files. It streams the rotated files, from the
+oldest backup to the current file, a line at a time, and counts the calls of every
+method, how many of them failed and the activity of every producer and cart. With NumPy
+installed, NumpyLogAnalyser parses the big logs a chunk at a time instead.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from calendar import timegm
+import os
+import re
+from time import strftime, strptime, gmtime
+
+try:
+    import numpy
+except ImportError:
+    # only NumpyLogAnalyser needs it
+    numpy = None
+
+# every line starts with the time and the level, e.g. "21/04/2023 07:01:15 PM - INFO - ",
+# so the message starts at a fixed offset
+TIMESTAMP_LENGTH = 22
+MESSAGE_OFFSET = 32
+TIMESTAMP_FORMAT = "%d/%m/%Y %I:%M:%S %p"
+CALLED = "Called "
+DONE_CALLING = "Done calling "
+# the outcomes of the calls that failed contain one of these
+FAILURE_MARKERS = ("failed", "not found")
+
+METHOD = re.compile(r"\w+")
+PRODUCER_ID = re.compile(r"producer_id = (\d+)")
+CART_ID = re.compile(r"cart_id = (\d+)")
+
+# the masks that keep the first 0 to 8 bytes of a little-endian word, and the bytes of
+# the methods' names and of the ids, for NumpyLogAnalyser
+WORD_MASKS = None if numpy is None else \
+    numpy.array([(1 << (8 * length)) - 1 for length in range(9)], dtype=numpy.uint64)
+WORD_BYTES = None if numpy is None else numpy.isin(numpy.arange(256), list(
+    b"0123456789_abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+DIGIT_BYTES = None if numpy is None else numpy.isin(numpy.arange(256), list(b"0123456789"))
+
+
+def rotated_files(filename, backup_count=10):
+    """
+    :type filename: String
+    :param filename: the path of the current log file
+
+    :type backup_count: Int
+    :param backup_count: the number of backups kept by the RotatingFileHandler
+
+    :returns the paths of the existing log files, from the oldest backup to the current file
+    """
+    filenames = [filename + "." + str(index) for index in range(backup_count, 0, -1)]
+    filenames.append(filename)
+    return [filename for filename in filenames if os.path.exists(filename)]
+
+
+class LogAnalyser:
+    """
+    Class that collects the statistics of the log lines it is fed. It keeps counters per
+    method, per producer and per cart, so its memory doesn't grow with the log. The log
+    has no thread names, so a "Done calling" line can't be matched to its call; the
+    outcomes are counted per method instead.
+    """
+
+    def __init__(self):
+        # the lines read; the ones that aren't calls, e.g. of a traceback, are skipped
+        self.lines = 0
+        # for every method, the number of calls, of finished calls and of each failure
+        self.calls = {}
+        self.done = {}
+        self.failures = {}
+        # for every producer and cart, the number of calls of each method
+        self.activity = {"producers": {}, "carts": {}}
+        # the first second, the second being read, the calls of each method in it and the
+        # busiest second of each method
+        self.first_time = None
+        self.timestamp = None
+        self.active_seconds = 0
+        self.second_calls = {}
+        self.peak_rates = {}
+
+    def feed(self, line):
+        """
+        Counts a log line.
+
+        :type line: String
+        :param line: a line of marketplace.log
+        """
+        self.lines += 1
+        message = line[MESSAGE_OFFSET:]
+        if message.startswith(CALLED):
+            self.tick(line[:TIMESTAMP_LENGTH])
+            method = METHOD.match(message, len(CALLED)).group()
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.second_calls[method] = self.second_calls.get(method, 0) + 1
+            match = PRODUCER_ID.search(message)
+            if match:
+                self.count_activity("producers", int(match.group(1)), method)
+            match = CART_ID.search(message)
+            if match:
+                self.count_activity("carts", int(match.group(1)), method)
+        elif message.startswith(DONE_CALLING):
+            self.tick(line[:TIMESTAMP_LENGTH])
+            method = METHOD.match(message, len(DONE_CALLING)).group()
+            self.done[method] = self.done.get(method, 0) + 1
+            # the outcome follows the method, e.g. "publish; buffer full, failed to add."
+            outcome = message[len(DONE_CALLING) + len(method) + 2:].rstrip().rstrip(".")
+            if any(marker in outcome for marker in FAILURE_MARKERS):
+                failures = self.failures.setdefault(method, {})
+                failures[outcome] = failures.get(outcome, 0) + 1
+
+    def feed_file(self, filename):
+        """
+        Counts the lines of a log file.
+
+        :type filename: String
+        :param filename: the path of the log file
+        """
+        with open(filename, encoding="utf-8", errors="replace") as log_file:
+            for line in log_file:
+                self.feed(line)
+
+    def tick(self, timestamp):
+        """
+        Moves to the second of a line. The lines are in order, so the time is only parsed
+        when the second changes.
+        """
+        if timestamp == self.timestamp:
+            return
+        self.timestamp = timestamp
+        self.end_second()
+        if self.first_time is None:
+            self.first_time = timegm(strptime(timestamp, TIMESTAMP_FORMAT))
+        self.active_seconds += 1
+
+    def end_second(self):
+        """
+        Keeps the calls of the second that ended if it was the busiest one of their method.
+        """
+        for method, count in self.second_calls.items():
+            if count > self.peak_rates.get(method, 0):
+                self.peak_rates[method] = count
+        self.second_calls.clear()
+
+    def count_activity(self, kind, entity_id, method):
+        """
+        Counts a call of a method for a producer or a cart.
+
+        :type kind: String
+        :param kind: "producers" or "carts"
+        """
+        counts = self.activity[kind].setdefault(entity_id, {})
+        counts[method] = counts.get(method, 0) + 1
+
+    def report(self):
+        """
+        :returns a dictionary with the statistics: for every method, the calls, the calls
+        per second of activity and in the busiest second, the failures by outcome and
+        their ratio to the finished calls; for every producer and cart, its calls
+        """
+        self.end_second()
+        methods = {}
+        for method in sorted(set(self.calls) | set(self.done)):
+            done = self.done.get(method, 0)
+            failures = self.failures.get(method, {})
+            methods[method] = {
+                "calls": self.calls.get(method, 0),
+                "done": done,
+                "rate": self.calls.get(method, 0) / max(self.active_seconds, 1),
+                "peak_rate": self.peak_rates.get(method, 0),
+                "failures": failures,
+                "failure_ratio": sum(failures.values()) / done if done else 0.0,
+            }
+        last_time = None if self.timestamp is None else \
+            timegm(strptime(self.timestamp, TIMESTAMP_FORMAT))
+        return {
+            "lines": self.lines,
+            "skipped_lines": self.lines - sum(self.calls.values()) - sum(self.done.values()),
+            "start": None if self.first_time is None else
+                     strftime("%Y-%m-%d %H:%M:%S", gmtime(self.first_time)),
+            "end": None if last_time is None else
+                   strftime("%Y-%m-%d %H:%M:%S", gmtime(last_time)),
+            "active_seconds": self.active_seconds,
+            "methods": methods,
+            "producers": {key: dict(sorted(counts.items())) for key, counts in
+                          sorted(self.activity["producers"].items())},
+            "carts": {key: dict(sorted(counts.items())) for key, counts in
+                      sorted(self.activity["carts"].items())},
+        }
+
+
+def group(columns):
+    """
+    :type columns: List
+    :param columns: arrays of the same length, whose rows are the keys
+
+    :returns the index of the first row of every distinct key and, for every row, the
+    number of its key
+    """
+    order = numpy.lexsort(columns)
+    new = numpy.zeros(len(order), dtype=bool)
+    new[:1] = True
+    for column in columns:
+        column = column[order]
+        new[1:] |= column[1:] != column[:-1]
+    keys = numpy.empty(len(order), dtype=numpy.int64)
+    keys[order] = numpy.cumsum(new) - 1
+    return order[new], keys
+
+
+def add_counts(counts, totals, names):
+    """
+    Adds the totals of the codes to the counts of their names.
+
+    :type counts: Dict
+    :param counts: the counts, by name
+
+    :type totals: numpy.ndarray
+    :param totals: the total of every code
+    """
+    for code, count in enumerate(totals):
+        if count:
+            counts[names[code]] = counts.get(names[code], 0) + int(count)
+
+
+class LogChunk:
+    """
+    Class that holds whole lines of a log, as bytes, and parses them with NumPy: it finds
+    the lines, compares, scans and groups the bytes at arrays of offsets. The words of the
+    chunk are the little-endian words of the 8 bytes at every offset; they overlap, since
+    they are a view of the bytes, not a copy.
+    """
+
+    def __init__(self, data):
+        """
+        Constructor.
+
+        :type data: Bytes
+        :param data: whole lines, the last one ending with a newline
+        """
+        self.data = data
+        # zeros past the chunk, so that every offset of the chunk has a whole word
+        padded = data + bytes(8)
+        self.bytes = numpy.frombuffer(padded, dtype=numpy.uint8)
+        self.words = numpy.ndarray((len(data) + 1,), dtype="<u8", buffer=padded, strides=(1,))
+        self.ends = numpy.flatnonzero(self.bytes[:len(data)] == ord("\n"))
+        self.starts = numpy.concatenate(([0], self.ends[:-1] + 1))
+
+    def text(self, offset, length):
+        """
+        :returns the given bytes, decoded
+        """
+        return self.data[offset:offset + length].decode(errors="replace")
+
+    def line_of(self, offsets):
+        """
+        :returns the lines of the offsets
+        """
+        return numpy.searchsorted(self.starts, offsets, side="right") - 1
+
+    def starting_with(self, prefix):
+        """
+        :returns a mask of the lines whose message starts with the prefix
+        """
+        prefix = prefix.encode()
+        mask = self.ends - self.starts >= MESSAGE_OFFSET + len(prefix)
+        for start in range(0, len(prefix), 8):
+            part = prefix[start:start + 8]
+            word = self.words[numpy.minimum(self.starts + MESSAGE_OFFSET + start,
+                                            len(self.words) - 1)]
+            mask &= word & WORD_MASKS[len(part)] == int.from_bytes(part, "little")
+        return mask
+
+    def find_all(self, pattern):
+        """
+        :returns the sorted offsets of every occurrence of the pattern
+        """
+        # a pair of bytes is much rarer than a byte, so few offsets are left to check
+        offsets = numpy.flatnonzero((self.bytes[:-1] == pattern[0]) &
+                                    (self.bytes[1:] == pattern[1]))
+        for index in range(2, len(pattern)):
+            offsets = offsets[self.bytes[numpy.minimum(offsets + index, len(self.bytes) - 1)]
+                              == pattern[index]]
+        return offsets
+
+    def run_lengths(self, offsets, table):
+        """
+        :type table: numpy.ndarray
+        :param table: for every byte value, whether it belongs to the run
+
+        :returns the lengths of the runs at the offsets, looked at a word at a time; the
+        newline ends every run
+        """
+        lengths = numpy.zeros(len(offsets), dtype=numpy.int64)
+        active = numpy.arange(len(offsets))
+        while active.size:
+            in_run = table[self.words[offsets[active] + lengths[active]].view(numpy.uint8)]
+            in_run = in_run.reshape(-1, 8)
+            run = numpy.where(in_run.all(axis=1), 8, numpy.argmin(in_run, axis=1))
+            lengths[active] += run
+            active = active[run == 8]
+        return lengths
+
+    def numbers(self, offsets, lengths):
+        """
+        :returns the values of the runs of digits of the given lengths at the offsets
+        """
+        values = numpy.zeros(len(offsets), dtype=numpy.int64)
+        for index in range(int(lengths.max(initial=0))):
+            rows = numpy.flatnonzero(lengths > index)
+            digits = self.bytes[offsets[rows] + index].astype(numpy.int64) - ord("0")
+            values[rows] = values[rows] * 10 + digits
+        return values
+
+    def first_numbers(self, offsets, text, mask):
+        """
+        :type offsets: numpy.ndarray
+        :param offsets: sorted offsets that may follow the text
+
+        :type text: Bytes
+        :param text: the text, e.g. b"producer_id = "
+
+        :type mask: numpy.ndarray
+        :param mask: a mask of the lines to look at
+
+        :returns the lines whose message has the text followed by digits and the value of
+        the first such digits in each of them
+        """
+        offsets = offsets[offsets >= len(text)]
+        for index, byte in enumerate(text):
+            offsets = offsets[self.bytes[offsets - len(text) + index] == byte]
+        lines = self.line_of(offsets)
+        lengths = self.run_lengths(offsets, DIGIT_BYTES)
+        found = (offsets - len(text) >= self.starts[lines] + MESSAGE_OFFSET) & \
+            (lengths > 0) & mask[lines]
+        lines, first = numpy.unique(lines[found], return_index=True)
+        return lines, self.numbers(offsets[found][first], lengths[found][first])
+
+    def containing(self, lines, offsets, texts):
+        """
+        :type lines: numpy.ndarray
+        :param lines: sorted lines
+
+        :type offsets: numpy.ndarray
+        :param offsets: an offset in each of them
+
+        :returns a mask of the lines whose bytes from the offset contain one of the texts
+        """
+        mask = numpy.zeros(len(lines), dtype=bool)
+        for text in texts:
+            found = self.find_all(text)
+            rows = numpy.searchsorted(self.starts[lines], found, side="right") - 1
+            found, rows = found[rows >= 0], rows[rows >= 0]
+            mask[rows[(found >= offsets[rows]) & (found < self.ends[lines[rows]])]] = True
+        return mask
+
+    def pack(self, offsets, lengths):
+        """
+        :returns a list of columns that together identify the lengths[i] bytes at every
+        offset: the lengths and the words, with the bytes past the lengths cleared
+        """
+        columns = [lengths.astype(numpy.uint64)]
+        rows = numpy.arange(len(offsets))
+        for start in range(0, int(lengths.max(initial=0)), 8):
+            # a few long rows, e.g. the items of an order, don't cost a word for every row
+            rows = rows[lengths[rows] > start]
+            column = numpy.zeros(len(offsets), dtype=numpy.uint64)
+            column[rows] = self.words[offsets[rows] + start] & \
+                WORD_MASKS[numpy.minimum(lengths[rows] - start, 8)]
+            columns.append(column)
+        return columns
+
+
+class NumpyLogAnalyser(LogAnalyser):
+    """
+    LogAnalyser for the multi-GB logs: it reads the files in chunks of bytes and parses
+    every chunk with NumPy, without Python work per line. The kinds of the lines, their
+    seconds, methods, outcomes and ids come from array operations on the offsets of the
+    lines, and only the distinct methods and failures are decoded. Its memory grows with
+    the chunk, not with the log, and its report is the one of LogAnalyser.
+    """
+
+    def __init__(self, chunk_size=1 << 20):
+        """
+        Constructor.
+
+        :type chunk_size: Int
+        :param chunk_size: the number of bytes read at a time
+        """
+        if numpy is None:
+            raise ImportError("NumpyLogAnalyser needs NumPy")
+        LogAnalyser.__init__(self)
+        self.chunk_size = chunk_size
+
+    def feed_file(self, filename):
+        with open(filename, "rb") as log_file:
+            rest = b""
+            while True:
+                data = log_file.read(self.chunk_size)
+                if not data:
+                    break
+                data = rest + data
+                # a line cut by the end of the chunk is parsed with the next one
+                end = data.rfind(b"\n") + 1
+                rest = data[end:]
+                if end:
+                    self.feed_chunk(LogChunk(data[:end]))
+            if rest:
+                self.feed_chunk(LogChunk(rest + b"\n"))
+
+    def feed_chunk(self, chunk):
+        """
+        Counts the lines of a chunk.
+
+        :type chunk: LogChunk
+        :param chunk: the chunk
+        """
+        self.lines += len(chunk.starts)
+        called = chunk.starting_with(CALLED)
+        done = chunk.starting_with(DONE_CALLING)
+        lines = numpy.flatnonzero(called | done)
+        if not lines.size:
+            return
+
+        # the methods of the calls, numbered in the order of their keys
+        method_starts = chunk.starts[lines] + MESSAGE_OFFSET + \
+            numpy.where(done[lines], len(DONE_CALLING), len(CALLED))
+        method_lengths = chunk.run_lengths(method_starts, WORD_BYTES)
+        firsts, codes = group(chunk.pack(method_starts, method_lengths))
+        names = [chunk.text(method_starts[first], method_lengths[first]) for first in firsts]
+
+        self.count_seconds(chunk, lines, called[lines], (codes, names))
+        add_counts(self.calls, numpy.bincount(codes[called[lines]], minlength=len(names)), names)
+        add_counts(self.done, numpy.bincount(codes[done[lines]], minlength=len(names)), names)
+        # the outcome follows the method, e.g. "publish; buffer full, failed to add."
+        done = done[lines]
+        self.count_failures(chunk, lines[done], method_starts[done] + method_lengths[done] + 2,
+                            (codes[done], names))
+        method_codes = numpy.full(len(chunk.starts), -1)
+        method_codes[lines] = codes
+        self.count_ids(chunk, called, (method_codes, names))
+
+    def count_seconds(self, chunk, lines, called, methods):
+        """
+        Counts the seconds with activity and the calls of every method in each of them,
+        like tick does a line at a time.
+
+        :type lines: numpy.ndarray
+        :param lines: the calls' lines, both "Called" and "Done calling"
+
+        :type called: numpy.ndarray
+        :param called: which of them are "Called" lines
+
+        :type methods: Tuple
+        :param methods: the codes of their methods and the names of the codes
+        """
+        codes, names = methods
+        starts = chunk.starts[lines]
+        changes = numpy.zeros(len(starts), dtype=bool)
+        for column in chunk.pack(starts, numpy.full(len(starts), TIMESTAMP_LENGTH))[1:]:
+            changes[1:] |= column[1:] != column[:-1]
+        changes[0] = chunk.text(starts[0], TIMESTAMP_LENGTH) != self.timestamp
+        changed = numpy.flatnonzero(changes)
+        if changed.size:
+            self.active_seconds += changed.size
+            if self.first_time is None:
+                self.first_time = timegm(strptime(chunk.text(starts[0], TIMESTAMP_LENGTH),
+                                                  TIMESTAMP_FORMAT))
+            self.timestamp = chunk.text(starts[changed[-1]], TIMESTAMP_LENGTH)
+
+        # second 0 goes on with the one being read before this chunk
+        seconds = numpy.cumsum(changes)
+        counts = numpy.bincount(seconds[called] * len(names) + codes[called],
+                                minlength=(seconds[-1] + 1) * len(names))
+        counts = counts.reshape(-1, len(names))
+        add_counts(self.second_calls, counts[0], names)
+        if len(counts) == 1:
+            return
+        self.end_second()
+        for code, count in enumerate(counts[1:-1].max(axis=0, initial=0)):
+            if count > self.peak_rates.get(names[code], 0):
+                self.peak_rates[names[code]] = int(count)
+        self.second_calls = {names[code]: int(count)
+                             for code, count in enumerate(counts[-1]) if count}
+
+    def count_failures(self, chunk, lines, outcome_starts, methods):
+        """
+        Counts the failed calls by method and outcome.
+
+        :type lines: numpy.ndarray
+        :param lines: the "Done calling" lines
+
+        :type outcome_starts: numpy.ndarray
+        :param outcome_starts: the offsets of their outcomes
+
+        :type methods: Tuple
+        :param methods: the codes of their methods and the names of the codes
+        """
+        codes, names = methods
+        # only the outcomes with a failure marker are grouped, not the long lists of items
+        failed = chunk.containing(lines, outcome_starts,
+                                  [marker.encode() for marker in FAILURE_MARKERS])
+        if not failed.any():
+            return
+
+        outcome_starts, codes = outcome_starts[failed], codes[failed]
+        lengths = chunk.ends[lines[failed]] - outcome_starts
+        firsts, outcome_codes = group(chunk.pack(outcome_starts, lengths))
+        keys, counts = numpy.unique(codes * len(firsts) + outcome_codes, return_counts=True)
+        for key, count in zip(keys, counts):
+            code, outcome_code = divmod(int(key), len(firsts))
+            first = firsts[outcome_code]
+            outcome = chunk.text(outcome_starts[first], lengths[first]).rstrip().rstrip(".")
+            failures = self.failures.setdefault(names[code], {})
+            failures[outcome] = failures.get(outcome, 0) + int(count)
+
+    def count_ids(self, chunk, called, methods):
+        """
+        Counts the calls of every method for the producers and the carts, from the first
+        id that follows "producer_id = " or "cart_id = " in the message of every "Called"
+        line.
+
+        :type called: numpy.ndarray
+        :param called: a mask of the "Called" lines
+
+        :type methods: Tuple
+        :param methods: the code of the method of every line and the names of the codes
+        """
+        method_codes, names = methods
+        # both ids end with "_id = ", which is searched once
+        offsets = chunk.find_all(b"_id = ") + len(b"_id = ")
+        for kind, text in [("producers", b"producer_id = "), ("carts", b"cart_id = ")]:
+            lines, ids = chunk.first_numbers(offsets, text, called)
+            keys, counts = numpy.unique(ids * len(names) + method_codes[lines],
+                                        return_counts=True)
+            for key, count in zip(keys, counts):
+                entity_id, code = divmod(int(key), len(names))
+                activity = self.activity[kind].setdefault(entity_id, {})
+                activity[names[code]] = activity.get(names[code], 0) + int(count)
+
+
+def analyse_logs(filenames, analyser=None):
+    """
+    Streams the log files, in order, through an analyser.
+
+    :type filenames: List
+    :param filenames: the paths of the log files, from the oldest to the newest
+
+    :type analyser: LogAnalyser
+    :param analyser: the analyser, e.g. a NumpyLogAnalyser; a new LogAnalyser by default
+
+    :returns the analyser's report, with the files read
+    """
+    analyser = analyser or LogAnalyser()
+    for filename in filenames:
+        analyser.feed_file(filename)
+    report = analyser.report()
+    report["files"] = list(filenames)
+    return report
+
+
+def format_report(report, top=5):
+    """
+    :type report: Dict
+    :param report: a report returned by analyse_logs
+
+    :type top: Int
+    :param top: the number of the busiest producers and carts to list
+
+    :returns the report as text
+    """
+    lines = ["%d lines from %d files, %s to %s, %d seconds with activity" % (report["lines"],
+             len(report.get("files", [])), report["start"], report["end"],
+             report["active_seconds"])]
+    lines.append("%-20s %10s %10s %10s %10s %10s" % ("method", "calls", "done", "calls/s",
+                                                     "peak/s", "failed"))
+    for method, stats in report["methods"].items():
+        lines.append("%-20s %10d %10d %10.1f %10d %9.1f%%" % (method, stats["calls"],
+                     stats["done"], stats["rate"], stats["peak_rate"],
+                     100 * stats["failure_ratio"]))
+        for outcome, count in stats["failures"].items():
+            lines.append("    %-46s %10d" % (outcome, count))
+    for kind in ["producers", "carts"]:
+        busiest = sorted(report[kind].items(), key=lambda item: -sum(item[1].values()))[:top]
+        lines.append("%d %s; the busiest:" % (len(report[kind]), kind))
+        for entity_id, counts in busiest:
+            lines.append("    %-6s %s" % (entity_id, ", ".join("%s %d" % item
+                                                               for item in counts.items())))
+    return "\n".join(lines)
@@ -6,58 +6,95 @@ Assignment 1
 March 2021
 """
 from threading import Lock
-import unittest
 import time
 import logging
 import logging.handlers
 
-from .product import Tea, Coffee
-from .consumer import Consumer
-from .producer import Producer
+from .allocator import make_allocator
+from .cart_reaper import CartReaper
+from .claim_policy import make_claim_policy
+from .demand import Demand
+from .publish_result import PublishResult
+from .storage import make_storage
 
-# initialize the logger for the INFO level, with a rotating file handler
 logger = logging.getLogger()
-logging.basicConfig(
-    handlers=[logging.handlers.RotatingFileHandler('marketplace.log', mode='a',
-                maxBytes=1024*1024, backupCount=10, encoding=None, delay=False)],
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt='%d/%m/%Y %I:%M:%S %p')
-# format the time as UTC time
-logging.Formatter.converter = time.gmtime
+
+
+def setup_logging(filename='marketplace.log'):
+    """
+    Logs the calls for the INFO level, with a rotating file handler. It is called by the
+    scripts that want the log, instead of on import, so the tests and the scripts that
+    don't log skip the handler.
+
+    :type filename: String
+    :param filename: the path of the log file
+    """
+    logging.basicConfig(
+        handlers=[logging.handlers.RotatingFileHandler(filename, mode='a',
+                    maxBytes=1024*1024, backupCount=10, encoding=None, delay=False)],
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt='%d/%m/%Y %I:%M:%S %p')
+    # format the time as UTC time
+    logging.Formatter.converter = time.gmtime
 
 class Marketplace:
     """
     Class that represents the Marketplace. It's the central part of the implementation.
     The producers and consumers use its methods concurrently.
     """
-    def __init__(self, queue_size_per_producer):
+    def __init__(self, queue_size_per_producer, claim_policy="first", storage="list",
+                 allocator="first-come"):
         """
         Constructor
 
         :type queue_size_per_producer: Int
         :param queue_size_per_producer: the maximum size of a queue associated with each producer
-        """
-        logger.info("Called constructor with queue_size_per_producer = %s.", \
-                    queue_size_per_producer)
-
-        self.queue_size_per_producer = queue_size_per_producer
 
-        # dictionary of producers' buffers
-        self.producers_dictionary = {}
-        # dictionary of locks for each producer's buffer
-        self.producers_locks_dictionary = {}
+        :type claim_policy: String or ClaimPolicy
+        :param claim_policy: the policy that chooses the producer's buffer a product is taken
+        from: "first", "full-first", "round-robin", "random-k" or a ClaimPolicy
 
-        # dictionary of consumers' carts
-        self.carts_dictionary = {}
+        :type storage: String or MarketplaceStorage
+        :param storage: the backend that keeps the producers' buffers and the carts: "list",
+        "multiset", "shared-memory" or a MarketplaceStorage
 
-        # lock for registering a new producer
-        self.lock_register_producer = Lock()
-        # lock for creating a new cart
-        self.lock_new_cart = Lock()
+        :type allocator: String or Allocator
+        :param allocator: decides which of the carts that want a scarce product may take it:
+        "first-come", whoever calls first, "priority", the carts with the highest priorities,
+        or an Allocator
+        """
+        logger.info("Called constructor with queue_size_per_producer = %s, claim_policy = %s, "
+                    "storage = %s, allocator = %s.", queue_size_per_producer, claim_policy,
+                    storage, allocator)
+
+        self.claim_policy = make_claim_policy(claim_policy)
+        # the carts' priorities, the products they wait for and their latencies
+        self.allocator = make_allocator(allocator)
+
+        # the producers' buffers and the consumers' carts, with their locks, and the
+        # inventory of the buffers
+        self.storage = make_storage(storage, queue_size_per_producer)
+        # the rates at which the products are taken and published and the waiting carts
+        self.demand = Demand()
+        # the ids of the carts that expired since their consumers last checked
+        self.expired_carts = set()
+
+        # thread that expires the carts with a ttl, started by the first of them
+        self.cart_reaper = None
+
+        # lock for registering a new producer or creating a new cart, since the storage
+        # gives them ids depending on their number
+        self.lock_register = Lock()
         # lock for printing cart
         self.lock_print_cart = Lock()
 
+        # callbacks called with a producer's id when a consumer frees space in its buffer
+        # and callbacks called when the marketplace closes
+        self.listeners = {"capacity": [], "close": []}
+        # once closed, the marketplace doesn't accept new products
+        self.closed = False
+
         logger.info("Done calling constructor.")
 
     def register_producer(self):
@@ -65,17 +102,46 @@ class Marketplace:
         Returns an id for the producer that calls this.
         """
         logger.info("Called register_producer.")
-        # get lock of the producers dictionary; get a new id depending on the dictionary's size
-        with self.lock_register_producer:
-            current_producer_id = len(self.producers_dictionary)
-            self.producers_dictionary[current_producer_id] = []
-            new_producer_lock = Lock()
-            self.producers_locks_dictionary[current_producer_id] = new_producer_lock
+        # get lock for registering; the storage gives a new id depending on the number of buffers
+        with self.lock_register:
+            current_producer_id = self.storage.add_producer()
             logger.info("Done calling register_producer; assigned the id = %s.",
                         current_producer_id)
             return current_producer_id
 
-    def publish(self, producer_id, product):
+    def add_capacity_listener(self, listener):
+        """
+        Registers a callback that is called with a producer's id every time a consumer
+        takes a product out of that producer's buffer. It is called without holding any
+        of the marketplace's locks.
+
+        :type listener: Callable
+        :param listener: the function to call
+        """
+        self.listeners["capacity"].append(listener)
+
+    def add_close_listener(self, listener):
+        """
+        Registers a callback that is called, without arguments, when the marketplace closes.
+
+        :type listener: Callable
+        :param listener: the function to call
+        """
+        self.listeners["close"].append(listener)
+
+    def close(self):
+        """
+        Closes the marketplace: from now on publish rejects every product, and the close
+        listeners are called, which stops and wakes up the producers. The products already
+        in the producers' buffers can still be bought.
+        """
+        logger.info("Called close.")
+        self.closed = True
+        for listener in self.listeners["close"]:
+            listener()
+        logger.info("Done calling close.")
+
+    def publish(self, producer_id, product, detailed=False):
         """
         Adds the product provided by the producer to the marketplace
 
@@ -85,30 +151,67 @@ class Marketplace:
         :type product: Product
         :param product: the Product that will be published in the Marketplace
 
+        :type detailed: Boolean
+        :param detailed: if True, return a PublishResult, which also has the free capacity
+        of the buffer, the estimated wait until a consumer frees space in it and the
+        number of carts waiting for the product, so the producer can adapt its backoff
+
         :returns True or False. If the caller receives False, it should wait and then try again.
         """
         logger.info("Called publish with producer_id = %s and product = %s.", producer_id, product)
-        # get lock of the producer's buffer
-        with self.producers_locks_dictionary[producer_id]:
-            # if the buffer is not full, add the product
-            if len(self.producers_dictionary[producer_id]) < self.queue_size_per_producer:
-                self.producers_dictionary[producer_id].append(product)
+        published = False
+        if self.closed:
+            logger.info("Done calling publish; marketplace closed, failed to add.")
+        else:
+            # the storage adds the product, if the buffer is not full
+            published = self.storage.publish(producer_id, product)
+            if published:
+                self.demand.arrived(product)
                 logger.info("Done calling publish; added the product to the producer's buffer.")
-                return True
-        logger.info("Done calling publish; buffer full, failed to add.")
-        return False
+            else:
+                logger.info("Done calling publish; buffer full, failed to add.")
+
+        if not detailed:
+            return published
+        free_capacity = self.storage.inventory.free_capacity(producer_id)
+        estimated_wait = 0 if free_capacity > 0 else self.demand.expected_drain(producer_id)
+        return PublishResult(published, free_capacity, estimated_wait,
+                             self.demand.waiting_count(product))
+
+    def expected_arrival(self, product):
+        """
+        Returns the estimated number of seconds until the product becomes available again,
+        based on its recent arrivals, or None if there were too few of them to know.
 
-    def new_cart(self):
+        :type product: Product
+        :param product: the product
+        """
+        return self.demand.expected_arrival(product)
+
+    def new_cart(self, ttl=None, priority=0):
         """
         Creates a new cart for the consumer
 
+        :type ttl: Float
+        :param ttl: if given, the number of seconds without activity after which the cart
+        expires and its products are returned to their producers' buffers
+
+        :type priority: Int
+        :param priority: the class of the cart; with the "priority" allocator, the carts with
+        higher priorities get the scarce products first
+
         :returns an int representing the cart_id
         """
-        logger.info("Called new_cart.")
-        # get lock of the carts dictionary; allocate a new id depending on the dictionary's size
-        with self.lock_new_cart:
-            current_cart_id = len(self.carts_dictionary)
-            self.carts_dictionary[current_cart_id] = []
+        logger.info("Called new_cart with ttl = %s, priority = %s.", ttl, priority)
+        # get lock for creating carts; the storage allocates a new id depending on their number
+        with self.lock_register:
+            current_cart_id = self.storage.add_cart()
+            self.allocator.set_priority(current_cart_id, priority)
+            if ttl is not None:
+                if self.cart_reaper is None:
+                    self.cart_reaper = CartReaper(self)
+                    self.cart_reaper.start()
+                self.cart_reaper.track(current_cart_id, ttl)
             logger.info("Done calling new_cart; assigned the cart_id = %s.", current_cart_id)
             return current_cart_id
 
@@ -126,18 +229,35 @@ class Marketplace:
         """
         logger.info("Called add_to_cart with parameters cart_id = %s, product = %s.",\
                     cart_id, product)
-
-        # try to find the product in the producers' buffers
-        for key, value in self.producers_dictionary.items():
-            # get lock of the current producer's buffer
-            with self.producers_locks_dictionary[key]:
-                # if found, remove it from the producer's buffer and add it to the cart
-                if product in value:
-                    new_product_tuple = (product, key)
-                    value.remove(product)
-                    self.carts_dictionary[cart_id].append(new_product_tuple)
-                    logger.info("Done calling add_to_cart; found and added product to the cart.")
-                    return True
+        # even a failed try is activity; touching first also keeps a cart that is about to
+        # expire from losing the product it gets
+        if self.cart_reaper is not None:
+            self.cart_reaper.touch(cart_id)
+
+        # see the products other processes put in shared buffers
+        self.storage.refresh()
+        # the allocator may keep the product for carts that outrank this one
+        if not self.allocator.admit(cart_id, product, self.storage.inventory):
+            self.demand.wait(cart_id, product)
+            self.allocator.failed(cart_id, product)
+            logger.info("Done calling add_to_cart; failed, the product is kept for other carts.")
+            return False
+        # try the producers that have the product, in the order given by the claim policy
+        for key in self.claim_policy.candidates(self.storage.inventory, product):
+            # move the product to the cart; if it's gone meanwhile, try the next producer
+            if not self.storage.claim(cart_id, key, product):
+                continue
+            self.demand.drained(key)
+            self.demand.served(cart_id, product)
+            self.allocator.served(cart_id, product)
+            # let the listeners know the producer's buffer has space again
+            for listener in self.listeners["capacity"]:
+                listener(key)
+            logger.info("Done calling add_to_cart; found and added product to the cart.")
+            return True
+        # the cart waits for the product, which producers see as demand
+        self.demand.wait(cart_id, product)
+        self.allocator.failed(cart_id, product)
         logger.info("Done calling add_to_cart; failed to find product.")
         return False
 
@@ -153,215 +273,147 @@ class Marketplace:
         """
         logger.info("Called remove_from_cart with parameters cart_id = %s, product = %s.", \
                     cart_id, product)
-        # find the product in the cart
-        for product_tuple in self.carts_dictionary[cart_id]:
-            # if found, remove it from the cart and add it back to the producer's buffer
-            if product_tuple[0] == product:
-                self.carts_dictionary[cart_id].remove(product_tuple)
-                # get lock of the current producer's buffer
-                with self.producers_locks_dictionary[product_tuple[1]]:
-                    self.producers_dictionary[product_tuple[1]].append(product)
-                logger.info("Done calling remove_from_cart; removed product and added it back.")
-                return
-        logger.info("Done calling remove_from_cart; product not found.")
-
-    def place_order(self, cart_id):
+        if self.cart_reaper is not None:
+            self.cart_reaper.touch(cart_id)
+        # find the product in the cart and, if found, move it back to the producer's buffer
+        if self.storage.unclaim(cart_id, product) is None:
+            logger.info("Done calling remove_from_cart; product not found.")
+            return
+        self.demand.arrived(product)
+        logger.info("Done calling remove_from_cart; removed product and added it back.")
+
+    def expire_cart(self, cart_id, still_due=None):
+        """
+        Empties a cart whose ttl passed, returning each product to the buffer of the
+        producer it came from, and flags it as expired. It is called by the cart reaper.
+
+        :type cart_id: Int
+        :param cart_id: id cart
+
+        :type still_due: Callable
+        :param still_due: if given, the cart is only emptied if it returns True, checked
+        under the cart's lock
+        """
+        logger.info("Called expire_cart with parameter cart_id = %s.", cart_id)
+
+        def claim_expiry():
+            if still_due is not None and not still_due():
+                return False
+            # flag it before the cart is emptied, so an order placed afterwards sees it
+            self.expired_carts.add(cart_id)
+            return True
+
+        expired_tuples = self.storage.return_cart(cart_id, claim_expiry)
+        for product, _ in expired_tuples:
+            self.demand.arrived(product)
+        logger.info("Done calling expire_cart; returned %s products.", len(expired_tuples))
+
+    def place_order(self, cart_id, aggregated=False):
         """
         Return a list with all the products in the cart.
 
         :type cart_id: Int
         :param cart_id: id cart
+
+        :type aggregated: Boolean
+        :param aggregated: if True, return an Order with the quantity of each product and
+        the total price instead, which is already computed; iterating over it yields the
+        same products as the list, without building it
         """
         logger.info("Called place_order with parameter cart_id = %s.", cart_id)
+        # the products are bought, so the cart must not expire anymore
+        if self.cart_reaper is not None:
+            self.cart_reaper.forget(cart_id)
+        # the cart doesn't wait for any product anymore, so it doesn't count in the demand
+        # or keep products from the other carts
+        self.demand.stop_waiting(cart_id)
+        self.allocator.stop_waiting(cart_id)
+        if aggregated:
+            order = self.storage.cart_order(cart_id)
+            logger.info("Done calling place_order; the order is: %s.", order)
+            return order
         # put each product in the cart in a list and return it
-        order_items = []
-        for product_tuple in self.carts_dictionary[cart_id]:
-            order_items.append(product_tuple[0])
+        order_items = [product_tuple[0] for product_tuple in self.storage.cart_items(cart_id)]
         logger.info("Done calling place_order; the cart items are: %s.", order_items)
         return order_items
 
-class TestMarketplace(unittest.TestCase):
-    """
-    Class for unittesting the marketplace module
-    """
-    def setUp(self):
-        """
-        Initialize the marketplace, the products, producers and consumers
-        """
-        self.marketplace = Marketplace(10)
-
-        self.product_1 = Coffee(name = "Indonezia", acidity = 5.05,\
-                        roast_level = "MEDIUM", price = 1)
-        self.product_2 = Coffee(name = "Brazil", acidity = 4.05, \
-                        roast_level = "LIGHT", price = 5)
-        self.product_3 = Tea(name = "Wild Cherry", type = "Black", price = 3)
-
-        self.producer_1 = Producer(products = [[self.product_1, 8, 0.1], \
-                        [self.product_2, 4, 0.2]], marketplace = self.marketplace, \
-                        republish_wait_time = 0.3)
-        self.producer_2 = Producer(products = [[self.product_3, 5, 0.1]], \
-                        marketplace = self.marketplace, republish_wait_time = 0.3)
-
-        self.consumer_1 = Consumer(carts = [
-            {
-                "type": "add",
-                "product": self.product_1,
-                "quantity": 3
-            },
-            {
-                "type": "add",
-                "product": self.product_3,
-                "quantity": 5
-            },
-            {
-                "type": "add",
-                "product": self.product_2,
-                "quantity": 1
-            },
-            {
-                "type": "remove",
-                "product": self.product_2,
-                "quantity": 1
-            },
-            {
-                "type": "remove",
-                "product": self.product_1,
-                "quantity": 1
-            }
-        ], marketplace = self.marketplace, retry_wait_time = 0.3)
-
-        self.consumer_2 = Consumer(carts = [
-            {
-                "type": "add",
-                "product": self.product_3,
-                "quantity": 3
-            }
-        ], marketplace = self.marketplace, retry_wait_time = 0.3)
-
-    def test_register_producer(self):
-        """
-        Test the register_producer method
-        """
-        self.assertEqual(len(self.marketplace.producers_dictionary), 2)
-        self.assertEqual(self.producer_1.producer_id, 0)
-        self.assertEqual(self.producer_2.producer_id, 1)
-        self.assertEqual(self.marketplace.register_producer(), 2)
-        self.assertEqual(self.marketplace.register_producer(), 3)
-
-    def test_publish(self):
-        """
-        Test the publish method
-        """
-        # initialize each producers' buffer
-        self.marketplace.producers_dictionary[self.producer_1.producer_id] = []
-        self.marketplace.producers_dictionary[self.producer_2.producer_id] = []
-
-        total_products_producer_1 = self.producer_1.products[0][1] + self.producer_1.products[1][1]
-        # publish products for producer 1; keep track if the number of products
-        # is above the queue size; test the results
-        for i in range(0, total_products_producer_1):
-            current_product = self.product_1
-            if i > 4:
-                current_product = self.product_2
-            if i < self.marketplace.queue_size_per_producer:
-                self.assertTrue(self.marketplace.publish(self.producer_1.producer_id, \
-                                current_product))
-                self.assertEqual(len(self.marketplace.producers_dictionary\
-                                [self.producer_1.producer_id]), i + 1)
-            else:
-                self.assertFalse(self.marketplace.publish(self.producer_1.producer_id, \
-                                current_product))
-                self.assertEqual(len(self.marketplace.producers_dictionary\
-                                [self.producer_1.producer_id]),\
-                                self.marketplace.queue_size_per_producer)
-
-        # publish products for producer 2; the number of products is below the queue size;
-        # check the results
-        total_products_producer_2 = self.producer_2.products[0][1]
-        for i in range(0, total_products_producer_2):
-            self.assertTrue(self.marketplace.publish(self.producer_2.producer_id, self.product_3))
-            self.assertEqual(len(self.marketplace.producers_dictionary\
-                            [self.producer_2.producer_id]), i + 1)
-
-    def test_new_cart(self):
-        """
-        Test the new_cart method
-        """
-        self.assertEqual(len(self.marketplace.carts_dictionary), 2)
-        self.assertEqual(self.consumer_1.cart_id, 0)
-        self.assertEqual(self.consumer_2.cart_id, 1)
-        self.assertEqual(self.marketplace.new_cart(), 2)
-        self.assertEqual(self.marketplace.new_cart(), 3)
-
-    def test_add_to_cart(self):
-        """
-        Test the add_to_cart method
-        """
-        # initialize buffers
-        self.marketplace.producers_dictionary[self.producer_2.producer_id] = []
-        self.marketplace.carts_dictionary[self.consumer_2.cart_id] = []
-        total_products_producer_2 = self.producer_2.products[0][1]
-
-        # publish products
-        for _ in range(0, total_products_producer_2):
-            self.marketplace.publish(self.producer_2.producer_id, self.product_3)
-        # add products to cart and test the results
-        for i in range (0, total_products_producer_2):
-            self.assertTrue(self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_3))
-            self.assertEqual(len(self.marketplace.carts_dictionary\
-                            [self.consumer_2.cart_id]), i + 1)
-            self.assertEqual(len(self.marketplace.producers_dictionary\
-                            [self.producer_2.producer_id]), total_products_producer_2 - i - 1)
-        self.assertFalse(self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_3))
-
-    def test_remove_from_cart(self):
-        """
-        Test the remove_from_cart method
-        """
-        # initialize buffers
-        self.marketplace.producers_dictionary[self.producer_2.producer_id] = []
-        self.marketplace.carts_dictionary[self.consumer_2.cart_id] = []
-        total_products_producer_2 = self.producer_2.products[0][1]
-
-        # publish products and add them to cart
-        for _ in range(0, total_products_producer_2):
-            self.marketplace.publish(self.producer_2.producer_id, self.product_3)
-        for _ in range (0, total_products_producer_2):
-            self.assertTrue(self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_3))
-
-        # remove products from cart and test the results
-        self.marketplace.remove_from_cart(self.consumer_2.cart_id, self.product_3)
-        self.marketplace.remove_from_cart(self.consumer_2.cart_id, self.product_3)
-        self.assertEqual(len(self.marketplace.carts_dictionary[self.consumer_2.cart_id]), \
-                        total_products_producer_2 - 2)
-        self.assertEqual(len(self.marketplace.producers_dictionary\
-                        [self.producer_2.producer_id]), 2)
-
-    def test_place_order(self):
-        """
-        Test the place_order method
-        Add a fiew products to the cart, remove some of them and then place the order
-        """
-        # initialize buffers
-        self.marketplace.producers_dictionary[self.producer_1.producer_id] = []
-        self.marketplace.carts_dictionary[self.consumer_1.cart_id] = []
-
-        total_product_1 = 4
-        total_product_2 = 3
-
-        # publish products
-        for _ in range(0, total_product_1):
-            self.marketplace.publish(self.producer_1.producer_id, self.product_1)
-        for _ in range(0, total_product_2):
-            self.marketplace.publish(self.producer_1.producer_id, self.product_2)
-
-        # add/remove products to/from cart
-        for _ in range(0, total_product_1):
-            self.marketplace.add_to_cart(self.consumer_1.cart_id, self.product_1)
-        for _ in range(0, total_product_2):
-            self.marketplace.add_to_cart(self.consumer_1.cart_id, self.product_2)
-        self.marketplace.remove_from_cart(self.consumer_1.cart_id, self.product_1)
-
-        # place order and test the result
-        order = self.marketplace.place_order(self.consumer_1.cart_id)
-        self.assertEqual(len(order), 6)
+    def cart_expired(self, cart_id):
+        """
+        Returns whether the cart expired since the last call and clears the flag. The
+        consumer checks it after placing its order; if the cart expired, the order misses
+        the products that were returned.
+
+        :type cart_id: Int
+        :param cart_id: id cart
+        """
+        if cart_id not in self.expired_carts:
+            return False
+        self.expired_carts.discard(cart_id)
+        return True
+
+    def release_cart(self, cart_id):
+        """
+        Frees a cart after its order was placed: the products in it are bought, so they
+        are dropped, and the next new_cart reuses its id and storage.
+
+        :type cart_id: Int
+        :param cart_id: id cart
+        """
+        logger.info("Called release_cart with parameter cart_id = %s.", cart_id)
+        if self.cart_reaper is not None:
+            self.cart_reaper.forget(cart_id)
+        self.demand.stop_waiting(cart_id)
+        self.allocator.forget(cart_id)
+        self.expired_carts.discard(cart_id)
+        with self.lock_register:
+            self.storage.release_cart(cart_id)
+        logger.info("Done calling release_cart.")
+
+    def latency_stats(self):
+        """
+        Returns, for every priority of the carts, the summary of the times they waited for
+        the products they got: the count, mean, median, 95th percentile and maximum.
+        """
+        return self.allocator.latency_stats()
+
+    def stock(self, product):
+        """
+        Returns the number of items of a product in all the producers' buffers. Like the
+        other inventory queries, it reads counters that are updated incrementally, so it
+        doesn't take the buffers' locks.
+
+        :type product: Product
+        :param product: the product
+        """
+        return self.storage.inventory.stock(product)
+
+    def stock_by_producer(self):
+        """
+        Returns a dictionary with the number of items in each producer's buffer.
+        """
+        return self.storage.inventory.stock_by_producer()
+
+    def total_items(self):
+        """
+        Returns the number of items in all the producers' buffers.
+        """
+        return self.storage.inventory.total_items()
+
+    def free_capacity(self, producer_id):
+        """
+        Returns the number of products a producer can still publish.
+
+        :type producer_id: Int
+        :param producer_id: producer id
+        """
+        return self.storage.inventory.free_capacity(producer_id)
+
+    def top_products(self, num_products):
+        """
+        Returns a list with the (product, count) tuples of the products with the most items
+        in the producers' buffers, from the highest count to the lowest.
+
+        :type num_products: Int
+        :param num_products: the number of products to return
+        """
+        return self.storage.inventory.top_products(num_products)
@@ -0,0 +1,73 @@
+"""
+This module represents the Order.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+
+class Order:
+    """
+    Aggregated view of a cart: the quantity of each product and the total price. The
+    Marketplace updates it incrementally as products are added to and removed from the
+    cart, so placing the order doesn't need a pass over the cart. Iterating over it
+    lazily yields one product per unit, like the list returned by place_order.
+    """
+
+    def __init__(self, quantities=None, total_price=0):
+        """
+        Constructor.
+
+        :type quantities: Dict
+        :param quantities: the quantity of each product
+
+        :type total_price: Int
+        :param total_price: the total price of the products
+        """
+        self.quantities = dict(quantities) if quantities else {}
+        self.total_price = total_price
+        self.total_quantity = sum(self.quantities.values())
+
+    def add(self, product):
+        """
+        Adds a unit of a product to the order.
+
+        :type product: Product
+        :param product: the product
+        """
+        self.quantities[product] = self.quantities.get(product, 0) + 1
+        self.total_price += product.price
+        self.total_quantity += 1
+
+    def remove(self, product):
+        """
+        Removes a unit of a product from the order.
+
+        :type product: Product
+        :param product: the product, which must be in the order
+        """
+        quantity = self.quantities[product] - 1
+        if quantity > 0:
+            self.quantities[product] = quantity
+        else:
+            del self.quantities[product]
+        self.total_price -= product.price
+        self.total_quantity -= 1
+
+    def copy(self):
+        """
+        :returns a snapshot of the order, which doesn't change with the cart
+        """
+        return Order(self.quantities, self.total_price)
+
+    def __iter__(self):
+        for product, quantity in self.quantities.items():
+            for _ in range(quantity):
+                yield product
+
+    def __len__(self):
+        return self.total_quantity
+
+    def __repr__(self):
+        return "Order(quantities=%r, total_price=%r)" % (self.quantities, self.total_price)
@@ -6,8 +6,7 @@ Assignment 1
 March 2021
 """
 
-from threading import Thread
-from time import sleep
+from threading import Event, Thread
 
 
 class Producer(Thread):
@@ -15,7 +14,8 @@ class Producer(Thread):
     Class that represents a producer.
     """
 
-    def __init__(self, products, marketplace, republish_wait_time, **kwargs):
+    def __init__(self, products, marketplace, republish_wait_time, quota=None, backoff="fixed",
+                 **kwargs):
         """
         Constructor.
 
@@ -29,6 +29,14 @@ class Producer(Thread):
         @param republish_wait_time: the number of seconds that a producer must
         wait until the marketplace becomes available
 
+        @type quota: Int
+        @param quota: the number of products after which the producer stops; by default,
+        it produces until it is stopped
+
+        @type backoff: String
+        @param backoff: "fixed", to always wait republish_wait_time after a failed publish,
+        or "adaptive", to wait according to the marketplace's backpressure signals
+
         @type kwargs:
         @param kwargs: other arguments that are passed to the Thread's __init__()
         """
@@ -36,11 +44,39 @@ class Producer(Thread):
         self.products = products
         self.marketplace = marketplace
         self.republish_wait_time = republish_wait_time
-        # register the producer
+        self.quota = quota
+        self.backoff = backoff
+        # the number of products published so far and of the failed publish attempts
+        self.published_count = 0
+        self.failed_count = 0
+        # set when the producer must stop publishing
+        self.stop_event = Event()
+        # register the producer and stop it when the marketplace closes
         self.producer_id = marketplace.register_producer()
+        marketplace.add_close_listener(self.stop)
+
+    def stop(self):
+        """
+        Asks the producer to stop. A producer that is waiting wakes up right away.
+        """
+        self.stop_event.set()
 
     def run(self):
-        while True:
+        # wait the time given by the publish script after every publish attempt,
+        # unless the producer is stopped in the meantime
+        for _, wait_time in self.publish_script():
+            if self.stop_event.wait(wait_time):
+                break
+
+    def publish_script(self):
+        """
+        Generator that goes through the producer's products forever. After every publish
+        attempt it yields a (published, wait_time) tuple: whether the product was published
+        and the number of seconds to wait before resuming the script. This lets the same
+        script run either on the producer's own thread or on a ProducerScheduler.
+        It ends when the producer is stopped or when it reached its quota.
+        """
+        while not self.stop_event.is_set():
             # for each product
             for product in self.products:
                 product_id = product[0]
@@ -49,10 +85,46 @@ class Producer(Thread):
 
                 # depending on the quantity, try to publish the product
                 for _ in range(product_quantity):
+                    # while we can't publish, wait and try again
+                    failures = 0
                     while True:
-                        # if we can publish
-                        if self.marketplace.publish(self.producer_id, product_id):
-                            sleep(product_wait_time)
+                        result = self.marketplace.publish(self.producer_id, product_id,
+                                                          detailed=self.backoff == "adaptive")
+                        if result:
                             break
-                        # otherwise, wait and try again
-                        sleep(self.republish_wait_time)
+                        self.failed_count += 1
+                        yield False, self.republish_delay(result, failures)
+                        failures += 1
+                        if self.stop_event.is_set():
+                            return
+                    self.published_count += 1
+                    if self.published_count == self.quota:
+                        return
+                    yield True, product_wait_time
+                    if self.stop_event.is_set():
+                        return
+
+    def republish_delay(self, result, failures):
+        """
+        Returns the number of seconds to wait after a failed publish attempt. With the
+        adaptive backoff, a producer whose product is wanted retries as soon as a consumer
+        is expected to free space in its buffer (but not sooner than a quarter of the
+        republish_wait_time, doubling with every failure, so an overdue estimate doesn't make
+        it spin), while one whose product nobody waits for backs off exponentially, up to 8
+        times the republish_wait_time.
+
+        @type result: PublishResult
+        @param result: the result of the failed attempt
+
+        @type failures: Int
+        @param failures: the number of failed attempts to publish the product before this one
+        """
+        if self.backoff != "adaptive":
+            return self.republish_wait_time
+        if result.demand == 0:
+            return self.republish_wait_time * 2 ** min(failures, 3)
+        if result.estimated_wait is None:
+            return self.republish_wait_time
+        # from a quarter of the wait, two doublings reach the cap; more would only overflow
+        return min(max(result.estimated_wait, self.republish_wait_time / 4) *
+                   2 ** min(failures, 2), self.republish_wait_time)
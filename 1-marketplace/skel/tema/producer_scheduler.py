@@ -0,0 +1,285 @@
+"""
+This module represents the ProducerScheduler.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from math import ceil
+from queue import SimpleQueue
+from threading import Condition, Event, Thread
+from time import monotonic, sleep
+import traceback
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: a circular array of slots, each holding the items due in a tick
+    that maps to it. Scheduling is O(1) and advancing the wheel only looks at the slots
+    of the ticks that passed. It is not thread safe; the caller must guard it.
+    """
+
+    def __init__(self, tick, num_slots):
+        """
+        Constructor.
+
+        :type tick: Float
+        :param tick: the number of seconds in a tick, the wheel's resolution
+
+        :type num_slots: Int
+        :param num_slots: the number of slots of the wheel
+        """
+        self.tick = tick
+        self.slots = [[] for _ in range(num_slots)]
+        # the last tick the wheel was advanced to, counted from start_time
+        self.current_tick = 0
+        self.start_time = monotonic()
+        # the number of items on the wheel
+        self.size = 0
+
+    def schedule(self, due_time, item):
+        """
+        Adds an item that becomes due at the given time. The item is never returned
+        before its due time, but it may be returned up to a tick later.
+
+        :type due_time: Float
+        :param due_time: the monotonic time at which the item becomes due
+
+        :type item: Any
+        :param item: the item to schedule
+        """
+        due_tick = max(ceil((due_time - self.start_time) / self.tick), self.current_tick + 1)
+        # items more than a turn away share the slot; the due tick tells them apart
+        self.slots[due_tick % len(self.slots)].append((due_tick, item))
+        self.size += 1
+
+    def advance(self, now):
+        """
+        Advances the wheel up to the given time.
+
+        :type now: Float
+        :param now: the current monotonic time
+
+        :returns a list with the items that became due
+        """
+        due_items = []
+        target_tick = int((now - self.start_time) / self.tick)
+        # an empty wheel can skip the ticks that passed
+        if self.size == 0:
+            self.current_tick = max(self.current_tick, target_tick)
+        while self.current_tick < target_tick:
+            self.current_tick += 1
+            slot = self.slots[self.current_tick % len(self.slots)]
+            if not slot:
+                continue
+            # keep the items that are due in one of the next turns
+            remaining = []
+            for due_tick, item in slot:
+                if due_tick <= self.current_tick:
+                    due_items.append(item)
+                else:
+                    remaining.append((due_tick, item))
+            slot[:] = remaining
+        self.size -= len(due_items)
+        return due_items
+
+    def drain(self):
+        """
+        Takes all the items off the wheel, whether they are due or not.
+
+        :returns a list with the items
+        """
+        items = [item for slot in self.slots for _, item in slot]
+        for slot in self.slots:
+            slot.clear()
+        self.size = 0
+        return items
+
+
+class ProducerScheduler:
+    """
+    Runs the publish scripts of many producers on a few threads, instead of one thread
+    per producer. A timer thread drives a TimerWheel and hands the producers whose wait
+    time passed to the worker threads, which make their next publish attempt. A producer
+    whose buffer is full is marked as blocked and only rescheduled when a consumer takes
+    a product out of its buffer. When the marketplace closes, all the producers are
+    stopped and woken up, so that their scripts end.
+    """
+
+    def __init__(self, marketplace, num_workers, tick=0.005, num_slots=1024):
+        """
+        Constructor.
+
+        :type marketplace: Marketplace
+        :param marketplace: a reference to the marketplace
+
+        :type num_workers: Int
+        :param num_workers: the number of threads that make the publish attempts
+
+        :type tick: Float
+        :param tick: the resolution of the timer wheel, in seconds
+
+        :type num_slots: Int
+        :param num_slots: the number of slots of the timer wheel
+        """
+        self.num_workers = num_workers
+        self.timer_wheel = TimerWheel(tick, num_slots)
+
+        # producers by id and their running publish scripts
+        self.producers = {}
+        self.scripts = {}
+        # ids of the producers waiting for space in their buffers
+        self.blocked_producers = set()
+        # ids of the producers whose buffers got space since their last publish attempt
+        self.freed_producers = set()
+
+        # producer ids that are due, consumed by the workers
+        self.due_producers = SimpleQueue()
+        # condition guarding the fields above; the timer thread waits on it
+        self.condition = Condition()
+        self.stop_event = Event()
+        self.threads = []
+
+        marketplace.add_capacity_listener(self.wake_producer)
+        marketplace.add_close_listener(self.stop_producers)
+
+    def submit(self, producer):
+        """
+        Adds a producer's publish script to the scheduler, due right away. The producer
+        must not be started as a thread.
+
+        :type producer: Producer
+        :param producer: the producer whose products will be published
+        """
+        with self.condition:
+            self.producers[producer.producer_id] = producer
+            self.scripts[producer.producer_id] = producer.publish_script()
+            self.timer_wheel.schedule(monotonic(), producer.producer_id)
+            self.condition.notify()
+
+    def start(self):
+        """
+        Starts the timer thread and the worker threads. They are daemon threads, just
+        like the producers' threads.
+        """
+        self.threads.append(Thread(target=self.timer_loop, name="producer-timer", daemon=True))
+        for i in range(self.num_workers):
+            self.threads.append(Thread(target=self.worker_loop,
+                                       name="producer-worker-" + str(i), daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def join(self):
+        """
+        Waits until the publish scripts of all the producers ended, then stops the threads.
+        """
+        with self.condition:
+            while self.producers:
+                self.condition.wait()
+        self.stop()
+
+    def stop(self):
+        """
+        Stops the timer thread and the workers, after their current publish attempts.
+        """
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        for _ in range(self.num_workers):
+            self.due_producers.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def wake_producer(self, producer_id):
+        """
+        Capacity listener: reschedules a blocked producer, now that its buffer has space.
+
+        :type producer_id: Int
+        :param producer_id: the id of the producer whose buffer has space
+        """
+        with self.condition:
+            if producer_id in self.blocked_producers:
+                self.blocked_producers.remove(producer_id)
+                self.due_producers.put(producer_id)
+            elif producer_id in self.producers:
+                # it may be in the middle of a publish attempt; remember it has space
+                self.freed_producers.add(producer_id)
+
+    def stop_producers(self):
+        """
+        Close listener: stops all the producers and makes them due right away, whether
+        they were waiting on the timer wheel or blocked, so that their scripts end.
+        """
+        with self.condition:
+            for producer in self.producers.values():
+                producer.stop()
+            for producer_id in self.timer_wheel.drain() + list(self.blocked_producers):
+                self.due_producers.put(producer_id)
+            self.blocked_producers.clear()
+
+    def timer_loop(self):
+        """
+        Advances the timer wheel every tick and passes the due producers to the workers.
+        When no producer is on the wheel, it sleeps until one is scheduled.
+        """
+        while not self.stop_event.is_set():
+            with self.condition:
+                while self.timer_wheel.size == 0 and not self.stop_event.is_set():
+                    self.condition.wait()
+                for producer_id in self.timer_wheel.advance(monotonic()):
+                    self.due_producers.put(producer_id)
+            sleep(self.timer_wheel.tick)
+
+    def finish_producer(self, producer_id):
+        """
+        Drops a producer whose publish script ended, so that join doesn't wait for it.
+
+        :type producer_id: Int
+        :param producer_id: the id of the producer
+        """
+        with self.condition:
+            del self.producers[producer_id]
+            del self.scripts[producer_id]
+            self.freed_producers.discard(producer_id)
+            self.condition.notify_all()
+
+    def worker_loop(self):
+        """
+        Makes the next publish attempt of every due producer, then either puts the
+        producer back on the timer wheel or, if its buffer was full, marks it as blocked.
+        A producer stopped during its attempt is made due again instead, so its script ends.
+        """
+        while True:
+            producer_id = self.due_producers.get()
+            if producer_id is None or self.stop_event.is_set():
+                return
+
+            with self.condition:
+                self.freed_producers.discard(producer_id)
+            try:
+                published, wait_time = next(self.scripts[producer_id])
+            except StopIteration:
+                # the producer was stopped or reached its quota
+                self.finish_producer(producer_id)
+                continue
+            except Exception:  # pylint: disable=broad-except
+                # report it like an uncaught exception in a producer thread would be
+                traceback.print_exc()
+                self.finish_producer(producer_id)
+                continue
+
+            with self.condition:
+                if self.producers[producer_id].stop_event.is_set():
+                    # the marketplace closed during the attempt, after stop_producers swept
+                    # the waiting producers; let the script end right away
+                    self.due_producers.put(producer_id)
+                elif published:
+                    self.timer_wheel.schedule(monotonic() + wait_time, producer_id)
+                    self.condition.notify()
+                elif producer_id in self.freed_producers:
+                    # a consumer freed space during the attempt; try again right away
+                    self.freed_producers.remove(producer_id)
+                    self.due_producers.put(producer_id)
+                else:
+                    self.blocked_producers.add(producer_id)
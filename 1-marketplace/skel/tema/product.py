@@ -33,3 +33,27 @@ class Coffee(Product):
     """
     acidity: str
     roast_level: str
+
+
+# the product types that can be read from a market configuration, by name
+PRODUCT_TYPES = {
+    "Product": Product,
+    "Tea": Tea,
+    "Coffee": Coffee,
+}
+
+
+def make_product(product_type, params):
+    """
+    :type product_type: String
+    :param product_type: the name of a product type
+
+    :type params: Dict
+    :param params: the fields of the product
+
+    :returns the product
+    """
+    if product_type not in PRODUCT_TYPES:
+        raise ValueError("unknown product type " + repr(product_type) + "; choose one of " +
+                         ", ".join(PRODUCT_TYPES))
+    return PRODUCT_TYPES[product_type](**params)
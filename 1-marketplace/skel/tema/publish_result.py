@@ -0,0 +1,29 @@
+"""
+This module represents the PublishResult.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(init=True, repr=True, order=False, frozen=True)
+class PublishResult:
+    """
+    Detailed result of a publish attempt, which tells the producer how to back off.
+    It is truthy only if the product was published, like the plain result.
+    """
+    published: bool
+    # the number of products the producer can still publish
+    free_capacity: int
+    # the estimated number of seconds until a consumer frees space in the buffer;
+    # 0 if there is space, None if it can't be estimated yet
+    estimated_wait: Optional[float]
+    # the number of carts waiting for the product
+    demand: int
+
+    def __bool__(self):
+        return self.published
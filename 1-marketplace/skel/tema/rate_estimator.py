@@ -0,0 +1,70 @@
+"""
+This module represents the RateEstimator.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from time import monotonic
+
+
+class RateEstimator:
+    """
+    Moving estimate of the rate of an event, as an exponentially weighted moving average
+    of the intervals between its occurrences. The updates are not locked: a concurrent
+    record may be lost, which only makes the estimate slightly less accurate.
+    """
+
+    def __init__(self, weight=0.2):
+        """
+        Constructor.
+
+        :type weight: Float
+        :param weight: the weight of the newest interval in the average, between 0 and 1
+        """
+        self.weight = weight
+        # the average interval and the time of the last occurrence, once known
+        self.mean_interval = None
+        self.last_time = None
+
+    def record(self, now=None):
+        """
+        Records an occurrence of the event.
+
+        :type now: Float
+        :param now: the monotonic time of the occurrence; by default, the current time
+        """
+        if now is None:
+            now = monotonic()
+        if self.last_time is not None:
+            interval = now - self.last_time
+            if self.mean_interval is None:
+                self.mean_interval = interval
+            else:
+                self.mean_interval += self.weight * (interval - self.mean_interval)
+        self.last_time = now
+
+    def rate(self):
+        """
+        :returns the estimated number of occurrences per second, or 0 if unknown
+        """
+        mean_interval = self.mean_interval
+        if not mean_interval:
+            return 0
+        return 1 / mean_interval
+
+    def expected_wait(self, now=None):
+        """
+        :type now: Float
+        :param now: the current monotonic time; by default, the current time
+
+        :returns the estimated number of seconds until the next occurrence, or None if
+        there were too few occurrences to know
+        """
+        mean_interval = self.mean_interval
+        if mean_interval is None:
+            return None
+        if now is None:
+            now = monotonic()
+        return max(mean_interval - (now - self.last_time), 0)
@@ -0,0 +1,322 @@
+"""
+This module offers the storage backend that keeps the producers' buffers in shared memory.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from multiprocessing import shared_memory
+from threading import Lock
+import multiprocessing
+import weakref
+
+from .inventory import Inventory
+from .order import Order
+from .storage import ListStorage
+
+
+def release_shared_memory(block, slots, unlink):
+    """
+    Releases a process's view of a shared memory block and, in the process that created
+    it, frees the block.
+    """
+    slots.release()
+    block.close()
+    if unlink:
+        block.unlink()
+
+
+class SharedMemoryStorage(ListStorage):
+    """
+    Backend that keeps the producers' buffers in a block of shared memory, so that they
+    can be used by several processes without pickling the products. Every product is
+    interned as a small int id. The block starts with the number of registered producers
+    and then has, for every producer, a header with the number of products in the buffer
+    and a version, which changes on every write, followed by a fixed number of slots of
+    product ids, in the order the products were added. Every buffer has a
+    multiprocessing lock.
+    The storage is passed to another process as an argument of a multiprocessing.Process;
+    it is attached there to the same block and locks, so the products must be interned
+    first. Every process keeps its own inventory: it is rebuilt from the block when the
+    storage is attached and brought up to date by refresh, which only reads the buffers
+    whose version changed. The carts are not shared, like in the list storage.
+    """
+
+    def __init__(self, queue_size_per_producer, inventory, max_producers=64,
+                 slots_per_producer=None, context=None):
+        """
+        Constructor
+
+        :type max_producers: Int
+        :param max_producers: the number of buffers in the block
+
+        :type slots_per_producer: Int
+        :param slots_per_producer: the number of products a buffer can hold, with the ones
+        given back from the carts over its size; twice the size by default
+
+        :type context: String
+        :param context: the start method of the processes the storage is passed to, since
+        the locks must be created for it; the default one if None
+        """
+        ListStorage.__init__(self, queue_size_per_producer, inventory)
+        self.max_producers = max_producers
+        self.slots_per_producer = slots_per_producer or 2 * queue_size_per_producer
+        self.shared_memory = shared_memory.SharedMemory(
+            create=True, size=4 * (1 + max_producers * (2 + self.slots_per_producer)))
+        self.owner = True
+        # lock for registering a new producer, in any process
+        process_context = multiprocessing.get_context(context)
+        self.lock_register_producer = process_context.Lock()
+        # locks of the buffers, created up front so they can be passed to other processes
+        self.buffers_locks = [process_context.Lock() for _ in range(max_producers)]
+        # the interned products, by id, and their ids
+        self.products = []
+        self.product_ids = {}
+        self.lock_intern = Lock()
+        self.attach()
+
+    def attach(self):
+        """
+        Maps the block and rebuilds the inventory from it.
+        """
+        # the block as ints; a new block is zeroed, so it has no producers
+        self.slots = self.shared_memory.buf.cast("i")
+        weakref.finalize(self, release_shared_memory, self.shared_memory, self.slots,
+                         self.owner)
+        # for every buffer, the version and the product ids this process last saw
+        self.known_versions = {}
+        self.known_items = {}
+        self.refresh()
+
+    def __getstate__(self):
+        return {
+            "queue_size_per_producer": self.queue_size_per_producer,
+            "max_producers": self.max_producers,
+            "slots_per_producer": self.slots_per_producer,
+            "name": self.shared_memory.name,
+            "lock_register_producer": self.lock_register_producer,
+            "buffers_locks": self.buffers_locks,
+            "products": self.products,
+        }
+
+    def __setstate__(self, state):
+        ListStorage.__init__(self, state["queue_size_per_producer"],
+                             Inventory(state["queue_size_per_producer"]))
+        self.max_producers = state["max_producers"]
+        self.slots_per_producer = state["slots_per_producer"]
+        self.shared_memory = shared_memory.SharedMemory(name=state["name"])
+        self.owner = False
+        self.lock_register_producer = state["lock_register_producer"]
+        self.buffers_locks = state["buffers_locks"]
+        self.products = state["products"]
+        self.product_ids = {product: product_id
+                            for product_id, product in enumerate(self.products)}
+        self.lock_intern = Lock()
+        self.attach()
+
+    def intern(self, product):
+        """
+        :returns the id of a product, which is given one if it is new; only the process
+        that created the storage can intern new products
+        """
+        product_id = self.product_ids.get(product)
+        if product_id is not None:
+            return product_id
+        if not self.owner:
+            raise ValueError(repr(product) + " was not interned before the storage was "
+                             "passed to this process")
+        with self.lock_intern:
+            if product not in self.product_ids:
+                self.products.append(product)
+                self.product_ids[product] = len(self.products) - 1
+            return self.product_ids[product]
+
+    def header(self, producer_id):
+        """
+        :returns the index of a producer's header in the block; its product ids follow
+        """
+        return 1 + producer_id * (2 + self.slots_per_producer)
+
+    def add_producer(self):
+        """
+        Registers a producer in the block, for every process, and starts counting its buffer.
+        """
+        with self.lock_register_producer:
+            producer_id = self.slots[0]
+            if producer_id >= self.max_producers:
+                raise ValueError("the shared memory has room for only " +
+                                 str(self.max_producers) + " producers")
+            self.slots[0] = producer_id + 1
+        self.sync_buffer(producer_id)
+        return producer_id
+
+    def sync_buffer(self, producer_id):
+        """
+        Updates the inventory of a buffer from the block, if another process changed it.
+        The caller must hold the buffer's lock, unless the buffer is new.
+        """
+        header = self.header(producer_id)
+        version = self.slots[header + 1]
+        if producer_id not in self.known_versions:
+            self.inventory.add_producer(producer_id)
+            self.known_items[producer_id] = []
+        elif self.known_versions[producer_id] == version:
+            return
+        for product_id in self.known_items[producer_id]:
+            self.inventory.removed(producer_id, self.products[product_id])
+        product_ids = self.slots[header + 2:header + 2 + self.slots[header]].tolist()
+        for product_id in product_ids:
+            self.inventory.added(producer_id, self.products[product_id])
+        self.known_items[producer_id] = product_ids
+        self.known_versions[producer_id] = version
+
+    def write_buffer(self, producer_id, start):
+        """
+        Writes the product ids of a buffer that this process knows, from a position on,
+        to the block and changes its version. The caller must hold the buffer's lock.
+        """
+        header = self.header(producer_id)
+        product_ids = self.known_items[producer_id]
+        for index in range(start, len(product_ids)):
+            self.slots[header + 2 + index] = product_ids[index]
+        self.slots[header] = len(product_ids)
+        version = (self.slots[header + 1] + 1) & 0x7fffffff
+        self.slots[header + 1] = version
+        self.known_versions[producer_id] = version
+
+    def append_product(self, producer_id, product_id, product):
+        """
+        Adds a product at the end of a buffer. The caller must hold the buffer's lock and
+        have synced it.
+        """
+        self.known_items[producer_id].append(product_id)
+        self.write_buffer(producer_id, len(self.known_items[producer_id]) - 1)
+        self.inventory.added(producer_id, product)
+
+    def refresh(self):
+        """
+        Brings the inventory up to date with the buffers other processes changed.
+        """
+        for producer_id in range(self.slots[0]):
+            version = self.slots[self.header(producer_id) + 1]
+            if self.known_versions.get(producer_id, -1) != version:
+                with self.buffers_locks[producer_id]:
+                    self.sync_buffer(producer_id)
+
+    def publish(self, producer_id, product):
+        """
+        Writes a product at the end of a buffer in the block, if it isn't full.
+        """
+        product_id = self.intern(product)
+        with self.buffers_locks[producer_id]:
+            self.sync_buffer(producer_id)
+            if len(self.known_items[producer_id]) >= self.queue_size_per_producer:
+                return False
+            self.append_product(producer_id, product_id, product)
+            return True
+
+    def claim(self, cart_id, producer_id, product):
+        """
+        Takes a product out of a buffer in the block and puts it in a cart of this process.
+        """
+        product_id = self.product_ids.get(product)
+        if product_id is None:
+            return False
+        with self.buffers_locks[producer_id]:
+            self.sync_buffer(producer_id)
+            product_ids = self.known_items[producer_id]
+            if product_id not in product_ids:
+                return False
+            # the products after it move one slot down
+            index = product_ids.index(product_id)
+            del product_ids[index]
+            self.write_buffer(producer_id, index)
+            self.inventory.removed(producer_id, product)
+            with self.carts_locks_dictionary[cart_id]:
+                self.carts_dictionary[cart_id].append((product, producer_id))
+                self.orders_dictionary[cart_id].add(product)
+            return True
+
+    def give_back(self, producer_id, product):
+        """
+        Adds a product back to a producer's buffer, even if it is full. If all its slots
+        are taken, the product goes to the buffer with the most free slots instead.
+
+        :returns the id of the producer whose buffer got the product; raises an
+        OverflowError if every slot is taken
+        """
+        product_id = self.intern(product)
+        with self.buffers_locks[producer_id]:
+            self.sync_buffer(producer_id)
+            if len(self.known_items[producer_id]) < self.slots_per_producer:
+                self.append_product(producer_id, product_id, product)
+                return producer_id
+        self.refresh()
+        emptiest_id = min(self.known_items,
+                          key=lambda other_id: len(self.known_items[other_id]))
+        with self.buffers_locks[emptiest_id]:
+            self.sync_buffer(emptiest_id)
+            if len(self.known_items[emptiest_id]) >= self.slots_per_producer:
+                raise OverflowError("no buffer has a free slot for " + repr(product))
+            self.append_product(emptiest_id, product_id, product)
+        return emptiest_id
+
+    def unclaim(self, cart_id, product):
+        """
+        Gives a product in a cart back to a buffer in the block; it stays in the cart if
+        every slot is taken.
+        """
+        with self.carts_locks_dictionary[cart_id]:
+            cart = self.carts_dictionary[cart_id]
+            for index, product_tuple in enumerate(cart):
+                if product_tuple[0] == product:
+                    del cart[index]
+                    self.orders_dictionary[cart_id].remove(product)
+                    break
+            else:
+                return None
+        try:
+            return self.give_back(product_tuple[1], product)
+        except OverflowError:
+            # every slot is taken, so the product stays in the cart
+            self.restore_to_cart(cart_id, [product_tuple])
+            return None
+
+    def return_cart(self, cart_id, still_due=None):
+        """
+        Gives the products in a cart back to the buffers in the block; the ones that don't
+        fit stay in the cart.
+        """
+        with self.carts_locks_dictionary[cart_id]:
+            if still_due is not None and not still_due():
+                return []
+            product_tuples = self.carts_dictionary[cart_id][:]
+            self.carts_dictionary[cart_id].clear()
+            self.orders_dictionary[cart_id] = Order()
+        returned_tuples = []
+        for index, product_tuple in enumerate(product_tuples):
+            try:
+                self.give_back(product_tuple[1], product_tuple[0])
+            except OverflowError:
+                self.restore_to_cart(cart_id, product_tuples[index:])
+                break
+            returned_tuples.append(product_tuple)
+        return returned_tuples
+
+    def restore_to_cart(self, cart_id, product_tuples):
+        """
+        Puts back in a cart the products that couldn't be given back.
+        """
+        with self.carts_locks_dictionary[cart_id]:
+            for product_tuple in product_tuples:
+                self.carts_dictionary[cart_id].append(product_tuple)
+                self.orders_dictionary[cart_id].add(product_tuple[0])
+
+    def buffer_items(self, producer_id):
+        """
+        :returns the products in a buffer, as the block has them
+        """
+        with self.buffers_locks[producer_id]:
+            self.sync_buffer(producer_id)
+            return [self.products[product_id] for product_id in self.known_items[producer_id]]
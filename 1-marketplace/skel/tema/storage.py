@@ -0,0 +1,411 @@
+"""
+This module offers the storage backends of the Marketplace: the producers' buffers and
+the consumers' carts.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from threading import Lock
+
+from .inventory import Inventory
+from .order import Order
+
+
+class MarketplaceStorage:
+    """
+    Class that represents a storage backend. It keeps the producers' buffers and the
+    consumers' carts and does its own locking, so that every operation is atomic and can
+    be called concurrently; add_producer and add_cart are serialized by the Marketplace.
+    Every product that enters or leaves a buffer is counted in the inventory while the
+    buffer is locked, so the counters always match the buffers.
+    """
+
+    def __init__(self, queue_size_per_producer, inventory):
+        """
+        Constructor
+
+        :type queue_size_per_producer: Int
+        :param queue_size_per_producer: the maximum size of a queue associated with each producer
+
+        :type inventory: Inventory
+        :param inventory: the counters of the products in the buffers
+        """
+        self.queue_size_per_producer = queue_size_per_producer
+        self.inventory = inventory
+
+    def add_producer(self):
+        """
+        Creates an empty buffer.
+
+        :returns the producer's id, the number of buffers created before
+        """
+        raise NotImplementedError
+
+    def add_cart(self):
+        """
+        Creates an empty cart.
+
+        :returns the cart's id: the last one released, if any, otherwise the number of
+        carts created before
+        """
+        raise NotImplementedError
+
+    def release_cart(self, cart_id):
+        """
+        Empties a cart whose order was placed, without giving its products back, and
+        keeps it for a later add_cart, which returns the same id. Like add_cart, it is
+        serialized by the Marketplace.
+        """
+        raise NotImplementedError
+
+    def publish(self, producer_id, product):
+        """
+        Adds a product to a producer's buffer, if it is not full.
+
+        :returns True or False, whether the product was added
+        """
+        raise NotImplementedError
+
+    def claim(self, cart_id, producer_id, product):
+        """
+        Moves a product from a producer's buffer to a cart, if the buffer has it.
+
+        :returns True or False, whether the product was moved
+        """
+        raise NotImplementedError
+
+    def unclaim(self, cart_id, product):
+        """
+        Moves a product from a cart back to the buffer of the producer it came from,
+        even if the buffer is full.
+
+        :returns the id of the producer whose buffer got the product or None, if the cart
+        doesn't have the product or no buffer has room for it
+        """
+        raise NotImplementedError
+
+    def return_cart(self, cart_id, still_due=None):
+        """
+        Moves all the products in a cart back to the buffers they came from; the ones
+        no buffer has room for stay in the cart.
+
+        :type still_due: Callable
+        :param still_due: if given, it is called while the cart is locked and the cart is
+        only returned if it returns True, e.g. if its order wasn't placed meanwhile
+
+        :returns a list with the (product, producer_id) tuples that were moved
+        """
+        raise NotImplementedError
+
+    def refresh(self):
+        """
+        Brings the inventory up to date with the changes made to the buffers by other
+        processes. It is called before the inventory is used to choose a buffer; the
+        backends used by a single process have nothing to do.
+        """
+
+    def buffer_items(self, producer_id):
+        """
+        :returns a list with the products in a producer's buffer
+        """
+        raise NotImplementedError
+
+    def cart_items(self, cart_id):
+        """
+        :returns a list with the (product, producer_id) tuples in a cart, in the order
+        they were added
+        """
+        raise NotImplementedError
+
+    def cart_order(self, cart_id):
+        """
+        :returns a snapshot of the cart's Order, with the quantities and total price
+        """
+        raise NotImplementedError
+
+
+class ListStorage(MarketplaceStorage):
+    """
+    The reference backend: a list per producer's buffer and a list of (product,
+    producer_id) tuples per cart, each with its lock. Finding a product in a buffer or
+    a cart is linear in its size.
+    """
+
+    def __init__(self, queue_size_per_producer, inventory):
+        MarketplaceStorage.__init__(self, queue_size_per_producer, inventory)
+        # dictionary of producers' buffers
+        self.producers_dictionary = {}
+        # dictionary of locks for each producer's buffer
+        self.producers_locks_dictionary = {}
+        # dictionary of consumers' carts
+        self.carts_dictionary = {}
+        # dictionary of the carts' aggregated orders, kept in sync with the carts
+        self.orders_dictionary = {}
+        # dictionary of locks for each cart, taken when the cart is changed
+        self.carts_locks_dictionary = {}
+        # the ids of the released carts, reused by add_cart
+        self.free_cart_ids = []
+
+    def add_producer(self):
+        producer_id = len(self.producers_dictionary)
+        self.producers_locks_dictionary[producer_id] = Lock()
+        self.inventory.add_producer(producer_id)
+        self.producers_dictionary[producer_id] = []
+        return producer_id
+
+    def add_cart(self):
+        # a released cart is already empty and keeps its lock
+        if self.free_cart_ids:
+            return self.free_cart_ids.pop()
+        cart_id = len(self.carts_dictionary)
+        self.carts_locks_dictionary[cart_id] = Lock()
+        self.orders_dictionary[cart_id] = Order()
+        self.carts_dictionary[cart_id] = []
+        return cart_id
+
+    def release_cart(self, cart_id):
+        with self.carts_locks_dictionary[cart_id]:
+            self.carts_dictionary[cart_id].clear()
+            self.orders_dictionary[cart_id] = Order()
+        self.free_cart_ids.append(cart_id)
+
+    def publish(self, producer_id, product):
+        # get lock of the producer's buffer; if it is not full, add the product
+        with self.producers_locks_dictionary[producer_id]:
+            if len(self.producers_dictionary[producer_id]) >= self.queue_size_per_producer:
+                return False
+            self.producers_dictionary[producer_id].append(product)
+            self.inventory.added(producer_id, product)
+            return True
+
+    def claim(self, cart_id, producer_id, product):
+        # get lock of the producer's buffer; if found, remove the product from the buffer
+        # and add it to the cart, alongside the producer's id
+        with self.producers_locks_dictionary[producer_id]:
+            buffer = self.producers_dictionary[producer_id]
+            if product not in buffer:
+                return False
+            buffer.remove(product)
+            self.inventory.removed(producer_id, product)
+            with self.carts_locks_dictionary[cart_id]:
+                self.carts_dictionary[cart_id].append((product, producer_id))
+                self.orders_dictionary[cart_id].add(product)
+            return True
+
+    def unclaim(self, cart_id, product):
+        # find the product in the cart and, if found, remove it
+        with self.carts_locks_dictionary[cart_id]:
+            cart = self.carts_dictionary[cart_id]
+            for index, product_tuple in enumerate(cart):
+                if product_tuple[0] == product:
+                    del cart[index]
+                    self.orders_dictionary[cart_id].remove(product)
+                    break
+            else:
+                return None
+        # add it back to the producer's buffer
+        return self.give_back(product_tuple[1], product)
+
+    def return_cart(self, cart_id, still_due=None):
+        with self.carts_locks_dictionary[cart_id]:
+            if still_due is not None and not still_due():
+                return []
+            product_tuples = self.carts_dictionary[cart_id][:]
+            self.carts_dictionary[cart_id].clear()
+            self.orders_dictionary[cart_id] = Order()
+        for product, producer_id in product_tuples:
+            self.give_back(producer_id, product)
+        return product_tuples
+
+    def give_back(self, producer_id, product):
+        """
+        Adds a product back to a producer's buffer, even if it is full.
+
+        :returns the id of the producer whose buffer got the product
+        """
+        with self.producers_locks_dictionary[producer_id]:
+            self.producers_dictionary[producer_id].append(product)
+            self.inventory.added(producer_id, product)
+        return producer_id
+
+    def buffer_items(self, producer_id):
+        with self.producers_locks_dictionary[producer_id]:
+            return self.producers_dictionary[producer_id][:]
+
+    def cart_items(self, cart_id):
+        with self.carts_locks_dictionary[cart_id]:
+            return self.carts_dictionary[cart_id][:]
+
+    def cart_order(self, cart_id):
+        with self.carts_locks_dictionary[cart_id]:
+            return self.orders_dictionary[cart_id].copy()
+
+
+class MultisetStorage(MarketplaceStorage):
+    """
+    Backend that keeps every buffer as a counted multiset, indexed by product, and every
+    cart as the count of each product from each producer. Finding, adding and removing
+    a product take O(1), whatever the size of the buffer or the cart.
+    """
+
+    def __init__(self, queue_size_per_producer, inventory):
+        MarketplaceStorage.__init__(self, queue_size_per_producer, inventory)
+        # for every producer, the count of each product in its buffer and the buffer's size
+        self.buffers = {}
+        self.buffers_sizes = {}
+        self.buffers_locks = {}
+        # for every cart, the count of each product from each producer, in the order the
+        # products and producers were first added
+        self.carts = {}
+        self.orders = {}
+        self.carts_locks = {}
+        # the ids of the released carts, reused by add_cart
+        self.free_cart_ids = []
+
+    def add_producer(self):
+        producer_id = len(self.buffers)
+        self.buffers_locks[producer_id] = Lock()
+        self.buffers_sizes[producer_id] = 0
+        self.inventory.add_producer(producer_id)
+        self.buffers[producer_id] = {}
+        return producer_id
+
+    def add_cart(self):
+        if self.free_cart_ids:
+            return self.free_cart_ids.pop()
+        cart_id = len(self.carts)
+        self.carts_locks[cart_id] = Lock()
+        self.orders[cart_id] = Order()
+        self.carts[cart_id] = {}
+        return cart_id
+
+    def release_cart(self, cart_id):
+        with self.carts_locks[cart_id]:
+            self.carts[cart_id] = {}
+            self.orders[cart_id] = Order()
+        self.free_cart_ids.append(cart_id)
+
+    def publish(self, producer_id, product):
+        with self.buffers_locks[producer_id]:
+            if self.buffers_sizes[producer_id] >= self.queue_size_per_producer:
+                return False
+            self.add_to_buffer(producer_id, product)
+            return True
+
+    def add_to_buffer(self, producer_id, product):
+        """
+        Adds a product to a producer's buffer. The caller must hold the buffer's lock.
+        """
+        buffer = self.buffers[producer_id]
+        buffer[product] = buffer.get(product, 0) + 1
+        self.buffers_sizes[producer_id] += 1
+        self.inventory.added(producer_id, product)
+
+    def claim(self, cart_id, producer_id, product):
+        with self.buffers_locks[producer_id]:
+            buffer = self.buffers[producer_id]
+            count = buffer.get(product)
+            if not count:
+                return False
+            if count > 1:
+                buffer[product] = count - 1
+            else:
+                del buffer[product]
+            self.buffers_sizes[producer_id] -= 1
+            self.inventory.removed(producer_id, product)
+            with self.carts_locks[cart_id]:
+                producers = self.carts[cart_id].setdefault(product, {})
+                producers[producer_id] = producers.get(producer_id, 0) + 1
+                self.orders[cart_id].add(product)
+            return True
+
+    def unclaim(self, cart_id, product):
+        with self.carts_locks[cart_id]:
+            producers = self.carts[cart_id].get(product)
+            if not producers:
+                return None
+            # like the list, give back the product that came from the first producer
+            producer_id = next(iter(producers))
+            if producers[producer_id] > 1:
+                producers[producer_id] -= 1
+            else:
+                del producers[producer_id]
+                if not producers:
+                    del self.carts[cart_id][product]
+            self.orders[cart_id].remove(product)
+        with self.buffers_locks[producer_id]:
+            self.add_to_buffer(producer_id, product)
+        return producer_id
+
+    def return_cart(self, cart_id, still_due=None):
+        with self.carts_locks[cart_id]:
+            if still_due is not None and not still_due():
+                return []
+            cart = self.carts[cart_id]
+            self.carts[cart_id] = {}
+            self.orders[cart_id] = Order()
+        product_tuples = []
+        for product, producers in cart.items():
+            for producer_id, count in producers.items():
+                with self.buffers_locks[producer_id]:
+                    for _ in range(count):
+                        self.add_to_buffer(producer_id, product)
+                product_tuples.extend([(product, producer_id)] * count)
+        return product_tuples
+
+    def buffer_items(self, producer_id):
+        with self.buffers_locks[producer_id]:
+            return [product for product, count in self.buffers[producer_id].items()
+                    for _ in range(count)]
+
+    def cart_items(self, cart_id):
+        # the multiset doesn't remember the order of the additions, only the first one
+        # of every product and producer
+        with self.carts_locks[cart_id]:
+            return [(product, producer_id)
+                    for product, producers in self.carts[cart_id].items()
+                    for producer_id, count in producers.items()
+                    for _ in range(count)]
+
+    def cart_order(self, cart_id):
+        with self.carts_locks[cart_id]:
+            return self.orders[cart_id].copy()
+
+
+def make_shared_memory_storage(queue_size_per_producer, inventory):
+    """
+    Creates a SharedMemoryStorage. Its module imports multiprocessing, so it is only
+    loaded by the runs that use it.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .shared_memory_storage import SharedMemoryStorage
+    return SharedMemoryStorage(queue_size_per_producer, inventory)
+
+
+# the storage backends, by name
+STORAGES = {
+    "list": ListStorage,
+    "multiset": MultisetStorage,
+    "shared-memory": make_shared_memory_storage,
+}
+
+
+def make_storage(storage, queue_size_per_producer):
+    """
+    :type storage: String or MarketplaceStorage
+    :param storage: the name of a storage backend or the backend itself, e.g. a shared
+    memory storage passed to this process
+
+    :type queue_size_per_producer: Int
+    :param queue_size_per_producer: the maximum size of a queue associated with each producer
+
+    :returns the storage backend, with a new inventory if it is created here
+    """
+    if isinstance(storage, MarketplaceStorage):
+        return storage
+    if storage not in STORAGES:
+        raise ValueError("unknown storage " + repr(storage) + "; choose one of " +
+                         ", ".join(STORAGES))
+    return STORAGES[storage](queue_size_per_producer, Inventory(queue_size_per_producer))
@@ -0,0 +1,285 @@
+"""
+This module stress tests the Marketplace with many threads and randomized schedules.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from threading import Barrier, Thread
+from time import perf_counter, sleep
+import random
+import sys
+
+from .marketplace import Marketplace
+from .product import Tea, Coffee
+
+# the products traded in the stress runs
+STRESS_PRODUCTS = [
+    Coffee(name="Indonezia", acidity=5.05, roast_level="MEDIUM", price=1),
+    Coffee(name="Brazil", acidity=4.05, roast_level="LIGHT", price=5),
+    Tea(name="Wild Cherry", type="Black", price=3),
+    Tea(name="Linden", type="Herbal", price=2),
+]
+
+
+def stress_products(operations_random, num_operations, yield_probability):
+    """
+    Generator that yields the product of every operation of a stress thread; before an
+    operation, the thread gives up the GIL at random.
+
+    :type operations_random: Random
+    :param operations_random: the thread's random choices
+    """
+    for _ in range(num_operations):
+        if operations_random.random() < yield_probability:
+            sleep(0)
+        yield operations_random.choice(STRESS_PRODUCTS)
+
+
+def count_operation(tally, operation):
+    """
+    Counts an operation of a stress thread in its tally.
+    """
+    operations = tally["operations"]
+    operations[operation] = operations.get(operation, 0) + 1
+
+
+def stress_producer(marketplace, producer_id, products, tally):
+    """
+    Publishes every product, counting the successful and the failed publishes.
+
+    :type products: Iterable
+    :param products: the products to publish
+    """
+    for product in products:
+        if marketplace.publish(producer_id, product):
+            count_operation(tally, "publish")
+        else:
+            count_operation(tally, "failed_publish")
+
+
+def stress_consumer(marketplace, products, operations_random, tally):
+    """
+    For every product, adds it to the open cart, removes it, expires the cart or places
+    the order and takes a new cart, at random. The tally keeps the id of the open cart and,
+    for every placed order, the id of its cart and its size.
+
+    :type products: Iterable
+    :param products: the products of the operations
+
+    :type operations_random: Random
+    :param operations_random: the consumer's random choices
+    """
+    for product in products:
+        operation = operations_random.random()
+        if operation < 0.55:
+            if marketplace.add_to_cart(tally["cart_id"], product):
+                count_operation(tally, "add_to_cart")
+            else:
+                count_operation(tally, "failed_add_to_cart")
+        elif operation < 0.85:
+            marketplace.remove_from_cart(tally["cart_id"], product)
+            count_operation(tally, "remove_from_cart")
+        elif operation < 0.9:
+            marketplace.expire_cart(tally["cart_id"])
+            count_operation(tally, "expire_cart")
+        else:
+            order = marketplace.place_order(tally["cart_id"], aggregated=True)
+            tally["orders"].append((tally["cart_id"], len(order)))
+            tally["cart_id"] = marketplace.new_cart()
+            count_operation(tally, "place_order")
+
+
+def run_catching(errors, target, *args):
+    """
+    Calls a thread's target and keeps the exception it raises, which would otherwise only
+    be printed.
+    """
+    try:
+        target(*args)
+    except Exception as error:  # pylint: disable=broad-except
+        errors.append(error)
+
+
+def run_threads(threads, switch_interval):
+    """
+    Starts the threads and waits for them, with the interpreter switching threads at the
+    given interval.
+
+    :returns the number of seconds they ran
+    """
+    old_switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(switch_interval)
+    try:
+        start_time = perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return perf_counter() - start_time
+    finally:
+        sys.setswitchinterval(old_switch_interval)
+
+
+def count_products(marketplace, producer_tallies, consumer_tallies):
+    """
+    :returns a dictionary with the number of products published, in the buffers, in the
+    open carts and in the placed orders, whether every placed order still matches its
+    cart and the number of operations of every kind
+    """
+    operations = {}
+    for tally in producer_tallies + consumer_tallies:
+        for operation, count in tally["operations"].items():
+            operations[operation] = operations.get(operation, 0) + count
+    storage = marketplace.storage
+    return {
+        "published": operations.get("publish", 0),
+        "buffered": sum(len(storage.buffer_items(tally["producer_id"]))
+                        for tally in producer_tallies),
+        "in_carts": sum(len(storage.cart_items(tally["cart_id"])) for tally in consumer_tallies),
+        "ordered": sum(size for tally in consumer_tallies for _, size in tally["orders"]),
+        # a placed order is a snapshot; nobody touches its cart afterwards, so they must match
+        "placed_carts_match": all(len(storage.cart_items(cart_id)) == size
+                                  for tally in consumer_tallies
+                                  for cart_id, size in tally["orders"]),
+        "operations": operations,
+    }
+
+
+def run_stress(marketplace_options=None, num_producers=4, num_consumers=8,
+               num_operations=2000, queue_size_per_producer=5, yield_probability=0.2,
+               switch_interval=1e-5, seed=0):
+    """
+    Runs producer and consumer threads against one marketplace. Every producer publishes
+    random products; every consumer adds, removes, expires its cart or places the order
+    and takes a new cart, at random. The threads give up the GIL at random points and the
+    interpreter switches threads much more often than usual, so many interleavings are
+    tried. At the end, every product published must be in a buffer, in an open cart or in
+    a placed order.
+
+    :type marketplace_options: Dict
+    :param marketplace_options: the keyword arguments of the Marketplace, besides the queue size
+
+    :type num_operations: Int
+    :param num_operations: the number of operations of every thread
+
+    :type yield_probability: Float
+    :param yield_probability: the probability that a thread yields before an operation
+
+    :type switch_interval: Float
+    :param switch_interval: the interpreter's thread switch interval during the run
+
+    :type seed: Int
+    :param seed: the seed of the threads' random choices
+
+    :returns a dictionary with the counts of the products, the counts of the operations,
+    the exceptions raised in the threads and the throughput
+    """
+    marketplace = Marketplace(queue_size_per_producer, **(marketplace_options or {}))
+    # what every thread did, with the producer's id or the consumer's open cart
+    producer_tallies = [{"producer_id": marketplace.register_producer(), "operations": {}}
+                        for _ in range(num_producers)]
+    consumer_tallies = [{"cart_id": marketplace.new_cart(), "orders": [], "operations": {}}
+                        for _ in range(num_consumers)]
+    # the exceptions raised in the threads
+    errors = []
+
+    threads = []
+    for index, tally in enumerate(producer_tallies + consumer_tallies):
+        operations_random = random.Random(seed * 1000 + index)
+        products = stress_products(operations_random, num_operations, yield_probability)
+        if index < num_producers:
+            args = (stress_producer, marketplace, tally["producer_id"], products, tally)
+        else:
+            args = (stress_consumer, marketplace, products, operations_random, tally)
+        threads.append(Thread(target=run_catching, args=(errors,) + args))
+    wall_time = run_threads(threads, switch_interval)
+
+    result = count_products(marketplace, producer_tallies, consumer_tallies)
+    result.update({
+        "marketplace": marketplace,
+        "errors": errors,
+        "wall_time": wall_time,
+        "throughput": sum(result["operations"].values()) / wall_time,
+    })
+    return result
+
+
+def race_for_last_unit(marketplace_options=None, num_consumers=8):
+    """
+    Publishes a single unit and lets several consumers try to add it to their carts at
+    the same moment.
+
+    :returns the number of consumers that got the unit
+    """
+    marketplace = Marketplace(1, **(marketplace_options or {}))
+    producer_id = marketplace.register_producer()
+    cart_ids = [marketplace.new_cart() for _ in range(num_consumers)]
+    product = STRESS_PRODUCTS[0]
+    marketplace.publish(producer_id, product)
+
+    barrier = Barrier(num_consumers)
+    results = [False] * num_consumers
+
+    def race(index):
+        barrier.wait()
+        results[index] = marketplace.add_to_cart(cart_ids[index], product)
+
+    threads = [Thread(target=race, args=(i,)) for i in range(num_consumers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(results)
+
+
+def run_contention(marketplace_options=None, priorities=(1, 1, 0, 0, 0, 0, 0, 0),
+                   num_units=200, publish_interval=1e-3, retry_wait_time=1e-3):
+    """
+    Lets consumers of several priorities compete for a product that a single producer
+    publishes slowly, so that there is never enough of it. Every consumer retries until it
+    gets a unit, then wants another one, until all the units are sold.
+
+    :type priorities: Tuple
+    :param priorities: the priority of every consumer's cart
+
+    :type num_units: Int
+    :param num_units: the number of units published
+
+    :type publish_interval: Float
+    :param publish_interval: the number of seconds between two units
+
+    :type retry_wait_time: Float
+    :param retry_wait_time: the number of seconds a consumer waits after a failed add
+
+    :returns the marketplace's latency stats, by priority, and the units each consumer got
+    """
+    marketplace = Marketplace(1, **(marketplace_options or {}))
+    producer_id = marketplace.register_producer()
+    cart_ids = [marketplace.new_cart(priority=priority) for priority in priorities]
+    product = STRESS_PRODUCTS[0]
+    bought = [0] * len(priorities)
+    done = []
+
+    def run_producer():
+        for _ in range(num_units):
+            while not marketplace.publish(producer_id, product):
+                sleep(publish_interval)
+            sleep(publish_interval)
+        done.append(True)
+
+    def run_consumer(index):
+        while not done or marketplace.stock(product):
+            if marketplace.add_to_cart(cart_ids[index], product):
+                bought[index] += 1
+            else:
+                sleep(retry_wait_time)
+
+    threads = [Thread(target=run_producer)] + \
+              [Thread(target=run_consumer, args=(i,)) for i in range(len(priorities))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return marketplace.latency_stats(), bought
@@ -6,13 +6,15 @@ Assignment 1
 March 2020
 """
 
-import sys
-from json import loads
+import argparse
 
+from tema.allocator import ALLOCATORS
+from tema.claim_policy import CLAIM_POLICIES
+from tema.config import load_market_config
 from tema.producer import Producer
 from tema.consumer import Consumer
-from tema.marketplace import Marketplace
-from tema.product import Product, Coffee, Tea
+from tema.storage import STORAGES
+from tema.marketplace import Marketplace, setup_logging
 
 
 def main():
@@ -20,54 +22,106 @@ def main():
         Convert the market_configuration input file into specific models:
         Producer, Consumer, Marketplace
     """
-    try:
-        filename = sys.argv[1]
-    except IndexError:
-        print("no input file specified")
-        raise SystemExit
-
-    with open(filename) as input_file:
-        market_config = loads(input_file.read())
-
-    # turn product definitions into actual products
-    products = {}
-
-    for k, products_dict in market_config['products'].items():
-        params = {k: products_dict[k] for k in products_dict.keys() if k != 'product_type'}
-        products[k] = globals()[products_dict['product_type']](**params)
-    del market_config['products']
-
-    # turn product ids into products in producers
-    for producer in market_config['producers']:
-        producer['products'] = [(products[i], quantity, sleep_time)
-                                for i, quantity, sleep_time
-                                in producer['products']]
-
-    # turn product ids into products in consumer order lists and expected carts
-    for consumer in market_config['consumers']:
-        for cart in consumer['carts']:
-            for operation in cart:
-                operation['product'] = products[operation['product']]
+    args = parse_args()
+
+    market_config = load_market_config(args.filename)
+    setup_logging()
 
     # build the marketplace
-    marketplace = Marketplace(**market_config['marketplace'])
+    marketplace = Marketplace(**market_config['marketplace'], claim_policy=args.claim_policy,
+                              storage=args.storage, allocator=args.allocator)
 
     # build and start the producers
-    producers = [Producer(**p_market_config, marketplace=marketplace, daemon=True)
+    producers = [Producer(**p_market_config, marketplace=marketplace,
+                          quota=args.producer_quota, backoff=args.producer_backoff, daemon=True)
                  for p_market_config in market_config['producers']]
 
-    for producer in producers:
-        producer.start()
+    # either multiplex the producers on a scheduler or run one thread per producer
+    scheduler = None
+    if args.producer_workers > 0:
+        # the scheduler and the pool are only imported by the runs that use them
+        # pylint: disable=import-outside-toplevel
+        from tema.producer_scheduler import ProducerScheduler
+        scheduler = ProducerScheduler(marketplace, args.producer_workers)
+        for producer in producers:
+            scheduler.submit(producer)
+        scheduler.start()
+    else:
+        for producer in producers:
+            producer.start()
 
     # build and start the consumers
-    consumers = [Consumer(**c_market_config, marketplace=marketplace)
-                 for c_market_config in market_config['consumers']]
-
-    for consumer in consumers:
-        consumer.start()
-
-    for consumer in consumers:
-        consumer.join()
+    # the consumers get the priorities in turn
+    consumers = [Consumer(**c_market_config, marketplace=marketplace, cart_ttl=args.cart_ttl,
+                          backoff=args.consumer_backoff,
+                          priority=args.consumer_priorities[index %
+                                                            len(args.consumer_priorities)])
+                 for index, c_market_config in enumerate(market_config['consumers'])]
+
+    # either run the consumers' carts on a fixed pool of workers or one thread per consumer
+    if args.consumer_workers > 0:
+        # pylint: disable=import-outside-toplevel
+        from tema.consumer_pool import ConsumerPool
+        pool = ConsumerPool(args.consumer_workers)
+        for consumer in consumers:
+            pool.submit(consumer)
+        pool.start()
+        pool.join()
+    else:
+        for consumer in consumers:
+            consumer.start()
+
+        for consumer in consumers:
+            consumer.join()
+
+    # once the demand is gone, stop the producers instead of letting them spin until exit
+    if args.producer_mode == "until-consumers-done":
+        marketplace.close()
+        if scheduler is not None:
+            scheduler.join()
+        else:
+            for producer in producers:
+                producer.join()
+
+
+def parse_args():
+    """
+        Parse the command line arguments: the input file and the run options
+    """
+    parser = argparse.ArgumentParser(description="Run the marketplace on a test file")
+    parser.add_argument("filename", help="the market configuration input file")
+    parser.add_argument("--claim-policy", choices=sorted(CLAIM_POLICIES), default="first",
+                        help="the producer's buffer a product is taken from (default: first)")
+    parser.add_argument("--storage", choices=sorted(STORAGES), default="list",
+                        help="the backend of the buffers and carts (default: list)")
+    parser.add_argument("--allocator", choices=sorted(ALLOCATORS), default="first-come",
+                        help="which of the carts that want a scarce product may take it "
+                             "(default: first-come)")
+    parser.add_argument("--consumer-priorities", type=int, nargs="+", default=[0],
+                        help="the priorities given to the consumers in turn (default: 0)")
+    parser.add_argument("--consumer-workers", type=int, default=0,
+                        help="run the consumers on this many worker threads "
+                             "(default: one thread per consumer)")
+    parser.add_argument("--producer-workers", type=int, default=0,
+                        help="run the producers on a timer wheel scheduler with this many "
+                             "worker threads (default: one thread per producer)")
+    parser.add_argument("--producer-backoff", choices=["fixed", "adaptive"], default="fixed",
+                        help="wait republish_wait_time after a failed publish or adapt the "
+                             "wait to the marketplace's backpressure (default: fixed)")
+    parser.add_argument("--producer-mode", choices=["forever", "until-consumers-done"],
+                        default="forever",
+                        help="produce until the process exits or stop the producers "
+                             "once all the consumers finished (default: forever)")
+    parser.add_argument("--producer-quota", type=int, default=None,
+                        help="stop every producer after publishing this many products")
+    parser.add_argument("--consumer-backoff", choices=["fixed", "exponential", "expected"],
+                        default="fixed",
+                        help="wait retry_wait_time after a failed add_to_cart, back off "
+                             "exponentially or wait for the expected arrival (default: fixed)")
+    parser.add_argument("--cart-ttl", type=float, default=None,
+                        help="return the products of a cart to the producers after this many "
+                             "seconds without activity")
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
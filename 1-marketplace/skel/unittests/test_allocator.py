@@ -0,0 +1,101 @@
+"""
+This module tests the allocators.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import unittest
+
+from tema.allocator import LatencyStats, PriorityAllocator, make_allocator
+from tema.inventory import Inventory
+
+
+class TestAllocator(unittest.TestCase):
+    """
+    Class for unittesting the allocator module
+    """
+    def setUp(self):
+        """
+        Initialize an inventory with a single tea, a premium cart 0 and regular carts 1, 2
+        """
+        self.inventory = Inventory(10)
+        self.inventory.add_producer(0)
+        self.inventory.added(0, "tea")
+        self.allocator = PriorityAllocator(aging=1.0)
+        for cart_id, priority in enumerate([2, 0, 0]):
+            self.allocator.set_priority(cart_id, priority)
+
+    def test_first_come(self):
+        """
+        Test that the first come allocator admits every cart
+        """
+        allocator = make_allocator("first-come")
+        allocator.failed(0, "tea", now=0)
+        self.assertTrue(allocator.admit(1, "tea", self.inventory, now=0))
+
+    def test_priority(self):
+        """
+        Test that a scarce product is kept for the waiting carts with a higher priority
+        """
+        self.assertTrue(self.allocator.admit(1, "tea", self.inventory, now=0))
+        self.allocator.failed(0, "tea", now=0)
+        self.assertFalse(self.allocator.admit(1, "tea", self.inventory, now=0.5))
+        self.assertTrue(self.allocator.admit(0, "tea", self.inventory, now=0.5))
+        # there is enough for the premium cart and another one
+        self.inventory.added(0, "tea")
+        self.assertTrue(self.allocator.admit(1, "tea", self.inventory, now=0.5))
+
+        # once served, the premium cart doesn't wait anymore
+        self.inventory.removed(0, "tea")
+        self.allocator.served(0, "tea", now=0.5)
+        self.assertTrue(self.allocator.admit(1, "tea", self.inventory, now=0.5))
+        self.assertEqual(self.allocator.latency_stats()[2]["mean"], 0.5)
+
+    def test_aging(self):
+        """
+        Test that a regular cart that waited long enough outranks a new premium cart
+        """
+        self.allocator.failed(1, "tea", now=0)
+        self.allocator.failed(0, "tea", now=2.5)
+        self.assertFalse(self.allocator.admit(0, "tea", self.inventory, now=3))
+        self.assertTrue(self.allocator.admit(1, "tea", self.inventory, now=3))
+        self.assertFalse(self.allocator.admit(2, "tea", self.inventory, now=3))
+
+    def test_forget(self):
+        """
+        Test that a released cart doesn't wait anymore
+        """
+        self.allocator.failed(0, "tea", now=0)
+        self.allocator.forget(0)
+        self.assertTrue(self.allocator.admit(1, "tea", self.inventory, now=0))
+
+    def test_stale(self):
+        """
+        Test that a cart that stopped trying doesn't keep the product from the others
+        """
+        self.allocator.failed(0, "tea", now=0)
+        self.assertFalse(self.allocator.admit(1, "tea", self.inventory, now=4))
+        self.assertTrue(self.allocator.admit(1, "tea", self.inventory, now=6))
+        self.allocator.failed(0, "tea", now=6)
+        self.allocator.stop_waiting(0)
+        self.assertTrue(self.allocator.admit(1, "tea", self.inventory, now=6))
+
+    def test_latency_stats(self):
+        """
+        Test the summary of the latencies
+        """
+        latencies = LatencyStats(window=4)
+        self.assertEqual(latencies.summary()["count"], 0)
+        for latency in [5, 1, 2, 3, 4]:
+            latencies.record(latency)
+        self.assertEqual(latencies.summary(), {"count": 5, "mean": 3, "p50": 3, "p95": 4,
+                                               "max": 5})
+
+    def test_unknown(self):
+        """
+        Test that an unknown allocator is rejected
+        """
+        with self.assertRaises(ValueError):
+            make_allocator("lottery")
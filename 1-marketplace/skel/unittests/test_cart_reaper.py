@@ -0,0 +1,89 @@
+"""
+This module tests the CartReaper.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from time import sleep
+import unittest
+
+from tema.cart_reaper import CartReaper
+
+
+class TestCartReaper(unittest.TestCase):
+    """
+    Class for unittesting the cart reaper module
+    """
+    def setUp(self):
+        """
+        Start a reaper that records the expired carts instead of emptying them
+        """
+        self.expired_carts = []
+        self.reaper = CartReaper(self)
+        self.reaper.start()
+
+    def tearDown(self):
+        """
+        Stop the reaper
+        """
+        self.reaper.stop()
+        self.reaper.join()
+
+    def expire_cart(self, cart_id, still_due):
+        """
+        Record an expired cart, in place of the marketplace
+        """
+        if still_due():
+            self.expired_carts.append(cart_id)
+
+    def test_expired_cart(self):
+        """
+        Test that only the carts whose ttl passed expire
+        """
+        self.reaper.track(0, 0.05)
+        self.reaper.track(1, 5)
+        sleep(0.2)
+        self.assertEqual(self.expired_carts, [0])
+
+    def test_touched_cart(self):
+        """
+        Test that the activity postpones the expiry and that an expired cart is armed again
+        """
+        self.reaper.track(0, 0.3)
+        sleep(0.2)
+        self.reaper.touch(0)
+        sleep(0.2)
+        self.assertEqual(self.expired_carts, [])
+        sleep(0.3)
+        self.assertEqual(self.expired_carts, [0])
+
+        self.reaper.touch(0)
+        sleep(0.5)
+        self.assertEqual(self.expired_carts, [0, 0])
+
+    def test_forgotten_cart(self):
+        """
+        Test that a forgotten cart doesn't expire
+        """
+        self.reaper.track(0, 0.05)
+        self.reaper.forget(0)
+        self.reaper.touch(0)
+        sleep(0.2)
+        self.assertEqual(self.expired_carts, [])
+        self.assertEqual(self.reaper.deadlines_heap, [])
+
+    def test_still_expired(self):
+        """
+        Test that an expired cart is no longer due once it is touched or forgotten
+        """
+        reaper = CartReaper(self)
+        reaper.track(0, 0)
+        self.assertEqual(reaper.next_expired_cart(), 0)
+        self.assertTrue(reaper.still_expired(0))
+        reaper.touch(0)
+        self.assertFalse(reaper.still_expired(0))
+        self.assertEqual(reaper.next_expired_cart(), 0)
+        reaper.forget(0)
+        self.assertFalse(reaper.still_expired(0))
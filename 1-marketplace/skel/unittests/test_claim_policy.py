@@ -0,0 +1,73 @@
+"""
+This module tests the claim policies.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import unittest
+
+from tema.claim_policy import RandomKPolicy, make_claim_policy
+from tema.inventory import Inventory
+
+
+class TestClaimPolicy(unittest.TestCase):
+    """
+    Class for unittesting the claim policy module
+    """
+    def setUp(self):
+        """
+        Initialize an inventory where producer 2 is the fullest and producer 1 has no tea
+        """
+        self.inventory = Inventory(10)
+        for producer_id, products in enumerate([["tea"], ["coffee"], ["tea", "tea", "tea"],
+                                                ["tea", "coffee"]]):
+            self.inventory.add_producer(producer_id)
+            for product in products:
+                self.inventory.added(producer_id, product)
+
+    def test_first(self):
+        """
+        Test that the producers are tried by id
+        """
+        self.assertEqual(make_claim_policy("first").candidates(self.inventory, "tea"),
+                         [0, 2, 3])
+
+    def test_full_first(self):
+        """
+        Test that the full buffers are tried first, then the others by id
+        """
+        self.assertEqual(make_claim_policy("full-first").candidates(self.inventory, "tea"),
+                         [0, 2, 3])
+        for _ in range(8):
+            self.inventory.added(3, "coffee")
+        self.assertEqual(make_claim_policy("full-first").candidates(self.inventory, "tea"),
+                         [3, 0, 2])
+
+    def test_round_robin(self):
+        """
+        Test that every claim of a product starts from the next producer
+        """
+        policy = make_claim_policy("round-robin")
+        self.assertEqual([policy.candidates(self.inventory, "tea")[0] for _ in range(4)],
+                         [0, 2, 3, 0])
+        self.assertEqual(policy.candidates(self.inventory, "coffee")[0], 1)
+        self.assertEqual(policy.candidates(self.inventory, "water"), [])
+
+    def test_random_k(self):
+        """
+        Test that all the producers are candidates and the fullest of the chosen comes first
+        """
+        policy = RandomKPolicy(3)
+        for _ in range(10):
+            candidates = policy.candidates(self.inventory, "tea")
+            self.assertEqual(sorted(candidates), [0, 2, 3])
+            self.assertEqual(candidates[0], 2)
+
+    def test_unknown_policy(self):
+        """
+        Test that an unknown policy name is rejected
+        """
+        with self.assertRaises(ValueError):
+            make_claim_policy("cheapest")
@@ -0,0 +1,85 @@
+"""
+This module tests the ConsumerPool.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from contextlib import redirect_stdout
+from io import StringIO
+from threading import Timer
+import unittest
+
+from tema.consumer import Consumer
+from tema.consumer_pool import ConsumerPool
+from tema.marketplace import Marketplace
+from tema.product import Tea, Coffee
+
+
+class TestConsumerPool(unittest.TestCase):
+    """
+    Class for unittesting the consumer pool module
+    """
+    def setUp(self):
+        """
+        Initialize the marketplace, a producer's id and the products
+        """
+        self.marketplace = Marketplace(10)
+        self.producer_id = self.marketplace.register_producer()
+        self.product_1 = Tea(name = "Linden", type = "Herbal", price = 9)
+        self.product_2 = Coffee(name = "Brazil", acidity = 4.05, \
+                        roast_level = "LIGHT", price = 5)
+
+    def new_consumer(self, name, product, quantity):
+        """
+        Create a consumer that buys the given quantity of a product
+        """
+        return Consumer(carts = [[{
+            "type": "add",
+            "product": product,
+            "quantity": quantity
+        }]], marketplace = self.marketplace, retry_wait_time = 0.01, name = name)
+
+    def test_runs_all_consumers(self):
+        """
+        Test that more consumers than workers all get to place their orders
+        """
+        for _ in range(10):
+            self.marketplace.publish(self.producer_id, self.product_1)
+        pool = ConsumerPool(2)
+        for i in range(5):
+            pool.submit(self.new_consumer("cons" + str(i), self.product_1, 2))
+
+        output = StringIO()
+        with redirect_stdout(output):
+            pool.start()
+            pool.join()
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 10)
+        for i in range(5):
+            self.assertEqual(lines.count("cons" + str(i) + " bought " + str(self.product_1)), 2)
+
+    def test_parked_task_frees_worker(self):
+        """
+        Test that a consumer waiting for a product doesn't keep the only worker busy
+        """
+        self.marketplace.publish(self.producer_id, self.product_1)
+        pool = ConsumerPool(1)
+        pool.submit(self.new_consumer("waiting", self.product_2, 1))
+        pool.submit(self.new_consumer("served", self.product_1, 1))
+        publisher = Timer(0.1, self.marketplace.publish, args = (self.producer_id, self.product_2))
+
+        output = StringIO()
+        with redirect_stdout(output):
+            pool.start()
+            publisher.start()
+            pool.join()
+        publisher.join()
+
+        # the second consumer was served while the first one was parked
+        self.assertEqual(output.getvalue().splitlines(),
+                         ["served bought " + str(self.product_1),
+                          "waiting bought " + str(self.product_2)])
+        self.assertEqual(pool.unfinished_tasks, 0)
@@ -0,0 +1,55 @@
+"""
+This module tests the Demand.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import unittest
+
+from tema.demand import Demand
+
+
+class TestDemand(unittest.TestCase):
+    """
+    Class for unittesting the demand module
+    """
+    def setUp(self):
+        """
+        Initialize the demand
+        """
+        self.demand = Demand()
+
+    def test_rates(self):
+        """
+        Test that the estimates are created by the first record or query
+        """
+        self.assertIsNone(self.demand.expected_drain(0))
+        self.assertIsNone(self.demand.expected_arrival("tea"))
+        for _ in range(2):
+            self.demand.drained(0)
+            self.demand.arrived("tea")
+        self.assertIsNotNone(self.demand.expected_drain(0))
+        self.assertIsNotNone(self.demand.expected_arrival("tea"))
+        self.assertEqual(list(self.demand.arrival_rates), ["tea"])
+
+    def test_waiting_carts(self):
+        """
+        Test the carts that wait for a product until they get it or stop waiting
+        """
+        self.demand.wait(0, "tea")
+        self.demand.wait(1, "tea")
+        self.demand.wait(1, "coffee")
+        self.assertEqual(self.demand.waiting_count("tea"), 2)
+        self.demand.served(0, "tea")
+        self.demand.served(0, "water")
+        self.assertEqual(self.demand.waiting_count("tea"), 1)
+        self.demand.stop_waiting(1)
+        self.assertEqual(self.demand.waiting_count("tea"), 0)
+        self.assertEqual(self.demand.waiting_count("coffee"), 0)
+        self.assertEqual(self.demand.waiting_count("water"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+This module tests the Inventory.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import unittest
+from threading import Event, Thread
+
+from tema.inventory import Inventory
+
+
+class TestInventory(unittest.TestCase):
+    """
+    Class for unittesting the inventory module
+    """
+    def setUp(self):
+        """
+        Initialize the inventory with two producers
+        """
+        self.inventory = Inventory(5)
+        self.inventory.add_producer(0)
+        self.inventory.add_producer(1)
+
+    def test_counters(self):
+        """
+        Test the stock, stock_by_producer, total_items and free_capacity methods
+        """
+        for _ in range(3):
+            self.inventory.added(0, "tea")
+        self.inventory.added(1, "tea")
+        self.inventory.added(1, "coffee")
+        self.inventory.removed(0, "tea")
+
+        self.assertEqual(self.inventory.stock("tea"), 3)
+        self.assertEqual(self.inventory.stock("coffee"), 1)
+        self.assertEqual(self.inventory.stock("water"), 0)
+        self.assertEqual(self.inventory.stock_by_producer(), {0: 2, 1: 2})
+        self.assertEqual(self.inventory.total_items(), 4)
+        self.assertEqual(self.inventory.free_capacity(0), 3)
+        self.assertEqual(sorted(self.inventory.producers_with("tea")), [0, 1])
+        self.assertEqual(self.inventory.producers_with("coffee"), [1])
+        self.assertEqual(self.inventory.producers_with("water"), [])
+
+    def test_top_products(self):
+        """
+        Test the top_products method while the counts go up and down
+        """
+        for product, count in [("tea", 3), ("coffee", 1), ("water", 2)]:
+            for _ in range(count):
+                self.inventory.added(0, product)
+        self.assertEqual(self.inventory.top_products(2), [("tea", 3), ("water", 2)])
+
+        self.inventory.removed(0, "tea")
+        self.inventory.removed(0, "tea")
+        self.inventory.added(0, "coffee")
+        self.assertEqual(self.inventory.top_products(5),
+                         [("water", 2), ("coffee", 2), ("tea", 1)])
+
+        for product, count in [("tea", 1), ("coffee", 2), ("water", 2)]:
+            for _ in range(count):
+                self.inventory.removed(0, product)
+        self.assertEqual(self.inventory.top_products(5), [])
+        self.assertEqual(self.inventory.highest_count, 0)
+        self.assertEqual(self.inventory.count_buckets, {0: {}})
+
+    def test_queries_without_locks(self):
+        """
+        Test that the queries don't wait for the updates' locks
+        """
+        self.inventory.added(0, "tea")
+        self.inventory.added(1, "tea")
+        with self.inventory.producers_lock, self.inventory.products_lock:
+            self.assertEqual(self.inventory.stock_by_producer(), {0: 1, 1: 1})
+            self.assertEqual(self.inventory.producers_with("tea"), [0, 1])
+            self.assertEqual(self.inventory.top_products(1), [("tea", 2)])
+
+    def test_top_products_during_updates(self):
+        """
+        Test that top_products sees every product once while another thread updates the counts
+        """
+        products = ["tea", "coffee", "water", "juice"]
+        stop = Event()
+
+        def update():
+            while not stop.is_set():
+                for product in products:
+                    self.inventory.added(0, product)
+                for product in products:
+                    self.inventory.removed(0, product)
+
+        updater = Thread(target=update)
+        updater.start()
+        try:
+            for _ in range(2000):
+                top = self.inventory.top_products(len(products))
+                self.assertEqual(len(top), len({product for product, _ in top}))
+                self.assertTrue(all(count > 0 for _, count in top))
+        finally:
+            stop.set()
+            updater.join()
@@ -0,0 +1,138 @@
+"""
+This module tests the log analysis.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import os
+import tempfile
+import unittest
+
+from tema import log_analysis
+from tema.log_analysis import LogAnalyser, NumpyLogAnalyser, analyse_logs, rotated_files
+
+LOG_LINES = [
+    "21/04/2023 07:01:15 PM - INFO - Called publish with producer_id = 0 and product = "
+    "Tea(name='Linden', price=2, type='Herbal').\n",
+    "21/04/2023 07:01:15 PM - INFO - Called publish with producer_id = 1 and product = "
+    "Tea(name='Linden', price=2, type='Herbal').\n",
+    "21/04/2023 07:01:15 PM - INFO - Done calling publish; added the product to the "
+    "producer's buffer.\n",
+    "21/04/2023 07:01:15 PM - INFO - Done calling publish; buffer full, failed to add.\n",
+    "21/04/2023 07:01:16 PM - INFO - Called add_to_cart with parameters cart_id = 3, "
+    "product = Tea(name='Linden', price=2, type='Herbal').\n",
+    "21/04/2023 07:01:16 PM - INFO - Done calling add_to_cart; failed to find product.\n",
+    "21/04/2023 07:01:18 PM - INFO - Called place_order with parameter cart_id = 3.\n",
+    "Traceback (most recent call last):\n",
+]
+
+# lines that only a careful parser counts like LogAnalyser does
+TRICKY_LINES = [
+    "21/04/2023 07:01:18 PM - INFO - Done calling place_order; the cart items are: [" +
+    ", ".join(["Tea(name='Failed Harvest', price=2, type='Herbal')"] * 20) + "].\n",
+    "21/04/2023 07:01:18 PM - INFO - Called remove_from_cart with parameters cart_id = 3, "
+    "product = Tea(name='cart_id = 7', price=2, type='Herbal').\n",
+    "21/04/2023 07:01:18 PM - INFO - Done calling remove_from_cart; product not found.\n",
+    "21/04/2023 07:01:19 PM - INFO - Called publish with producer_id = x, producer_id = 2\n",
+    "21/04/2023 07:01:19 PM - INFO - Done calling new_cart\n",
+    "\n",
+    "21/04/2023 07:01:20 PM - INFO - Called publish with producer_id = 12345 and product",
+]
+
+
+class TestLogAnalysis(unittest.TestCase):
+    """
+    Class for unittesting the log analysis module
+    """
+
+    def test_report(self):
+        """
+        Test the counts, rates and failures of the methods and the activity
+        """
+        analyser = LogAnalyser()
+        for line in LOG_LINES:
+            analyser.feed(line)
+        report = analyser.report()
+
+        self.assertEqual(report["lines"], 8)
+        self.assertEqual(report["skipped_lines"], 1)
+        self.assertEqual(report["active_seconds"], 3)
+        self.assertEqual(report["start"], "2023-04-21 19:01:15")
+        self.assertEqual(report["end"], "2023-04-21 19:01:18")
+        publish = report["methods"]["publish"]
+        self.assertEqual((publish["calls"], publish["done"], publish["peak_rate"]), (2, 2, 2))
+        self.assertEqual(publish["failures"], {"buffer full, failed to add": 1})
+        self.assertEqual(publish["failure_ratio"], 0.5)
+        self.assertEqual(report["methods"]["add_to_cart"]["failure_ratio"], 1.0)
+        self.assertEqual(report["methods"]["place_order"]["done"], 0)
+        self.assertEqual(report["producers"], {0: {"publish": 1}, 1: {"publish": 1}})
+        self.assertEqual(report["carts"], {3: {"add_to_cart": 1, "place_order": 1}})
+
+    def test_rotated_files(self):
+        """
+        Test that the rotated files are read from the oldest backup to the current file
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "marketplace.log")
+            for suffix, lines in [(".2", LOG_LINES[:2]), (".1", LOG_LINES[2:6]),
+                                  ("", LOG_LINES[6:])]:
+                with open(filename + suffix, "w") as log_file:
+                    log_file.writelines(lines)
+            filenames = rotated_files(filename)
+            self.assertEqual(filenames, [filename + ".2", filename + ".1", filename])
+            report = analyse_logs(filenames, LogAnalyser())
+        self.assertEqual(report["lines"], 8)
+        self.assertEqual(report["active_seconds"], 3)
+        self.assertEqual(report["files"], filenames)
+
+
+@unittest.skipIf(log_analysis.numpy is None, "NumPy is not installed")
+class TestNumpyLogAnalysis(unittest.TestCase):
+    """
+    Class for unittesting the log analysis module, with the NumPy analyser
+    """
+
+    def write_logs(self, directory, parts):
+        """
+        Writes the parts of the log to a file and its backups, the first part to the oldest
+
+        :returns the paths of the files, from the oldest to the newest
+        """
+        filename = os.path.join(directory, "marketplace.log")
+        for index, lines in enumerate(parts):
+            suffix = "." + str(len(parts) - 1 - index) if index < len(parts) - 1 else ""
+            with open(filename + suffix, "w") as log_file:
+                log_file.writelines(lines)
+        return rotated_files(filename)
+
+    def test_same_report(self):
+        """
+        Test that the report is the one of LogAnalyser, whatever the chunk size
+        """
+        lines = LOG_LINES[:-1] * 3 + TRICKY_LINES
+        with tempfile.TemporaryDirectory() as directory:
+            filenames = self.write_logs(directory, [lines[:5], lines[5:17], lines[17:]])
+            expected = analyse_logs(filenames, LogAnalyser())
+            for chunk_size in [1, 37, 256, 1 << 20]:
+                with self.subTest(chunk_size=chunk_size):
+                    self.assertEqual(analyse_logs(filenames, NumpyLogAnalyser(chunk_size)),
+                                     expected)
+        self.assertEqual(expected["carts"][3], {"add_to_cart": 3, "place_order": 3,
+                                                "remove_from_cart": 1})
+        self.assertEqual(expected["producers"][2], {"publish": 1})
+        self.assertEqual(expected["producers"][12345], {"publish": 1})
+        self.assertEqual(expected["methods"]["remove_from_cart"]["failures"],
+                         {"product not found": 1})
+
+    def test_peak_rate_across_chunks(self):
+        """
+        Test that a second cut by the end of a chunk is counted once
+        """
+        lines = LOG_LINES[:2] * 4 + LOG_LINES[4:6]
+        with tempfile.TemporaryDirectory() as directory:
+            filenames = self.write_logs(directory, [lines])
+            report = analyse_logs(filenames, NumpyLogAnalyser(300))
+        self.assertEqual(report["active_seconds"], 2)
+        self.assertEqual(report["methods"]["publish"]["peak_rate"], 8)
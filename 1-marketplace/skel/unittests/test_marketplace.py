@@ -0,0 +1,475 @@
+"""
+This module tests the Marketplace.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import contextlib
+from functools import partial
+import io
+import time
+import unittest
+
+from tema.consumer import Consumer
+from tema.marketplace import Marketplace
+from tema.producer import Producer
+from tema.product import Tea, Coffee
+from tema.publish_result import PublishResult
+
+
+class TestMarketplace(unittest.TestCase):
+    """
+    Class for unittesting the marketplace module, with the list storage
+    """
+    storage_name = "list"
+
+    def setUp(self):
+        """
+        Initialize the marketplace, the products, producers and consumers
+        """
+        self.marketplace = Marketplace(10, storage = self.storage_name)
+
+        self.product_1 = Coffee(name = "Indonezia", acidity = 5.05,\
+                        roast_level = "MEDIUM", price = 1)
+        self.product_2 = Coffee(name = "Brazil", acidity = 4.05, \
+                        roast_level = "LIGHT", price = 5)
+        self.product_3 = Tea(name = "Wild Cherry", type = "Black", price = 3)
+
+        self.producer_1 = Producer(products = [[self.product_1, 8, 0.1], \
+                        [self.product_2, 4, 0.2]], marketplace = self.marketplace, \
+                        republish_wait_time = 0.3)
+        self.producer_2 = Producer(products = [[self.product_3, 5, 0.1]], \
+                        marketplace = self.marketplace, republish_wait_time = 0.3)
+
+        self.consumer_1 = Consumer(carts = [
+            {
+                "type": "add",
+                "product": self.product_1,
+                "quantity": 3
+            },
+            {
+                "type": "add",
+                "product": self.product_3,
+                "quantity": 5
+            },
+            {
+                "type": "add",
+                "product": self.product_2,
+                "quantity": 1
+            },
+            {
+                "type": "remove",
+                "product": self.product_2,
+                "quantity": 1
+            },
+            {
+                "type": "remove",
+                "product": self.product_1,
+                "quantity": 1
+            }
+        ], marketplace = self.marketplace, retry_wait_time = 0.3)
+
+        self.consumer_2 = Consumer(carts = [
+            {
+                "type": "add",
+                "product": self.product_3,
+                "quantity": 3
+            }
+        ], marketplace = self.marketplace, retry_wait_time = 0.3)
+
+    def buffer_size(self, producer_id):
+        """
+        Return the number of products in a producer's buffer
+        """
+        return len(self.marketplace.storage.buffer_items(producer_id))
+
+    def test_register_producer(self):
+        """
+        Test the register_producer method
+        """
+        self.assertEqual(len(self.marketplace.stock_by_producer()), 2)
+        self.assertEqual(self.producer_1.producer_id, 0)
+        self.assertEqual(self.producer_2.producer_id, 1)
+        self.assertEqual(self.marketplace.register_producer(), 2)
+        self.assertEqual(self.marketplace.register_producer(), 3)
+
+    def test_publish(self):
+        """
+        Test the publish method
+        """
+        total_products_producer_1 = self.producer_1.products[0][1] + self.producer_1.products[1][1]
+        # publish products for producer 1; keep track if the number of products
+        # is above the queue size; test the results
+        for i in range(0, total_products_producer_1):
+            current_product = self.product_1
+            if i > 4:
+                current_product = self.product_2
+            if i < self.marketplace.storage.queue_size_per_producer:
+                self.assertTrue(self.marketplace.publish(self.producer_1.producer_id, \
+                                current_product))
+                self.assertEqual(self.buffer_size(self.producer_1.producer_id), i + 1)
+            else:
+                self.assertFalse(self.marketplace.publish(self.producer_1.producer_id, \
+                                current_product))
+                self.assertEqual(self.buffer_size(self.producer_1.producer_id),\
+                                self.marketplace.storage.queue_size_per_producer)
+
+        # publish products for producer 2; the number of products is below the queue size;
+        # check the results
+        total_products_producer_2 = self.producer_2.products[0][1]
+        for i in range(0, total_products_producer_2):
+            self.assertTrue(self.marketplace.publish(self.producer_2.producer_id, self.product_3))
+            self.assertEqual(self.buffer_size(self.producer_2.producer_id), i + 1)
+
+    def test_publish_detailed(self):
+        """
+        Test the detailed result of the publish method
+        """
+        marketplace = Marketplace(2, storage = self.storage_name)
+        producer_id = marketplace.register_producer()
+        cart_id = marketplace.new_cart()
+
+        result = marketplace.publish(producer_id, self.product_1, detailed = True)
+        self.assertTrue(result)
+        self.assertEqual((result.free_capacity, result.estimated_wait, result.demand), \
+                        (1, 0, 0))
+
+        # a cart that didn't find the second product waits for it
+        self.assertFalse(marketplace.add_to_cart(cart_id, self.product_2))
+        marketplace.publish(producer_id, self.product_1)
+        result = marketplace.publish(producer_id, self.product_2, detailed = True)
+        self.assertFalse(result)
+        self.assertEqual((result.free_capacity, result.estimated_wait, result.demand), \
+                        (0, None, 1))
+
+        # once the consumers took products, the wait until the next one can be estimated
+        marketplace.add_to_cart(cart_id, self.product_1)
+        marketplace.publish(producer_id, self.product_2)
+        marketplace.add_to_cart(cart_id, self.product_2)
+        marketplace.publish(producer_id, self.product_2)
+        result = marketplace.publish(producer_id, self.product_2, detailed = True)
+        self.assertFalse(result)
+        self.assertEqual(result.demand, 0)
+        self.assertIsNotNone(result.estimated_wait)
+
+    def test_producer_adaptive_backoff(self):
+        """
+        Test the producer's wait after a failed publish attempt, depending on the demand
+        """
+        producer = Producer(products = [], marketplace = self.marketplace, \
+                        republish_wait_time = 0.3, backoff = "adaptive")
+        no_demand = PublishResult(False, 0, 0.1, 0)
+        demand = PublishResult(False, 0, 0.1, 2)
+        self.assertAlmostEqual(producer.republish_delay(no_demand, 0), 0.3)
+        self.assertAlmostEqual(producer.republish_delay(no_demand, 2), 1.2)
+        self.assertAlmostEqual(producer.republish_delay(no_demand, 10), 2.4)
+        self.assertAlmostEqual(producer.republish_delay(demand, 0), 0.1)
+        self.assertAlmostEqual(producer.republish_delay(demand, 1), 0.2)
+        self.assertAlmostEqual(producer.republish_delay(demand, 5), 0.3)
+        self.assertAlmostEqual(producer.republish_delay(demand, 1100), 0.3)
+        self.assertAlmostEqual(producer.republish_delay(no_demand, 1100), 2.4)
+        self.assertAlmostEqual(producer.republish_delay(PublishResult(False, 0, 0, 2), 0), 0.075)
+        self.assertAlmostEqual(self.producer_1.republish_delay(demand, 5), 0.3)
+
+    def test_consumer_backoff(self):
+        """
+        Test the consumer's wait after a failed add_to_cart, depending on the backoff
+        """
+        self.assertAlmostEqual(self.consumer_1.retry_delay(self.product_1, 3), 0.3)
+
+        self.consumer_1.backoff = "exponential"
+        for failures, max_wait_time in [(0, 0.3), (2, 1.2), (10, 2.4), (1100, 2.4)]:
+            wait_time = self.consumer_1.retry_delay(self.product_1, failures)
+            self.assertTrue(max_wait_time / 2 <= wait_time <= max_wait_time)
+
+        # without arrivals, the expected backoff falls back to the fixed wait
+        self.consumer_1.backoff = "expected"
+        self.assertIsNone(self.marketplace.expected_arrival(self.product_1))
+        self.assertAlmostEqual(self.consumer_1.retry_delay(self.product_1, 0), 0.3)
+        for _ in range(3):
+            self.marketplace.publish(self.producer_1.producer_id, self.product_1)
+        self.assertIsNotNone(self.marketplace.expected_arrival(self.product_1))
+        # the arrivals were moments apart, so the wait starts from the minimum and doubles
+        self.assertAlmostEqual(self.consumer_1.retry_delay(self.product_1, 0), 0.0375)
+        self.assertAlmostEqual(self.consumer_1.retry_delay(self.product_1, 1), 0.075)
+        self.assertAlmostEqual(self.consumer_1.retry_delay(self.product_1, 10), 2.4)
+        # a product that is never produced doesn't make the wait overflow
+        self.assertAlmostEqual(self.consumer_1.retry_delay(self.product_1, 1100), 2.4)
+
+    def test_new_cart(self):
+        """
+        Test the new_cart method
+        """
+        self.assertEqual(self.consumer_1.cart_id, 0)
+        self.assertEqual(self.consumer_2.cart_id, 1)
+        self.assertEqual(self.marketplace.new_cart(), 2)
+        self.assertEqual(self.marketplace.new_cart(), 3)
+
+    def test_add_to_cart(self):
+        """
+        Test the add_to_cart method
+        """
+        total_products_producer_2 = self.producer_2.products[0][1]
+
+        # publish products
+        for _ in range(0, total_products_producer_2):
+            self.marketplace.publish(self.producer_2.producer_id, self.product_3)
+        # add products to cart and test the results
+        for i in range (0, total_products_producer_2):
+            self.assertTrue(self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_3))
+            self.assertEqual(len(self.marketplace.place_order(self.consumer_2.cart_id)), i + 1)
+            self.assertEqual(self.buffer_size(self.producer_2.producer_id), \
+                            total_products_producer_2 - i - 1)
+        self.assertFalse(self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_3))
+
+    def test_remove_from_cart(self):
+        """
+        Test the remove_from_cart method
+        """
+        total_products_producer_2 = self.producer_2.products[0][1]
+
+        # publish products and add them to cart
+        for _ in range(0, total_products_producer_2):
+            self.marketplace.publish(self.producer_2.producer_id, self.product_3)
+        for _ in range (0, total_products_producer_2):
+            self.assertTrue(self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_3))
+
+        # remove products from cart and test the results
+        self.marketplace.remove_from_cart(self.consumer_2.cart_id, self.product_3)
+        self.marketplace.remove_from_cart(self.consumer_2.cart_id, self.product_3)
+        self.assertEqual(len(self.marketplace.place_order(self.consumer_2.cart_id)), \
+                        total_products_producer_2 - 2)
+        self.assertEqual(self.buffer_size(self.producer_2.producer_id), 2)
+
+    def test_place_order(self):
+        """
+        Test the place_order method
+        Add a fiew products to the cart, remove some of them and then place the order
+        """
+        total_product_1 = 4
+        total_product_2 = 3
+
+        # publish products
+        for _ in range(0, total_product_1):
+            self.marketplace.publish(self.producer_1.producer_id, self.product_1)
+        for _ in range(0, total_product_2):
+            self.marketplace.publish(self.producer_1.producer_id, self.product_2)
+
+        # add/remove products to/from cart
+        for _ in range(0, total_product_1):
+            self.marketplace.add_to_cart(self.consumer_1.cart_id, self.product_1)
+        for _ in range(0, total_product_2):
+            self.marketplace.add_to_cart(self.consumer_1.cart_id, self.product_2)
+        self.marketplace.remove_from_cart(self.consumer_1.cart_id, self.product_1)
+
+        # place order and test the result
+        order = self.marketplace.place_order(self.consumer_1.cart_id)
+        self.assertEqual(len(order), 6)
+
+        # the aggregated order has the same products and their total price
+        aggregated_order = self.marketplace.place_order(self.consumer_1.cart_id, True)
+        self.assertEqual(aggregated_order.quantities, {self.product_1: 3, self.product_2: 3})
+        self.assertEqual(aggregated_order.total_price, 18)
+        self.assertEqual(sorted(aggregated_order, key=str), sorted(order, key=str))
+
+    def test_release_cart(self):
+        """
+        Test the release_cart method
+        A released cart forgets its products and demand, and the next new cart reuses it
+        """
+        self.marketplace.publish(self.producer_2.producer_id, self.product_3)
+        self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_3)
+        self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_1)
+        self.marketplace.place_order(self.consumer_2.cart_id)
+        self.marketplace.release_cart(self.consumer_2.cart_id)
+
+        self.assertEqual(self.marketplace.demand.waiting_carts[self.product_1], set())
+        self.assertEqual(self.marketplace.new_cart(), self.consumer_2.cart_id)
+        self.assertEqual(self.marketplace.place_order(self.consumer_2.cart_id), [])
+        self.assertEqual(self.marketplace.stock(self.product_3), 0)
+
+    def test_cart_sessions(self):
+        """
+        Test that a consumer runs every cart script in a cart of its own and prints each
+        order as soon as its script is done
+        """
+        for _ in range(3):
+            self.marketplace.publish(self.producer_2.producer_id, self.product_3)
+        self.marketplace.publish(self.producer_1.producer_id, self.product_1)
+        consumer = Consumer(carts = [
+            [{"type": "add", "product": self.product_3, "quantity": 2},
+             {"type": "remove", "product": self.product_3, "quantity": 1}],
+            [{"type": "add", "product": self.product_1, "quantity": 1},
+             {"type": "add", "product": self.product_3, "quantity": 1}]
+        ], marketplace = self.marketplace, retry_wait_time = 0.3, name = "cons")
+        first_cart_id = consumer.cart_id
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(list(consumer.cart_script()), [])
+        self.assertEqual(sorted(output.getvalue().splitlines()), sorted([
+            "cons bought " + str(self.product_3),
+            "cons bought " + str(self.product_1),
+            "cons bought " + str(self.product_3)]))
+        # the second script reused the released cart, which is released again
+        self.assertEqual(consumer.cart_id, first_cart_id)
+        self.assertEqual(self.marketplace.new_cart(), first_cart_id)
+        self.assertEqual(self.marketplace.stock(self.product_3), 1)
+
+    def test_priority(self):
+        """
+        Test that, with the priority allocator, a scarce product waits for the premium cart
+        """
+        marketplace = Marketplace(10, storage = self.storage_name, allocator = "priority")
+        producer_id = marketplace.register_producer()
+        premium_cart_id = marketplace.new_cart(priority = 1)
+        regular_cart_id = marketplace.new_cart()
+        self.assertFalse(marketplace.add_to_cart(premium_cart_id, self.product_3))
+
+        marketplace.publish(producer_id, self.product_3)
+        self.assertFalse(marketplace.add_to_cart(regular_cart_id, self.product_3))
+        self.assertTrue(marketplace.add_to_cart(premium_cart_id, self.product_3))
+        self.assertEqual(sorted(marketplace.latency_stats()), [1])
+        self.assertEqual(marketplace.latency_stats()[1]["count"], 1)
+
+        # once its order is placed, a cart that failed doesn't wait anymore
+        self.assertFalse(marketplace.add_to_cart(premium_cart_id, self.product_1))
+        marketplace.place_order(premium_cart_id)
+        marketplace.publish(producer_id, self.product_1)
+        self.assertEqual(len(marketplace.demand.waiting_carts[self.product_1]), 0)
+        self.assertTrue(marketplace.add_to_cart(regular_cart_id, self.product_1))
+
+    def test_claim_policy(self):
+        """
+        Test that add_to_cart takes the product from the producer chosen by the claim policy
+        """
+        marketplace = Marketplace(3, claim_policy = "full-first", \
+                        storage = self.storage_name)
+        producer_ids = [marketplace.register_producer() for _ in range(3)]
+        for producer_id, quantity in zip(producer_ids, [1, 3, 2]):
+            for _ in range(quantity):
+                marketplace.publish(producer_id, self.product_3)
+        cart_id = marketplace.new_cart()
+
+        # the full buffer of producer 1 is unblocked first, then the lowest id is drained
+        for _ in range(3):
+            self.assertTrue(marketplace.add_to_cart(cart_id, self.product_3))
+        self.assertEqual(marketplace.stock_by_producer(), {0: 0, 1: 1, 2: 2})
+        self.assertEqual(sorted(product_tuple[1] for product_tuple in \
+                        marketplace.storage.cart_items(cart_id)), [0, 1, 1])
+
+    def test_expire_cart(self):
+        """
+        Test the expire_cart method and the expiry of a cart with a ttl
+        """
+        for _ in range(3):
+            self.marketplace.publish(self.producer_2.producer_id, self.product_3)
+        self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_3)
+        self.marketplace.add_to_cart(self.consumer_2.cart_id, self.product_3)
+
+        # the products go back to their producer's buffer
+        self.marketplace.expire_cart(self.consumer_2.cart_id)
+        self.assertEqual(self.marketplace.place_order(self.consumer_2.cart_id), [])
+        self.assertEqual(self.buffer_size(self.producer_2.producer_id), 3)
+
+        cart_id = self.marketplace.new_cart(ttl = 0.05)
+        self.marketplace.add_to_cart(cart_id, self.product_3)
+        self.assertEqual(self.marketplace.stock(self.product_3), 2)
+        time.sleep(0.2)
+        self.assertEqual(self.marketplace.stock(self.product_3), 3)
+        self.marketplace.cart_reaper.stop()
+
+    def test_expire_after_order(self):
+        """
+        Test that a cart that expired in the reaper but got its order placed before being
+        emptied keeps its products, and that an emptied cart is flagged once
+        """
+        self.marketplace.publish(self.producer_2.producer_id, self.product_3)
+        cart_id = self.marketplace.new_cart(ttl = 60)
+        self.marketplace.add_to_cart(cart_id, self.product_3)
+        self.marketplace.place_order(cart_id)
+        self.marketplace.expire_cart(cart_id, partial(self.marketplace.cart_reaper.still_expired,
+                                                      cart_id))
+        self.assertEqual(self.marketplace.place_order(cart_id), [self.product_3])
+        self.assertFalse(self.marketplace.cart_expired(cart_id))
+
+        self.marketplace.expire_cart(cart_id)
+        self.assertTrue(self.marketplace.cart_expired(cart_id))
+        self.assertFalse(self.marketplace.cart_expired(cart_id))
+        self.marketplace.cart_reaper.stop()
+
+    def test_consumer_expired_cart(self):
+        """
+        Test that a consumer whose cart expired gets the returned products again
+        """
+        self.marketplace.publish(self.producer_2.producer_id, self.product_3)
+        consumer = Consumer(carts = [
+            [{"type": "add", "product": self.product_3, "quantity": 1},
+             {"type": "add", "product": self.product_1, "quantity": 1}]
+        ], marketplace = self.marketplace, retry_wait_time = 0.3, name = "cons")
+        script = consumer.cart_script()
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            # while the consumer waits for the coffee, its cart expires
+            next(script)
+            self.marketplace.expire_cart(consumer.cart_id)
+            self.marketplace.publish(self.producer_1.producer_id, self.product_1)
+            self.assertEqual(list(script), [])
+        self.assertEqual(sorted(output.getvalue().splitlines()), sorted([
+            "cons bought " + str(self.product_3),
+            "cons bought " + str(self.product_1)]))
+        self.assertEqual(self.marketplace.stock(self.product_3), 0)
+
+    def test_inventory(self):
+        """
+        Test the inventory queries
+        Publish products, move some of them to a cart and back and check the counters
+        """
+        for _ in range(3):
+            self.marketplace.publish(self.producer_1.producer_id, self.product_1)
+        self.marketplace.publish(self.producer_1.producer_id, self.product_2)
+        for _ in range(2):
+            self.marketplace.publish(self.producer_2.producer_id, self.product_3)
+        self.marketplace.add_to_cart(self.consumer_1.cart_id, self.product_1)
+        self.marketplace.add_to_cart(self.consumer_1.cart_id, self.product_3)
+        self.marketplace.remove_from_cart(self.consumer_1.cart_id, self.product_3)
+
+        self.assertEqual(self.marketplace.stock(self.product_1), 2)
+        self.assertEqual(self.marketplace.stock(self.product_3), 2)
+        self.assertEqual(self.marketplace.stock_by_producer(), {0: 3, 1: 2})
+        self.assertEqual(self.marketplace.total_items(), 5)
+        self.assertEqual(self.marketplace.free_capacity(self.producer_2.producer_id), 8)
+        self.assertEqual(self.marketplace.top_products(2), [(self.product_1, 2), \
+                        (self.product_3, 2)])
+
+    def test_close(self):
+        """
+        Test the close method
+        Start a producer that waits a long time after publishing, then close the marketplace
+        """
+        producer = Producer(products = [[self.product_1, 1, 60]], \
+                        marketplace = self.marketplace, republish_wait_time = 60)
+        producer.start()
+        while producer.published_count == 0:
+            time.sleep(0.01)
+
+        # the producer is woken up and stops; no product can be published anymore
+        self.marketplace.close()
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        self.assertFalse(self.marketplace.publish(self.producer_1.producer_id, self.product_1))
+
+class TestMarketplaceMultiset(TestMarketplace):
+    """
+    Class for unittesting the marketplace module, with the multiset storage
+    """
+    storage_name = "multiset"
+
+class TestMarketplaceSharedMemory(TestMarketplace):
+    """
+    Class for unittesting the marketplace module, with the shared memory storage
+    """
+    storage_name = "shared-memory"
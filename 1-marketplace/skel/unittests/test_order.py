@@ -0,0 +1,49 @@
+"""
+This module tests the Order.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import unittest
+
+from tema.order import Order
+from tema.product import Tea, Coffee
+
+
+class TestOrder(unittest.TestCase):
+    """
+    Class for unittesting the order module
+    """
+    def setUp(self):
+        """
+        Initialize the products
+        """
+        self.product_1 = Coffee(name = "Indonezia", acidity = 5.05,\
+                        roast_level = "MEDIUM", price = 1)
+        self.product_2 = Tea(name = "Wild Cherry", type = "Black", price = 3)
+
+    def test_add_remove(self):
+        """
+        Test that the quantities and the total price follow the added and removed products
+        """
+        order = Order()
+        for product in [self.product_1, self.product_2, self.product_1, self.product_2]:
+            order.add(product)
+        order.remove(self.product_2)
+        snapshot = order.copy()
+        order.remove(self.product_2)
+
+        self.assertEqual(snapshot.quantities, {self.product_1: 2, self.product_2: 1})
+        self.assertEqual(snapshot.total_price, 5)
+        self.assertEqual(order.quantities, {self.product_1: 2})
+        self.assertEqual(order.total_price, 2)
+
+    def test_flat_items(self):
+        """
+        Test that iterating over the order yields a product for every unit
+        """
+        order = Order({self.product_1: 2, self.product_2: 1}, 5)
+        self.assertEqual(len(order), 3)
+        self.assertEqual(list(order), [self.product_1, self.product_1, self.product_2])
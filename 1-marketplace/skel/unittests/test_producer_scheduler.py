@@ -0,0 +1,169 @@
+"""
+This module tests the ProducerScheduler.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from contextlib import redirect_stderr
+import io
+from threading import Thread
+from time import sleep
+import unittest
+
+from tema.marketplace import Marketplace
+from tema.producer import Producer
+from tema.producer_scheduler import ProducerScheduler, TimerWheel
+from tema.product import Tea
+
+
+class TestProducerScheduler(unittest.TestCase):
+    """
+    Class for unittesting the producer scheduler module
+    """
+    def setUp(self):
+        """
+        Initialize the marketplace and the product
+        """
+        self.marketplace = Marketplace(2)
+        self.product = Tea(name = "Linden", type = "Herbal", price = 9)
+
+    def test_timer_wheel(self):
+        """
+        Test that the timer wheel returns the items in order, never before they are due
+        """
+        timer_wheel = TimerWheel(0.01, 4)
+        start_time = timer_wheel.start_time
+        timer_wheel.schedule(start_time + 0.1, "late")
+        timer_wheel.schedule(start_time + 0.02, "early")
+        self.assertEqual(timer_wheel.advance(start_time + 0.015), [])
+        self.assertEqual(timer_wheel.advance(start_time + 0.05), ["early"])
+        self.assertEqual(timer_wheel.advance(start_time + 0.09), [])
+        self.assertEqual(timer_wheel.advance(start_time + 0.12), ["late"])
+        self.assertEqual(timer_wheel.size, 0)
+
+    def test_publishes_products(self):
+        """
+        Test that the scheduled producers publish their products
+        """
+        producers = [Producer(products = [[self.product, 1, 0.01]], marketplace = \
+                    self.marketplace, republish_wait_time = 0.01) for _ in range(3)]
+        scheduler = ProducerScheduler(self.marketplace, 1)
+        for producer in producers:
+            scheduler.submit(producer)
+        scheduler.start()
+        sleep(0.2)
+        scheduler.stop()
+
+        for producer in producers:
+            self.assertEqual(len(self.marketplace.storage.buffer_items(producer.producer_id)), 2)
+
+    def test_blocked_producer_woken_by_consumer(self):
+        """
+        Test that a producer with a full buffer waits until a consumer takes a product
+        """
+        producer = Producer(products = [[self.product, 1, 0]], marketplace = \
+                    self.marketplace, republish_wait_time = 0.01)
+        cart_id = self.marketplace.new_cart()
+        scheduler = ProducerScheduler(self.marketplace, 2)
+        scheduler.submit(producer)
+        scheduler.start()
+        sleep(0.1)
+        self.assertEqual(scheduler.blocked_producers, {producer.producer_id})
+
+        self.assertTrue(self.marketplace.add_to_cart(cart_id, self.product))
+        sleep(0.1)
+        scheduler.stop()
+
+        self.assertEqual(len(self.marketplace.storage.buffer_items(producer.producer_id)), 2)
+        self.assertEqual(scheduler.blocked_producers, {producer.producer_id})
+
+    def test_join_after_close(self):
+        """
+        Test that closing the marketplace ends the scripts of the blocked and waiting producers
+        """
+        blocked_producer = Producer(products = [[self.product, 1, 0]], marketplace = \
+                    self.marketplace, republish_wait_time = 0.01)
+        waiting_producer = Producer(products = [[self.product, 1, 60]], marketplace = \
+                    self.marketplace, republish_wait_time = 0.01)
+        scheduler = ProducerScheduler(self.marketplace, 1)
+        scheduler.submit(blocked_producer)
+        scheduler.submit(waiting_producer)
+        scheduler.start()
+        sleep(0.1)
+
+        self.marketplace.close()
+        scheduler.join()
+        self.assertEqual(scheduler.producers, {})
+        self.assertEqual(waiting_producer.published_count, 1)
+
+    def test_close_during_attempt(self):
+        """
+        Test that a producer whose failed attempt is still running when the marketplace
+        closes isn't left blocked
+        """
+        publish = self.marketplace.publish
+
+        def publish_and_close(producer_id, product, detailed=False):
+            result = publish(producer_id, product, detailed)
+            if not result:
+                # close while the attempt runs, so stop_producers doesn't find the producer
+                self.marketplace.close()
+            return result
+
+        self.marketplace.publish = publish_and_close
+        producer = Producer(products = [[self.product, 3, 0]], marketplace = \
+                    self.marketplace, republish_wait_time = 0.01)
+        scheduler = ProducerScheduler(self.marketplace, 1)
+        scheduler.submit(producer)
+        scheduler.start()
+
+        join_thread = Thread(target=scheduler.join, daemon=True)
+        join_thread.start()
+        join_thread.join(5)
+        self.assertFalse(join_thread.is_alive())
+        self.assertEqual(scheduler.producers, {})
+
+    def test_join_after_failed_publish(self):
+        """
+        Test that a producer whose publish raises leaves the scheduler and that the worker
+        keeps serving the other producers
+        """
+        broken_producer = Producer(products = [[self.product, 1, 0]], marketplace = \
+                    self.marketplace, republish_wait_time = 0.01)
+        producer = Producer(products = [[self.product, 5, 0]], marketplace = \
+                    self.marketplace, republish_wait_time = 0.01, quota = 1)
+        publish = self.marketplace.publish
+
+        def failing_publish(producer_id, product, detailed=False):
+            if producer_id == broken_producer.producer_id:
+                raise RuntimeError("storage failure")
+            return publish(producer_id, product, detailed)
+
+        self.marketplace.publish = failing_publish
+        scheduler = ProducerScheduler(self.marketplace, 1)
+        scheduler.submit(broken_producer)
+        scheduler.submit(producer)
+        output = io.StringIO()
+        with redirect_stderr(output):
+            scheduler.start()
+            join_thread = Thread(target=scheduler.join, daemon=True)
+            join_thread.start()
+            join_thread.join(5)
+        self.assertFalse(join_thread.is_alive())
+        self.assertEqual(scheduler.producers, {})
+        self.assertIn("storage failure", output.getvalue())
+        self.assertEqual(len(self.marketplace.storage.buffer_items(producer.producer_id)), 1)
+
+    def test_quota(self):
+        """
+        Test that a producer with a quota leaves the scheduler once it reached it
+        """
+        producer = Producer(products = [[self.product, 5, 0]], marketplace = \
+                    self.marketplace, republish_wait_time = 0.01, quota = 1)
+        scheduler = ProducerScheduler(self.marketplace, 1)
+        scheduler.submit(producer)
+        scheduler.start()
+        scheduler.join()
+        self.assertEqual(len(self.marketplace.storage.buffer_items(producer.producer_id)), 1)
@@ -0,0 +1,30 @@
+"""
+This module tests the product types.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import unittest
+
+from tema.product import Tea, make_product
+
+
+class TestProduct(unittest.TestCase):
+    """
+    Class for unittesting the product module
+    """
+    def test_make_product(self):
+        """
+        Test that a product is built from the name of its type
+        """
+        product = make_product("Tea", {"name": "Linden", "type": "Herbal", "price": 9})
+        self.assertEqual(product, Tea(name = "Linden", type = "Herbal", price = 9))
+
+    def test_unknown_product_type(self):
+        """
+        Test that an unknown product type is rejected
+        """
+        with self.assertRaises(ValueError):
+            make_product("Water", {"name": "Still", "price": 1})
@@ -0,0 +1,39 @@
+"""
+This module tests the RateEstimator.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import unittest
+
+from tema.rate_estimator import RateEstimator
+
+
+class TestRateEstimator(unittest.TestCase):
+    """
+    Class for unittesting the rate estimator module
+    """
+    def test_unknown_rate(self):
+        """
+        Test that the estimator knows nothing before two occurrences
+        """
+        estimator = RateEstimator()
+        self.assertEqual(estimator.rate(), 0)
+        self.assertIsNone(estimator.expected_wait())
+        estimator.record(10)
+        self.assertIsNone(estimator.expected_wait(10))
+
+    def test_moving_average(self):
+        """
+        Test the average interval, the rate and the expected wait
+        """
+        estimator = RateEstimator(weight = 0.5)
+        for now in [0, 1, 2, 5]:
+            estimator.record(now)
+        # the intervals were 1, 1 and 3
+        self.assertAlmostEqual(estimator.mean_interval, 2)
+        self.assertAlmostEqual(estimator.rate(), 0.5)
+        self.assertAlmostEqual(estimator.expected_wait(5.5), 1.5)
+        self.assertEqual(estimator.expected_wait(8), 0)
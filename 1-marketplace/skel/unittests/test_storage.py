@@ -0,0 +1,287 @@
+"""
+This module tests the storage backends.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+from threading import Thread
+import multiprocessing
+import random
+import unittest
+
+from tema.inventory import Inventory
+from tema.marketplace import Marketplace
+from tema.product import Tea, Coffee
+from tema.shared_memory_storage import SharedMemoryStorage
+from tema.storage import make_storage
+
+
+def publish_and_claim(storage, products):
+    """
+    Attaches a marketplace to a shared memory storage, in another process, then publishes
+    the products to a new producer, fills the buffer of producer 1, registered by the
+    parent, and buys the first product published by producer 0.
+    """
+    marketplace = Marketplace(storage.queue_size_per_producer, storage = storage)
+    producer_id = marketplace.register_producer()
+    for product in products:
+        marketplace.publish(producer_id, product)
+    for _ in range(storage.queue_size_per_producer):
+        marketplace.publish(1, products[0], detailed = True)
+    if marketplace.publish(1, products[0], detailed = True):
+        raise SystemExit(1)
+    cart_id = marketplace.new_cart()
+    if not marketplace.add_to_cart(cart_id, storage.buffer_items(0)[0]):
+        raise SystemExit(1)
+
+class StorageConformanceTests:
+    """
+    Tests that every storage backend must pass; a test case for a backend inherits them
+    and sets storage_name
+    """
+    storage_name = None
+
+    def setUp(self):
+        """
+        Initialize the backend with two producers and a cart
+        """
+        self.storage = make_storage(self.storage_name, 3)
+        self.inventory = self.storage.inventory
+        self.producer_ids = [self.storage.add_producer(), self.storage.add_producer()]
+        self.cart_id = self.storage.add_cart()
+        self.product_1 = Coffee(name = "Indonezia", acidity = 5.05,\
+                        roast_level = "MEDIUM", price = 1)
+        self.product_2 = Tea(name = "Wild Cherry", type = "Black", price = 3)
+
+    def assert_inventory_matches(self):
+        """
+        Check that the inventory counts exactly the products in the buffers
+        """
+        total_items = 0
+        for producer_id in self.producer_ids:
+            items = self.storage.buffer_items(producer_id)
+            total_items += len(items)
+            self.assertEqual(self.inventory.stock_by_producer()[producer_id], len(items))
+        self.assertEqual(self.inventory.total_items(), total_items)
+
+    def test_ids(self):
+        """
+        Test that the ids are allocated in order
+        """
+        self.assertEqual(self.producer_ids, [0, 1])
+        self.assertEqual(self.cart_id, 0)
+        self.assertEqual(self.storage.add_cart(), 1)
+
+    def test_publish(self):
+        """
+        Test that a buffer takes products up to its size
+        """
+        results = [self.storage.publish(0, self.product_1) for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+        self.assertEqual(self.storage.buffer_items(0), [self.product_1] * 3)
+        self.assertEqual(self.storage.buffer_items(1), [])
+        self.assert_inventory_matches()
+
+    def test_claim(self):
+        """
+        Test that a claimed product moves from the buffer to the cart
+        """
+        self.storage.publish(1, self.product_1)
+        self.storage.publish(1, self.product_2)
+        self.assertFalse(self.storage.claim(self.cart_id, 0, self.product_1))
+        self.assertTrue(self.storage.claim(self.cart_id, 1, self.product_1))
+        self.assertFalse(self.storage.claim(self.cart_id, 1, self.product_1))
+
+        self.assertEqual(self.storage.buffer_items(1), [self.product_2])
+        self.assertEqual(self.storage.cart_items(self.cart_id), [(self.product_1, 1)])
+        self.assertEqual(self.storage.cart_order(self.cart_id).total_price, 1)
+        self.assert_inventory_matches()
+
+    def test_unclaim(self):
+        """
+        Test that an unclaimed product goes back to its producer, even if the buffer is full
+        """
+        self.storage.publish(1, self.product_1)
+        self.storage.claim(self.cart_id, 1, self.product_1)
+        for _ in range(3):
+            self.storage.publish(1, self.product_2)
+
+        self.assertIsNone(self.storage.unclaim(self.cart_id, self.product_2))
+        self.assertEqual(self.storage.unclaim(self.cart_id, self.product_1), 1)
+        self.assertIsNone(self.storage.unclaim(self.cart_id, self.product_1))
+        self.assertEqual(len(self.storage.buffer_items(1)), 4)
+        self.assertEqual(self.storage.cart_items(self.cart_id), [])
+        self.assertEqual(len(self.storage.cart_order(self.cart_id)), 0)
+        self.assert_inventory_matches()
+
+    def test_return_cart(self):
+        """
+        Test that all the products in a returned cart go back to their producers
+        """
+        for producer_id in self.producer_ids:
+            self.storage.publish(producer_id, self.product_1)
+            self.storage.publish(producer_id, self.product_2)
+            self.storage.claim(self.cart_id, producer_id, self.product_1)
+            self.storage.claim(self.cart_id, producer_id, self.product_2)
+
+        returned = self.storage.return_cart(self.cart_id)
+        self.assertEqual(sorted(returned, key=str), sorted([(self.product_1, 0), \
+                        (self.product_2, 0), (self.product_1, 1), (self.product_2, 1)], key=str))
+        self.assertEqual(self.storage.cart_items(self.cart_id), [])
+        self.assertEqual(self.storage.cart_order(self.cart_id).total_price, 0)
+        for producer_id in self.producer_ids:
+            self.assertEqual(len(self.storage.buffer_items(producer_id)), 2)
+        self.assert_inventory_matches()
+
+    def test_cart_order(self):
+        """
+        Test that the cart's order follows the claimed and unclaimed products
+        """
+        for product in [self.product_1, self.product_2, self.product_2]:
+            self.storage.publish(0, product)
+            self.storage.claim(self.cart_id, 0, product)
+        self.storage.unclaim(self.cart_id, self.product_2)
+
+        order = self.storage.cart_order(self.cart_id)
+        self.assertEqual(order.quantities, {self.product_1: 1, self.product_2: 1})
+        self.assertEqual(order.total_price, 4)
+
+    def test_release_cart(self):
+        """
+        Test that a released cart is emptied without giving back its products and that
+        its id is reused
+        """
+        self.storage.publish(0, self.product_1)
+        self.storage.claim(self.cart_id, 0, self.product_1)
+        self.storage.release_cart(self.cart_id)
+
+        self.assertEqual(self.storage.add_cart(), self.cart_id)
+        self.assertEqual(self.storage.cart_items(self.cart_id), [])
+        self.assertEqual(self.storage.cart_order(self.cart_id).total_price, 0)
+        self.assertEqual(self.storage.buffer_items(0), [])
+        self.assertEqual(self.storage.add_cart(), 1)
+        self.assert_inventory_matches()
+
+    def test_stress(self):
+        """
+        Test that no product is lost or duplicated when many threads publish, claim and
+        unclaim products concurrently
+        """
+        num_threads = 8
+        cart_ids = [self.cart_id] + [self.storage.add_cart() for _ in range(num_threads - 1)]
+        published = [0] * num_threads
+        errors = []
+
+        def run_operations(thread_index):
+            operations_random = random.Random(thread_index)
+            cart_id = cart_ids[thread_index]
+            for _ in range(2000):
+                producer_id = operations_random.choice(self.producer_ids)
+                product = operations_random.choice([self.product_1, self.product_2])
+                operation = operations_random.random()
+                if operation < 0.4:
+                    published[thread_index] += self.storage.publish(producer_id, product)
+                elif operation < 0.8:
+                    self.storage.claim(cart_id, producer_id, product)
+                else:
+                    self.storage.unclaim(cart_id, product)
+
+        def run_catching(thread_index):
+            try:
+                run_operations(thread_index)
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        threads = [Thread(target=run_catching, args=(i,)) for i in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        in_buffers = sum(len(self.storage.buffer_items(producer_id))
+                         for producer_id in self.producer_ids)
+        in_carts = sum(len(self.storage.cart_items(cart_id)) for cart_id in cart_ids)
+        self.assertEqual(errors, [])
+        self.assertEqual(in_buffers + in_carts, sum(published))
+        for cart_id in cart_ids:
+            self.assertEqual(len(self.storage.cart_order(cart_id)),
+                             len(self.storage.cart_items(cart_id)))
+        self.assert_inventory_matches()
+
+class TestListStorage(StorageConformanceTests, unittest.TestCase):
+    """
+    Class for unittesting the list storage
+    """
+    storage_name = "list"
+
+class TestMultisetStorage(StorageConformanceTests, unittest.TestCase):
+    """
+    Class for unittesting the multiset storage
+    """
+    storage_name = "multiset"
+
+class TestSharedMemoryStorage(StorageConformanceTests, unittest.TestCase):
+    """
+    Class for unittesting the shared memory storage
+    """
+    storage_name = "shared-memory"
+
+    def test_give_back_to_full_buffer(self):
+        """
+        Test that a product given back to a buffer with no free slot goes to another one,
+        and stays in the cart if no buffer has one
+        """
+        for _ in range(3):
+            self.storage.publish(0, self.product_1)
+            self.storage.claim(self.cart_id, 0, self.product_1)
+        for _ in range(3):
+            self.storage.publish(0, self.product_2)
+        self.storage.claim(self.cart_id, 0, self.product_2)
+        self.storage.publish(0, self.product_2)
+        for _ in range(3):
+            self.assertEqual(self.storage.unclaim(self.cart_id, self.product_1), 0)
+        self.assertEqual(len(self.storage.buffer_items(0)), 6)
+
+        self.assertEqual(self.storage.unclaim(self.cart_id, self.product_2), 1)
+        self.assertEqual(self.storage.buffer_items(1), [self.product_2])
+        self.assert_inventory_matches()
+
+        storage = SharedMemoryStorage(1, Inventory(1), max_producers = 1, \
+                        slots_per_producer = 1)
+        producer_id = storage.add_producer()
+        cart_id = storage.add_cart()
+        storage.publish(producer_id, self.product_1)
+        storage.claim(cart_id, producer_id, self.product_1)
+        storage.publish(producer_id, self.product_2)
+        self.assertIsNone(storage.unclaim(cart_id, self.product_1))
+        self.assertEqual(storage.return_cart(cart_id), [])
+        self.assertEqual(storage.cart_items(cart_id), [(self.product_1, producer_id)])
+        self.assertEqual(storage.cart_order(cart_id).total_price, 1)
+
+    def test_other_process(self):
+        """
+        Test that another process attached to the storage shares the buffers
+        """
+        # spawn the process, so the storage is pickled and attached like in any process
+        storage = SharedMemoryStorage(3, Inventory(3), context = "spawn")
+        storage.add_producer()
+        storage.add_producer()
+        storage.publish(0, self.product_1)
+        storage.intern(self.product_2)
+        process = multiprocessing.get_context("spawn").Process(target = publish_and_claim, \
+                        args = (storage, [self.product_2, self.product_2]))
+        process.start()
+        process.join(30)
+        self.assertEqual(process.exitcode, 0)
+
+        # the new producer and its products are seen after a refresh
+        self.assertEqual(storage.buffer_items(0), [])
+        storage.refresh()
+        self.assertEqual(storage.buffer_items(2), [self.product_2, self.product_2])
+        self.assertEqual(storage.buffer_items(1), [self.product_2] * 3)
+        self.assertEqual(storage.inventory.stock(self.product_2), 5)
+        self.assertEqual(storage.inventory.stock(self.product_1), 0)
+        self.assertEqual(storage.inventory.total_items(), 5)
+        self.assertEqual(storage.add_producer(), 3)
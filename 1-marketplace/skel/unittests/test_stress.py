@@ -0,0 +1,80 @@
+"""
+This module tests the Marketplace under concurrency.
+
+Computer Systems Architecture Course
+Assignment 1
+March 2021
+"""
+
+import logging
+import unittest
+
+from tema.allocator import PriorityAllocator
+from tema.claim_policy import CLAIM_POLICIES
+from tema.storage import STORAGES
+from tema.stress import STRESS_PRODUCTS, race_for_last_unit, run_contention, run_stress
+
+
+class TestMarketplaceStress(unittest.TestCase):
+    """
+    Class for unittesting the marketplace under concurrency, with every storage and
+    claim policy
+    """
+    def setUp(self):
+        """
+        Don't log the thousands of calls of the stress runs
+        """
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        """
+        Log again
+        """
+        logging.disable(logging.NOTSET)
+
+    def assert_conservation(self, result):
+        """
+        Check that every product published is in a buffer, an open cart or a placed order,
+        and that the inventory agrees with the buffers
+        """
+        self.assertEqual(result["errors"], [])
+        self.assertEqual(result["published"],
+                         result["buffered"] + result["in_carts"] + result["ordered"])
+        self.assertTrue(result["placed_carts_match"])
+        marketplace = result["marketplace"]
+        self.assertEqual(marketplace.total_items(), result["buffered"])
+        self.assertEqual(sum(marketplace.stock(product) for product in STRESS_PRODUCTS),
+                         result["buffered"])
+
+    def test_conservation(self):
+        """
+        Test the conservation of the products with every storage and claim policy
+        """
+        for storage in STORAGES:
+            for claim_policy in CLAIM_POLICIES:
+                with self.subTest(storage=storage, claim_policy=claim_policy):
+                    result = run_stress({"storage": storage, "claim_policy": claim_policy},
+                                        num_operations=500, seed=len(claim_policy))
+                    self.assert_conservation(result)
+                    self.assertGreater(result["operations"].get("add_to_cart", 0), 0)
+                    self.assertGreater(result["operations"].get("remove_from_cart", 0), 0)
+
+    def test_race_for_last_unit(self):
+        """
+        Test that exactly one of the consumers racing for the last unit gets it
+        """
+        for storage in STORAGES:
+            with self.subTest(storage=storage):
+                for _ in range(20):
+                    self.assertEqual(race_for_last_unit({"storage": storage}), 1)
+
+    def test_priority_contention(self):
+        """
+        Test that the premium consumers wait less for a scarce product, while the aging
+        still serves the regular ones
+        """
+        latency_stats, bought = run_contention({"allocator": PriorityAllocator(aging=0.05)},
+                                               num_units=100)
+        self.assertEqual(sum(bought), 100)
+        self.assertTrue(all(bought))
+        self.assertLess(latency_stats[1]["p95"], latency_stats[0]["mean"])